@@ -1,36 +1,4 @@
-from fastapi import APIRouter
-from . import endpoints
+# The version's router (with its endpoints and admission control) is defined in api.py
+from .api import api_router
 
-# Create main API router
-api_router = APIRouter()
-
-# Include all endpoint routers
-api_router.include_router(
-    endpoints.organization.router,
-    prefix="/organizations",
-    tags=["organizations"]
-)
-
-api_router.include_router(
-    endpoints.department.router,
-    prefix="/departments",
-    tags=["departments"]
-)
-
-api_router.include_router(
-    endpoints.employee.router,
-    prefix="/employees",
-    tags=["employees"]
-)
-
-api_router.include_router(
-    endpoints.position.router,
-    prefix="/positions",
-    tags=["positions"]
-)
-
-api_router.include_router(
-    endpoints.team.router,
-    prefix="/teams",
-    tags=["teams"]
-)
+__all__ = ['api_router']
@@ -1,7 +1,9 @@
-from fastapi import APIRouter
-from .endpoints import organization, department, employee, position, team
+from fastapi import APIRouter, Depends
+from ...core.admission import admission_control
+from .endpoints import organization, department, employee, position, team, search, assignment, cascade, jobs
 
-api_router = APIRouter()
+# Every API request passes rate limiting and load shedding first
+api_router = APIRouter(dependencies=[Depends(admission_control)])
 
 api_router.include_router(
     organization.router,
@@ -31,4 +33,28 @@ api_router.include_router(
     team.router,
     prefix="/teams",
     tags=["teams"]
-) 
\ No newline at end of file
+) 
+
+api_router.include_router(
+    search.router,
+    prefix="/search",
+    tags=["search"]
+)
+
+api_router.include_router(
+    assignment.router,
+    prefix="/assignments",
+    tags=["assignments"]
+)
+
+api_router.include_router(
+    cascade.router,
+    prefix="/cascades",
+    tags=["cascades"]
+)
+
+api_router.include_router(
+    jobs.router,
+    prefix="/jobs",
+    tags=["jobs"]
+)
@@ -4,6 +4,10 @@ from . import department
 from . import employee
 from . import position
 from . import team
+from . import search
+from . import assignment
+from . import cascade
+from . import jobs
 
 # Export all modules
 __all__ = [
@@ -11,5 +15,9 @@ __all__ = [
     'department',
     'employee',
     'position',
-    'team'
+    'team',
+    'search',
+    'assignment',
+    'cascade',
+    'jobs'
 ] 
\ No newline at end of file
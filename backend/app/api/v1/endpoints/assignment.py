@@ -0,0 +1,234 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import insert, or_, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Dict, List, Tuple
+from ....core.cache import cache, org_tag
+from ....core.changes import changes_page
+from ....core.config import get_settings
+from ....core.counters import refresh_counters
+from ....core.db import get_db_session
+from ....core.outbox import record_changes
+from ....models.tables import Department, Employee, EmployeePosition, PositionJob
+from ....schemas.schemas import ChangesPage, EmployeePositionBase, EmployeePositionResponse
+
+settings = get_settings()
+
+router = APIRouter()
+
+def _active_on(day: date):
+    """
+    Condition for assignments active on a day.
+
+    A missing StartDate means "since always", a missing EndDate "still held".
+    On the (PositionID, StartDate, EndDate) index, PositionID and StartDate
+    (NULLs sort first, so "IS NULL OR <= day" is one range) bound the scan;
+    EndDate follows a range column, so its condition only filters the
+    scanned index entries (index condition pushdown) without a seek.
+    """
+    return (
+        or_(EmployeePosition.StartDate.is_(None), EmployeePosition.StartDate <= day),
+        or_(EmployeePosition.EndDate.is_(None), EmployeePosition.EndDate >= day)
+    )
+
+def _position_scopes(db: Session, position_ids) -> Dict[int, Tuple[int, int]]:
+    """Department and organization IDs of positions, by position ID"""
+    rows = db.query(PositionJob.PositionID, PositionJob.DepartmentID, Department.OrganizationID).join(
+        Department, Department.DepartmentID == PositionJob.DepartmentID
+    ).filter(PositionJob.PositionID.in_(set(position_ids))).all()
+    return {position_id: (dept_id, org_id) for position_id, dept_id, org_id in rows}
+
+def _check_organizations(employee_orgs: Dict[int, int], scopes: Dict[int, Tuple[int, int]], pairs):
+    """400 for assignments of employees to positions of another organization"""
+    foreign = sorted(
+        (employee_id, position_id) for employee_id, position_id in pairs
+        if employee_orgs[employee_id] != scopes[position_id][1]
+    )
+    if foreign:
+        raise HTTPException(status_code=400, detail=f"Employee and position belong to different organizations: {foreign}")
+
+def _concurrent_change(db: Session):
+    """409 for an insert that lost a race: another request assigned the position since the checks"""
+    db.rollback()
+    raise HTTPException(status_code=409, detail="Assignments changed concurrently, retry the request")
+
+def _check_dates(assignment: EmployeePositionBase):
+    if assignment.StartDate and assignment.EndDate and assignment.EndDate < assignment.StartDate:
+        raise HTTPException(status_code=400, detail="EndDate must not be before StartDate")
+
+def _get_assignment(db: Session, employee_id: int, position_id: int) -> EmployeePosition:
+    db_assignment = db.query(EmployeePosition).filter(
+        EmployeePosition.EmployeeID == employee_id,
+        EmployeePosition.PositionID == position_id
+    ).first()
+    if not db_assignment:
+        raise HTTPException(status_code=404, detail="Assignment not found")
+    return db_assignment
+
+def _after_write(db: Session, scopes):
+    """Refresh department headcounts, commit and drop the affected org charts"""
+    db.flush()
+    refresh_counters(db, "department", {dept_id for dept_id, _ in scopes})
+    db.commit()
+    cache.invalidate(*{org_tag(org_id) for _, org_id in scopes})
+
+@router.post("/", response_model=EmployeePositionResponse)
+def assign_position(
+    assignment: EmployeePositionBase,
+    db: Session = Depends(get_db_session)
+):
+    """Assign a position to an employee"""
+    _check_dates(assignment)
+    org_id = db.query(Employee.OrganizationID).filter(Employee.EmployeeID == assignment.EmployeeID).scalar()
+    if org_id is None:
+        raise HTTPException(status_code=400, detail="Employee not found")
+    scopes = _position_scopes(db, [assignment.PositionID])
+    if not scopes:
+        raise HTTPException(status_code=400, detail="Position not found")
+    _check_organizations({assignment.EmployeeID: org_id}, scopes, [(assignment.EmployeeID, assignment.PositionID)])
+    if db.query(EmployeePosition.EmployeeID).filter(
+        EmployeePosition.EmployeeID == assignment.EmployeeID,
+        EmployeePosition.PositionID == assignment.PositionID
+    ).first():
+        raise HTTPException(status_code=400, detail="Employee already assigned to this position")
+
+    db_assignment = EmployeePosition(**assignment.model_dump())
+    db.add(db_assignment)
+    try:
+        _after_write(db, scopes.values())
+    except IntegrityError:
+        _concurrent_change(db)
+    db.refresh(db_assignment)
+    return db_assignment
+
+@router.post("/bulk", response_model=List[EmployeePositionResponse])
+def assign_positions(
+    assignments: List[EmployeePositionBase],
+    db: Session = Depends(get_db_session)
+):
+    """
+    Assign many positions in one transaction.
+
+    References and duplicates are checked with one query each and the rows
+    are written with a single multi-row INSERT; nothing is written if any
+    assignment is invalid.
+    """
+    if len(assignments) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BULK_MAX_ITEMS} assignments per request")
+    if not assignments:
+        return []
+    for assignment in assignments:
+        _check_dates(assignment)
+    pairs = [(assignment.EmployeeID, assignment.PositionID) for assignment in assignments]
+    if len(set(pairs)) != len(pairs):
+        raise HTTPException(status_code=400, detail="Duplicate assignments in request")
+
+    employee_ids = {employee_id for employee_id, _ in pairs}
+    employee_orgs = dict(db.query(Employee.EmployeeID, Employee.OrganizationID).filter(Employee.EmployeeID.in_(employee_ids)).all())
+    if employee_ids - set(employee_orgs):
+        raise HTTPException(status_code=400, detail=f"Employees not found: {sorted(employee_ids - set(employee_orgs))}")
+    scopes = _position_scopes(db, [position_id for _, position_id in pairs])
+    missing = {position_id for _, position_id in pairs} - set(scopes)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Positions not found: {sorted(missing)}")
+    _check_organizations(employee_orgs, scopes, pairs)
+    existing = db.query(EmployeePosition.EmployeeID, EmployeePosition.PositionID).filter(
+        tuple_(EmployeePosition.EmployeeID, EmployeePosition.PositionID).in_(pairs)
+    ).all()
+    if existing:
+        raise HTTPException(status_code=400, detail=f"Already assigned: {sorted(tuple(pair) for pair in existing)}")
+
+    try:
+        db.execute(insert(EmployeePosition), [assignment.model_dump() for assignment in assignments])
+    except IntegrityError:
+        _concurrent_change(db)
+    record_changes(db, EmployeePosition, "create", pairs, fields=EmployeePositionBase.model_fields)
+    _after_write(db, scopes.values())
+    return db.query(EmployeePosition).filter(
+        tuple_(EmployeePosition.EmployeeID, EmployeePosition.PositionID).in_(pairs)
+    ).order_by(EmployeePosition.EmployeeID, EmployeePosition.PositionID).all()
+
+@router.post("/{employee_id}/{position_id}/end", response_model=EmployeePositionResponse)
+def end_position(
+    employee_id: int,
+    position_id: int,
+    end_date: date = None,
+    db: Session = Depends(get_db_session)
+):
+    """End an assignment on end_date (today by default)"""
+    db_assignment = _get_assignment(db, employee_id, position_id)
+    end_date = end_date or date.today()
+    if db_assignment.StartDate and end_date < db_assignment.StartDate:
+        raise HTTPException(status_code=400, detail="EndDate must not be before StartDate")
+    db_assignment.EndDate = end_date
+    _after_write(db, _position_scopes(db, [position_id]).values())
+    db.refresh(db_assignment)
+    return db_assignment
+
+@router.delete("/{employee_id}/{position_id}", response_model=EmployeePositionResponse)
+def delete_assignment(
+    employee_id: int,
+    position_id: int,
+    db: Session = Depends(get_db_session)
+):
+    """Delete an assignment recorded by mistake (use /end to end a real one)"""
+    db_assignment = _get_assignment(db, employee_id, position_id)
+    scopes = _position_scopes(db, [position_id]).values()
+    db.delete(db_assignment)
+    _after_write(db, scopes)
+    return db_assignment
+
+@router.get("/changes", response_model=ChangesPage[EmployeePositionResponse])
+def assignment_changes(
+    since: str = None,
+    limit: int = Query(100, ge=1, le=settings.DELTA_SYNC_MAX_LIMIT),
+    db: Session = Depends(get_db_session)
+):
+    """Assignments changed or deleted since a sync cursor (omit since for a full first sync); pass the returned cursor to continue"""
+    return changes_page(db, EmployeePosition, since, limit)
+
+@router.get("/position/{position_id}", response_model=List[EmployeePositionResponse])
+def position_holders(
+    position_id: int,
+    on: date = None,
+    db: Session = Depends(get_db_session)
+):
+    """Assignments of a position active on a date (today by default): who held position X on day D"""
+    return db.query(EmployeePosition).filter(
+        EmployeePosition.PositionID == position_id,
+        *_active_on(on or date.today())
+    ).order_by(EmployeePosition.StartDate, EmployeePosition.EmployeeID).all()
+
+@router.get("/employee/{employee_id}", response_model=List[EmployeePositionResponse])
+def employee_timeline(
+    employee_id: int,
+    db: Session = Depends(get_db_session)
+):
+    """All assignments of an employee in chronological order (served by the primary key)"""
+    return db.query(EmployeePosition).filter(
+        EmployeePosition.EmployeeID == employee_id
+    ).order_by(EmployeePosition.StartDate, EmployeePosition.EndDate, EmployeePosition.PositionID).all()
+
+@router.get("/department/{department_id}", response_model=List[EmployeePositionResponse])
+def department_assignments(
+    department_id: int,
+    on: date = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db_session)
+):
+    """
+    Assignments active on a date (today by default) in a department.
+
+    Positions are found by the department index, their assignments by the
+    (PositionID, StartDate, EndDate) index.
+    """
+    return db.query(EmployeePosition).join(
+        PositionJob, PositionJob.PositionID == EmployeePosition.PositionID
+    ).filter(
+        PositionJob.DepartmentID == department_id,
+        *_active_on(on or date.today())
+    ).order_by(
+        EmployeePosition.PositionID, EmployeePosition.EmployeeID
+    ).offset(skip).limit(limit).all()
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from ....core.cascade import CascadeEntity, plan_cascade
+from ....core.db import get_db_session
+from ....core.jobs import job_queue
+from ....core import tasks  # noqa: F401 (registers the job types)
+from ....schemas.schemas import CascadeCounts, JobResponse
+
+router = APIRouter()
+
+@router.get("/{entity}/{entity_id}", response_model=CascadeCounts)
+def count_cascade(
+    entity: CascadeEntity,
+    entity_id: int,
+    subtree: bool = True,
+    db: Session = Depends(get_db_session)
+):
+    """
+    Dry run: rows a cascade delete would remove, per table.
+
+    Departments are counted with their subdepartments unless subtree=false.
+    """
+    counts = plan_cascade(db, entity, entity_id, subtree).count(db)
+    return {"entity": entity, "entity_id": entity_id, "counts": counts, "total": sum(counts.values())}
+
+@router.post("/{entity}/{entity_id}", response_model=JobResponse, status_code=202)
+def start_cascade(
+    entity: CascadeEntity,
+    entity_id: int,
+    subtree: bool = True,
+    db: Session = Depends(get_db_session)
+):
+    """
+    Delete an organization, or a department with its subdepartments, as a background job.
+
+    Rows go in bounded chunks (CASCADE_CHUNK_SIZE) in dependency order:
+    team members, assignments, positions, teams, departments, employees.
+    Follow (or cancel) the returned cascade_delete job at /jobs/{id}; its
+    details show the counted and deleted rows per table.
+    """
+    plan_cascade(db, entity, entity_id, subtree)  # 404 now rather than in the job
+    return job_queue.enqueue("cascade_delete", {"entity": entity, "entity_id": entity_id, "subtree": subtree})
@@ -1,9 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List
+from ....core.cache import cache, cached_route, invalidate_entity, entity_tags, list_tags
+from ....core.cascade import check_inline, department_cascade
+from ....core.changes import changes_page
+from ....core.config import get_settings
+from ....core.counters import department_headcounts
 from ....core.db import get_db_session
-from ....models.tables import Department
-from ....schemas.schemas import DepartmentCreate, DepartmentUpdate, DepartmentResponse
+from ....core.etag import entity_version, ids_version, page_version
+from ....core.export import export_response
+from ....core.filtering import filter_query
+from ....core.includes import check_include_fields, include_response, parse_includes, with_includes
+from ....core.loader import Loaders, get_loaders, load_response, parse_ids
+from ....core.projection import list_response, project, projected_response, select_fields
+from ....core.validation import ensure_exists
+from ....models.tables import Department, Employee, Organization, PositionJob
+from ....schemas.schemas import ChangesPage, DepartmentCreate, DepartmentUpdate, DepartmentResponse, DepartmentHeadcount
+
+settings = get_settings()
+
+def _validate_references(data: dict, loaders: Loaders):
+    """Check that referenced organization, parent department and head exist, through the request's loaders"""
+    ensure_exists(loaders[Organization], "organization", data.get("OrganizationID"), "Organization not found")
+    ensure_exists(loaders[Department], "department", data.get("ParentDepartmentID"), "Parent department not found")
+    ensure_exists(loaders[Employee], "employee", data.get("HeadOfDepartmentID"), "Employee not found")
 
 router = APIRouter(
     prefix="/departments",
@@ -14,6 +34,27 @@ router = APIRouter(
     }
 )
 
+def _list_query(db: Session, org_id: int = None, filters: List[str] = None, sort: str = None):
+    """Base query of the list endpoint, filtered and sorted, then ordered by primary key for stable pages"""
+    query = db.query(Department)
+    if org_id:
+        query = query.filter(Department.OrganizationID == org_id)
+    return filter_query(query, Department, filters, sort, scoped_by=["OrganizationID"] if org_id else [])
+
+def _list_version(db: Session, params: dict):
+    """ETag version of a list response: the requested rows for ?ids=, otherwise the page"""
+    if params.get("include"):
+        return None  # Included rows aren't covered by the version
+    ids = parse_ids(params.get("ids"))
+    if ids is not None:
+        return ids_version(db, Department, ids)
+    return page_version(
+        db,
+        _list_query(db, params.get("org_id"), params.get("filters"), params.get("sort")),
+        params["skip"],
+        params["limit"]
+    )
+
 @router.get(
     "/",
     response_model=List[DepartmentResponse],
@@ -22,16 +63,32 @@ router = APIRouter(
     Retrieve a list of all departments.
     
     - Supports pagination through skip/limit parameters
+    - Supports index-backed filtering and sorting through filter/sort parameters
+    - Fetches a batch of records by ID with ids=1,2,3 (existing ones, in requested order)
+    - Embeds related records with include=..., eager loaded with a fixed number of queries
     - Can be filtered by organization ID
     - Returns a list of departments with their basic information
     """,
     response_description="List of departments"
 )
+@cached_route(
+    List[DepartmentResponse],
+    settings.CACHE_TTL_LIST,
+    tags=lambda depts, params: list_tags("department"),
+    when=lambda params: not params.get("skip") and not params.get("include"),
+    version=_list_version
+)
 def list_departments(
     skip: int = 0,
     limit: int = 100,
     org_id: int = None,
-    db: Session = Depends(get_db_session)
+    fields: str = None,
+    include: str = None,
+    filters: List[str] = Query(None, alias="filter"),
+    sort: str = None,
+    ids: str = None,
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """
     List all departments with pagination and filtering support.
@@ -40,14 +97,75 @@ def list_departments(
     - skip: Number of records to skip (offset)
     - limit: Maximum number of records to return
     - org_id: Optional organization ID filter
+    - fields: Optional comma-separated list of fields to return
+    - include: Optional comma-separated relationships to embed, dotted for nesting, e.g. head,parent.organization
+    - filter: Optional Column:operator:value conditions (repeatable), e.g. Name:prefix:Eng
+    - sort: Optional comma-separated sort columns, "-" for descending, e.g. -UpdatedAt
+    - ids: Optional comma-separated IDs to fetch in one query (other filters and paging are ignored)
     
     Returns:
     - List of departments with their details
     """
-    query = db.query(Department)
-    if org_id:
-        query = query.filter(Department.OrganizationID == org_id)
-    return query.offset(skip).limit(limit).all()
+    selected = select_fields(fields, Department, DepartmentResponse)
+    includes = parse_includes(include, Department)
+    check_include_fields(includes, selected)
+    requested = parse_ids(ids)
+    if requested is not None:
+        return load_response(loaders, Department, requested, DepartmentResponse, selected, includes)
+    query = _list_query(db, org_id, filters, sort).offset(skip).limit(limit)
+    if includes:
+        return include_response(with_includes(query, Department, includes).all(), Department, includes)
+    if selected or settings.FAST_LIST_SERIALIZATION:
+        return list_response(query, Department, DepartmentResponse, selected)
+    return query.all()
+
+@router.get(
+    "/export",
+    summary="Export Departments",
+    description="""
+    Stream all departments as NDJSON or CSV.
+    
+    - format: "ndjson" (default) or "csv"
+    - Can be filtered by organization ID
+    - Rows are streamed from a server-side cursor, so any table size can be exported
+    """,
+    response_description="Department rows in the requested format"
+)
+def export_departments(
+    format: str = "ndjson",
+    org_id: int = None
+):
+    """
+    Export departments without pagination.
+    
+    Parameters:
+    - format: Output format, "ndjson" or "csv"
+    - org_id: Optional organization ID filter
+    """
+    return export_response(lambda db: _list_query(db, org_id), Department, DepartmentResponse, format, "departments")
+
+@router.get(
+    "/changes",
+    response_model=ChangesPage[DepartmentResponse],
+    summary="Department Changes",
+    description="""
+    Incremental sync: departments changed or deleted since a cursor.
+    
+    - since: cursor returned by the previous call; omit it for a full first sync
+    - limit: changes per page (at most DELTA_SYNC_MAX_LIMIT)
+    - Apply deleted (primary keys of removed rows), then items (current rows)
+    - Call again with the returned cursor while has_more is true
+    - 410 when the cursor is older than the tombstone retention: sync again without since
+    """,
+    response_description="Changed departments, deleted keys and the next cursor"
+)
+def department_changes(
+    since: str = None,
+    limit: int = Query(100, ge=1, le=settings.DELTA_SYNC_MAX_LIMIT),
+    db: Session = Depends(get_db_session)
+):
+    """Keyset page of changes on (UpdatedAt, primary key) plus tombstones (see changes.changes_page)"""
+    return changes_page(db, Department, since, limit)
 
 @router.post(
     "/",
@@ -90,7 +208,8 @@ def list_departments(
 )
 def create_department(
     department: DepartmentCreate,
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """
     Create new department
@@ -106,10 +225,12 @@ def create_department(
     }
     ```
     """
+    _validate_references(department.model_dump(), loaders)
     db_dept = Department(**department.model_dump())
     db.add(db_dept)
     db.commit()
     db.refresh(db_dept)
+    invalidate_entity("department", db_dept.DepartmentID, org_ids=[db_dept.OrganizationID])
     return db_dept
 
 @router.get(
@@ -136,8 +257,18 @@ def create_department(
         }
     }
 )
+@cached_route(
+    DepartmentResponse,
+    settings.CACHE_TTL_ENTITY,
+    tags=lambda dept, params: entity_tags("department", params["dept_id"]),
+    local=True,
+    when=lambda params: not params.get("include"),
+    version=lambda db, params: None if params.get("include") else entity_version(db, Department, params["dept_id"])
+)
 def get_department(
     dept_id: int,
+    fields: str = None,
+    include: str = None,
     db: Session = Depends(get_db_session)
 ):
     """
@@ -145,14 +276,26 @@ def get_department(
     
     Parameters:
     - dept_id: Department ID (integer)
+    - fields: Optional comma-separated list of fields to return
+    - include: Optional comma-separated relationships to embed, dotted for nesting, e.g. head,parent.organization
     
     Returns:
     - Department details if found
     - 404 error if not found
     """
-    db_dept = db.query(Department).filter(Department.DepartmentID == dept_id).first()
+    query = db.query(Department).filter(Department.DepartmentID == dept_id)
+    selected = select_fields(fields, Department, DepartmentResponse)
+    includes = parse_includes(include, Department)
+    check_include_fields(includes, selected)
+    if includes:
+        query = with_includes(query, Department, includes)
+    db_dept = project(query, Department, selected).first() if selected else query.first()
     if not db_dept:
         raise HTTPException(status_code=404, detail="Department not found")
+    if selected:
+        return projected_response(db_dept, DepartmentResponse, selected)
+    if includes:
+        return include_response(db_dept, Department, includes)
     return db_dept
 
 @router.put(
@@ -194,7 +337,8 @@ def get_department(
 def update_department(
     dept_id: int,
     department: DepartmentUpdate,
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """
     Update department
@@ -208,15 +352,28 @@ def update_department(
     }
     ```
     """
-    db_dept = db.query(Department).filter(Department.DepartmentID == dept_id).first()
+    data = department.model_dump(exclude_unset=True)
+    # The row and its new parent are fetched together; the parent check reuses the batch
+    loaders[Department].prime(dept_id, data.get("ParentDepartmentID"))
+    db_dept = loaders[Department].load(dept_id)
     if not db_dept:
         raise HTTPException(status_code=404, detail="Department not found")
     
-    for field, value in department.model_dump(exclude_unset=True).items():
+    _validate_references(data, loaders)
+    
+    old_org_id = db_dept.OrganizationID
+    for field, value in data.items():
         setattr(db_dept, field, value)
     
     db.commit()
     db.refresh(db_dept)
+    invalidate_entity("department", dept_id, org_ids=[old_org_id, db_dept.OrganizationID])
+    if db_dept.OrganizationID != old_org_id:
+        # Positions belong to the organization of their department (search index, org scopes)
+        position_ids = [position_id for (position_id,) in db.query(PositionJob.PositionID).filter(
+            PositionJob.DepartmentID == dept_id
+        )]
+        cache.invalidate(*(f"position:{position_id}" for position_id in position_ids))
     return db_dept
 
 @router.delete(
@@ -227,42 +384,68 @@ def update_department(
     Delete a department and handle related data.
     
     Warning: This operation will:
-    - Delete all positions in this department
+    - Delete all positions in this department and their assignments
     - Remove department head association
-    - Update parent references of child departments
+    - Detach child departments (their parent reference is cleared)
     
-    Note: Cannot delete a department that has:
-    - Active employees in positions
-    - Child departments (must be moved or deleted first)
+    Rows are deleted with set-based, chunked DELETEs. Departments with more
+    than CASCADE_INLINE_MAX_ROWS dependent rows, and whole subtrees, are
+    deleted in the background: POST /cascades/department/{dept_id}.
     """,
     responses={
         404: {"description": "Department not found"},
-        409: {
-            "description": "Cannot delete department with dependencies",
+        409: {"description": "Too many dependent rows to delete within the request"}
+    }
+)
+def delete_department(
+    dept_id: int,
+    db: Session = Depends(get_db_session)
+):
+    """Delete department with its positions"""
+    db_dept = db.query(Department).filter(Department.DepartmentID == dept_id).first()
+    if not db_dept:
+        raise HTTPException(status_code=404, detail="Department not found")
+    
+    cascade = department_cascade(db, dept_id, subtree=False)
+    check_inline(cascade.count(db), "department", dept_id)
+    db.expunge(db_dept)  # Keep the loaded row for the response
+    cascade.run(db)
+    return db_dept 
+
+@router.get(
+    "/{dept_id}/headcount",
+    response_model=DepartmentHeadcount,
+    summary="Get Department Headcount",
+    description="""
+    Headcount of a department.
+    
+    - direct: Employees holding a not yet ended position in the department
+    - total: Direct headcount plus that of all subdepartments
+    
+    Read from counters maintained by the write endpoints and reconciled periodically.
+    """,
+    responses={
+        404: {
+            "description": "Department not found",
             "content": {
                 "application/json": {
-                    "examples": {
-                        "Has Employees": {
-                            "value": {"detail": "Department has active employees"}
-                        },
-                        "Has Children": {
-                            "value": {"detail": "Department has child departments"}
-                        }
-                    }
+                    "example": {"detail": "Department not found"}
                 }
             }
         }
     }
 )
-def delete_department(
+def get_department_headcount(
     dept_id: int,
     db: Session = Depends(get_db_session)
 ):
-    """Delete department if it has no dependencies"""
-    db_dept = db.query(Department).filter(Department.DepartmentID == dept_id).first()
-    if not db_dept:
-        raise HTTPException(status_code=404, detail="Department not found")
+    """
+    Get department headcount
     
-    db.delete(db_dept)
-    db.commit()
-    return db_dept 
\ No newline at end of file
+    Parameters:
+    - dept_id: Department ID (integer)
+    """
+    org_id = db.query(Department.OrganizationID).filter(Department.DepartmentID == dept_id).scalar()
+    if org_id is None:
+        raise HTTPException(status_code=404, detail="Department not found")
+    return next(dept for dept in department_headcounts(db, org_id) if dept["DepartmentID"] == dept_id)
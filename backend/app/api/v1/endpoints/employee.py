@@ -1,60 +1,168 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List
+from ....core.cache import cached_route, invalidate_entity, entity_tags, list_tags
+from ....core.changes import changes_page
+from ....core.config import get_settings
+from ....core.counters import adjust_counter, refresh_counters
 from ....core.db import get_db_session
-from ....models.tables import Employee
-from ....schemas.schemas import EmployeeCreate, EmployeeUpdate, EmployeeResponse
+from ....core.etag import entity_version, ids_version, page_version
+from ....core.export import export_response
+from ....core.filtering import filter_query
+from ....core.includes import check_include_fields, include_response, parse_includes, with_includes
+from ....core.loader import Loaders, get_loaders, load_response, parse_ids
+from ....core.projection import list_response, project, projected_response, select_fields
+from ....core.validation import ensure_exists
+from ....models.tables import Employee, EmployeePosition, Organization, PositionJob, TeamMember
+from ....schemas.schemas import ChangesPage, EmployeeCreate, EmployeeUpdate, EmployeeResponse
+
+settings = get_settings()
 
 router = APIRouter()
 
+def _list_query(db: Session, org_id: int = None, filters: List[str] = None, sort: str = None):
+    """Base query of the list endpoint, filtered and sorted, then ordered by primary key for stable pages"""
+    query = db.query(Employee)
+    if org_id:
+        query = query.filter(Employee.OrganizationID == org_id)
+    return filter_query(query, Employee, filters, sort, scoped_by=["OrganizationID"] if org_id else [])
+
+def _list_version(db: Session, params: dict):
+    """ETag version of a list response: the requested rows for ?ids=, otherwise the page"""
+    if params.get("include"):
+        return None  # Included rows aren't covered by the version
+    ids = parse_ids(params.get("ids"))
+    if ids is not None:
+        return ids_version(db, Employee, ids)
+    return page_version(
+        db,
+        _list_query(db, params.get("org_id"), params.get("filters"), params.get("sort")),
+        params["skip"],
+        params["limit"]
+    )
+
 @router.get("/", response_model=List[EmployeeResponse])
+@cached_route(
+    List[EmployeeResponse],
+    settings.CACHE_TTL_LIST,
+    tags=lambda employees, params: list_tags("employee"),
+    when=lambda params: not params.get("skip") and not params.get("include"),
+    version=_list_version
+)
 def list_employees(
     skip: int = 0,
     limit: int = 100,
     org_id: int = None,
+    fields: str = None,
+    include: str = None,
+    filters: List[str] = Query(None, alias="filter"),
+    sort: str = None,
+    ids: str = None,
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """List employees (filtered by organization and filter/sort expressions), or a batch by ?ids=1,2,3; ?include= embeds related records"""
+    selected = select_fields(fields, Employee, EmployeeResponse)
+    includes = parse_includes(include, Employee)
+    check_include_fields(includes, selected)
+    requested = parse_ids(ids)
+    if requested is not None:
+        return load_response(loaders, Employee, requested, EmployeeResponse, selected, includes)
+    query = _list_query(db, org_id, filters, sort).offset(skip).limit(limit)
+    if includes:
+        return include_response(with_includes(query, Employee, includes).all(), Employee, includes)
+    if selected or settings.FAST_LIST_SERIALIZATION:
+        return list_response(query, Employee, EmployeeResponse, selected)
+    return query.all()
+
+@router.get("/export")
+def export_employees(
+    format: str = "ndjson",
+    org_id: int = None,
+    department_id: int = None
+):
+    """Stream all employees as NDJSON or CSV, optionally filtered by organization or department"""
+    def build_query(db: Session):
+        query = _list_query(db, org_id)
+        if department_id:
+            query = query.filter(Employee.EmployeeID.in_(
+                db.query(EmployeePosition.EmployeeID)
+                .join(PositionJob, PositionJob.PositionID == EmployeePosition.PositionID)
+                .filter(PositionJob.DepartmentID == department_id)
+            ))
+        return query
+    return export_response(build_query, Employee, EmployeeResponse, format, "employees")
+
+@router.get("/changes", response_model=ChangesPage[EmployeeResponse])
+def employee_changes(
+    since: str = None,
+    limit: int = Query(100, ge=1, le=settings.DELTA_SYNC_MAX_LIMIT),
     db: Session = Depends(get_db_session)
 ):
-    """List employees, optionally filtered by organization"""
-    query = db.query(Employee)
-    if org_id:
-        query = query.filter(Employee.OrganizationID == org_id)
-    return query.offset(skip).limit(limit).all()
+    """Employees changed or deleted since a sync cursor (omit since for a full first sync); pass the returned cursor to continue"""
+    return changes_page(db, Employee, since, limit)
 
 @router.post("/", response_model=EmployeeResponse)
 def create_employee(
     employee: EmployeeCreate,
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Create new employee"""
     # Check if email already exists
     if db.query(Employee).filter(Employee.Email == employee.Email).first():
         raise HTTPException(status_code=400, detail="Email already registered")
     
+    ensure_exists(loaders[Organization], "organization", employee.OrganizationID, "Organization not found")
+    
     db_employee = Employee(**employee.model_dump())
     db.add(db_employee)
+    adjust_counter(db, "organization", db_employee.OrganizationID, 1)
     db.commit()
     db.refresh(db_employee)
+    invalidate_entity("employee", db_employee.EmployeeID, org_ids=[db_employee.OrganizationID])
     return db_employee
 
 @router.get("/{employee_id}", response_model=EmployeeResponse)
+@cached_route(
+    EmployeeResponse,
+    settings.CACHE_TTL_ENTITY,
+    tags=lambda employee, params: entity_tags("employee", params["employee_id"]),
+    local=True,
+    when=lambda params: not params.get("include"),
+    version=lambda db, params: None if params.get("include") else entity_version(db, Employee, params["employee_id"])
+)
 def get_employee(
     employee_id: int,
+    fields: str = None,
+    include: str = None,
     db: Session = Depends(get_db_session)
 ):
-    """Get employee by ID"""
-    db_employee = db.query(Employee).filter(Employee.EmployeeID == employee_id).first()
+    """Get employee by ID, optionally embedding related records (?include=)"""
+    query = db.query(Employee).filter(Employee.EmployeeID == employee_id)
+    selected = select_fields(fields, Employee, EmployeeResponse)
+    includes = parse_includes(include, Employee)
+    check_include_fields(includes, selected)
+    if includes:
+        query = with_includes(query, Employee, includes)
+    db_employee = project(query, Employee, selected).first() if selected else query.first()
     if not db_employee:
         raise HTTPException(status_code=404, detail="Employee not found")
+    if selected:
+        return projected_response(db_employee, EmployeeResponse, selected)
+    if includes:
+        return include_response(db_employee, Employee, includes)
     return db_employee
 
 @router.put("/{employee_id}", response_model=EmployeeResponse)
 def update_employee(
     employee_id: int,
     employee: EmployeeUpdate,
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Update employee"""
-    db_employee = db.query(Employee).filter(Employee.EmployeeID == employee_id).first()
+    db_employee = loaders[Employee].load(employee_id)
     if not db_employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
@@ -63,11 +171,19 @@ def update_employee(
         if db.query(Employee).filter(Employee.Email == employee.Email).first():
             raise HTTPException(status_code=400, detail="Email already registered")
     
-    for field, value in employee.model_dump(exclude_unset=True).items():
+    data = employee.model_dump(exclude_unset=True)
+    ensure_exists(loaders[Organization], "organization", data.get("OrganizationID"), "Organization not found")
+    
+    old_org_id = db_employee.OrganizationID
+    for field, value in data.items():
         setattr(db_employee, field, value)
     
+    if db_employee.OrganizationID != old_org_id:
+        adjust_counter(db, "organization", old_org_id, -1)
+        adjust_counter(db, "organization", db_employee.OrganizationID, 1)
     db.commit()
     db.refresh(db_employee)
+    invalidate_entity("employee", employee_id, org_ids=[old_org_id, db_employee.OrganizationID])
     return db_employee
 
 @router.delete("/{employee_id}", response_model=EmployeeResponse)
@@ -80,6 +196,17 @@ def delete_employee(
     if not db_employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
+    team_ids = [team_id for (team_id,) in db.query(TeamMember.TeamID).filter(TeamMember.EmployeeID == employee_id)]
+    dept_ids = [dept_id for (dept_id,) in db.query(PositionJob.DepartmentID).join(
+        EmployeePosition, EmployeePosition.PositionID == PositionJob.PositionID
+    ).filter(EmployeePosition.EmployeeID == employee_id).distinct()]
+    
     db.delete(db_employee)
+    db.flush()
+    adjust_counter(db, "organization", db_employee.OrganizationID, -1)
+    for team_id in team_ids:
+        adjust_counter(db, "team", team_id, -1)
+    refresh_counters(db, "department", dept_ids)
     db.commit()
+    invalidate_entity("employee", employee_id, org_ids=[db_employee.OrganizationID], deleted=True)
     return db_employee 
\ No newline at end of file
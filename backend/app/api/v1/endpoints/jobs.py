@@ -0,0 +1,51 @@
+from fastapi import APIRouter, HTTPException
+from ....core.jobs import JOB_TYPES, job_queue
+from ....core import tasks  # noqa: F401 (registers the job types)
+from ....schemas.schemas import JobCreate, JobResponse
+
+router = APIRouter()
+
+@router.get("/")
+def list_job_types():
+    """Registered job types with their description, concurrency limit and queued/running jobs"""
+    stats = job_queue.stats()
+    return {
+        name: {
+            "description": JOB_TYPES[name].description,
+            "max_retries": JOB_TYPES[name].max_retries,
+            "api": JOB_TYPES[name].api,
+            **stats[name]
+        }
+        for name in sorted(JOB_TYPES)
+    }
+
+@router.post("/", response_model=JobResponse, status_code=202)
+def enqueue_job(job: JobCreate):
+    """
+    Queue a background job, run by the worker processes (python -m app.cli.worker).
+
+    Failed attempts are retried with exponential backoff up to the type's
+    max_retries. Poll GET /jobs/{id} for its status, progress and result.
+    Types listed with api=false (bulk_import) are queued by their CLI only.
+    """
+    if job.type in JOB_TYPES and not JOB_TYPES[job.type].api:
+        raise HTTPException(status_code=403, detail=f"Job type {job.type} can't be queued through the API")
+    return job_queue.enqueue(job.type, job.params)
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: str):
+    """Status, progress and result (or error) of a job; finished jobs are kept for JOBS_RESULT_TTL seconds"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+def cancel_job(job_id: str):
+    """
+    Cancel a job.
+
+    Queued jobs are cancelled at once; running jobs stop at their next
+    cancellation check (cascade deletes: after the current chunk).
+    """
+    return job_queue.cancel(job_id)
@@ -1,9 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, Query
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, selectinload
 from typing import List
+from ....core.cache import cached_route, invalidate_entity, entity_tags, list_tags, org_tag
+from ....core.cascade import check_inline, organization_cascade
+from ....core.changes import changes_page
+from ....core.config import get_settings
+from ....core.counters import department_headcounts, get_counters
 from ....core.db import get_db_session
-from ....models.tables import Organization
-from ....schemas.schemas import OrganizationCreate, OrganizationUpdate, OrganizationResponse
+from ....core.etag import entity_version, ids_version, page_version
+from ....core.export import export_response
+from ....core.filtering import filter_query
+from ....core.includes import check_include_fields, include_response, parse_includes, with_includes
+from ....core.loader import Loaders, get_loaders, load_response, parse_ids
+from ....core.projection import list_response, project, projected_response, select_fields
+from ....core.validation import ensure_exists
+from ....models.tables import Organization, Department, PositionJob, Team
+from ....schemas.schemas import (
+    ChangesPage, OrganizationCreate, OrganizationUpdate, OrganizationResponse, OrganizationChart, OrganizationHeadcount
+)
+
+settings = get_settings()
 
 router = APIRouter(
     prefix="/organizations",
@@ -14,6 +31,24 @@ router = APIRouter(
     }
 )
 
+def _list_query(db: Session, filters: List[str] = None, sort: str = None):
+    """Base query of the list endpoint, filtered and sorted, then ordered by primary key for stable pages"""
+    return filter_query(db.query(Organization), Organization, filters, sort)
+
+def _list_version(db: Session, params: dict):
+    """ETag version of a list response: the requested rows for ?ids=, otherwise the page"""
+    if params.get("include"):
+        return None  # Included rows aren't covered by the version
+    ids = parse_ids(params.get("ids"))
+    if ids is not None:
+        return ids_version(db, Organization, ids)
+    return page_version(
+        db,
+        _list_query(db, params.get("filters"), params.get("sort")),
+        params["skip"],
+        params["limit"]
+    )
+
 @router.get(
     "/",
     response_model=List[OrganizationResponse],
@@ -22,14 +57,30 @@ router = APIRouter(
     Retrieve a list of all organizations.
     
     - Supports pagination through skip/limit parameters
+    - Supports index-backed filtering and sorting through filter/sort parameters
+    - Fetches a batch of records by ID with ids=1,2,3 (existing ones, in requested order)
+    - Embeds related records with include=..., eager loaded with a fixed number of queries
     - Returns a list of organizations with their basic information
     """,
     response_description="List of organizations"
 )
+@cached_route(
+    List[OrganizationResponse],
+    settings.CACHE_TTL_LIST,
+    tags=lambda orgs, params: list_tags("organization"),
+    when=lambda params: not params.get("skip") and not params.get("include"),
+    version=_list_version
+)
 def list_organizations(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db_session)
+    fields: str = None,
+    include: str = None,
+    filters: List[str] = Query(None, alias="filter"),
+    sort: str = None,
+    ids: str = None,
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """
     List all organizations with pagination support.
@@ -37,11 +88,80 @@ def list_organizations(
     Parameters:
     - skip: Number of records to skip (offset)
     - limit: Maximum number of records to return
+    - fields: Optional comma-separated list of fields to return
+    - include: Optional comma-separated relationships to embed, dotted for nesting, e.g. top_department.head,teams
+    - filter: Optional Column:operator:value conditions (repeatable), e.g. Name:prefix:Eng
+    - sort: Optional comma-separated sort columns, "-" for descending, e.g. -UpdatedAt
+    - ids: Optional comma-separated IDs to fetch in one query (other filters and paging are ignored)
     
     Returns:
     - List of organizations with their details
     """
-    return db.query(Organization).offset(skip).limit(limit).all()
+    selected = select_fields(fields, Organization, OrganizationResponse)
+    includes = parse_includes(include, Organization)
+    check_include_fields(includes, selected)
+    requested = parse_ids(ids)
+    if requested is not None:
+        return load_response(loaders, Organization, requested, OrganizationResponse, selected, includes)
+    query = _list_query(db, filters, sort).offset(skip).limit(limit)
+    if includes:
+        return include_response(with_includes(query, Organization, includes).all(), Organization, includes)
+    if selected or settings.FAST_LIST_SERIALIZATION:
+        return list_response(query, Organization, OrganizationResponse, selected)
+    return query.all()
+
+@router.get(
+    "/export",
+    summary="Export Organizations",
+    description="""
+    Stream all organizations as NDJSON or CSV.
+    
+    - format: "ndjson" (default) or "csv"
+    - Can be narrowed to a single organization ID
+    - Rows are streamed from a server-side cursor, so any table size can be exported
+    """,
+    response_description="Organization rows in the requested format"
+)
+def export_organizations(
+    format: str = "ndjson",
+    org_id: int = None
+):
+    """
+    Export organizations without pagination.
+    
+    Parameters:
+    - format: Output format, "ndjson" or "csv"
+    - org_id: Optional organization ID filter
+    """
+    def build_query(db: Session):
+        query = _list_query(db)
+        if org_id:
+            query = query.filter(Organization.OrganizationID == org_id)
+        return query
+    return export_response(build_query, Organization, OrganizationResponse, format, "organizations")
+
+@router.get(
+    "/changes",
+    response_model=ChangesPage[OrganizationResponse],
+    summary="Organization Changes",
+    description="""
+    Incremental sync: organizations changed or deleted since a cursor.
+    
+    - since: cursor returned by the previous call; omit it for a full first sync
+    - limit: changes per page (at most DELTA_SYNC_MAX_LIMIT)
+    - Apply deleted (primary keys of removed rows), then items (current rows)
+    - Call again with the returned cursor while has_more is true
+    - 410 when the cursor is older than the tombstone retention: sync again without since
+    """,
+    response_description="Changed organizations, deleted keys and the next cursor"
+)
+def organization_changes(
+    since: str = None,
+    limit: int = Query(100, ge=1, le=settings.DELTA_SYNC_MAX_LIMIT),
+    db: Session = Depends(get_db_session)
+):
+    """Keyset page of changes on (UpdatedAt, primary key) plus tombstones (see changes.changes_page)"""
+    return changes_page(db, Organization, since, limit)
 
 @router.post(
     "/",
@@ -65,7 +185,8 @@ def list_organizations(
 )
 def create_organization(
     organization: OrganizationCreate,
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """
     Create new organization
@@ -81,10 +202,12 @@ def create_organization(
     }
     ```
     """
+    ensure_exists(loaders[Department], "department", organization.TopDepartmentID, "Department not found")
     db_org = Organization(**organization.model_dump())
     db.add(db_org)
     db.commit()
     db.refresh(db_org)
+    invalidate_entity("organization", db_org.OrganizationID)
     return db_org
 
 @router.get(
@@ -110,8 +233,18 @@ def create_organization(
         }
     }
 )
+@cached_route(
+    OrganizationResponse,
+    settings.CACHE_TTL_ENTITY,
+    tags=lambda org, params: entity_tags("organization", params["org_id"]),
+    local=True,
+    when=lambda params: not params.get("include"),
+    version=lambda db, params: None if params.get("include") else entity_version(db, Organization, params["org_id"])
+)
 def get_organization(
     org_id: int,
+    fields: str = None,
+    include: str = None,
     db: Session = Depends(get_db_session)
 ):
     """
@@ -119,14 +252,26 @@ def get_organization(
     
     Parameters:
     - org_id: Organization ID (integer)
+    - fields: Optional comma-separated list of fields to return
+    - include: Optional comma-separated relationships to embed, dotted for nesting, e.g. top_department.head,teams
     
     Returns:
     - Organization details if found
     - 404 error if not found
     """
-    db_org = db.query(Organization).filter(Organization.OrganizationID == org_id).first()
+    query = db.query(Organization).filter(Organization.OrganizationID == org_id)
+    selected = select_fields(fields, Organization, OrganizationResponse)
+    includes = parse_includes(include, Organization)
+    check_include_fields(includes, selected)
+    if includes:
+        query = with_includes(query, Organization, includes)
+    db_org = project(query, Organization, selected).first() if selected else query.first()
     if not db_org:
         raise HTTPException(status_code=404, detail="Organization not found")
+    if selected:
+        return projected_response(db_org, OrganizationResponse, selected)
+    if includes:
+        return include_response(db_org, Organization, includes)
     return db_org
 
 @router.put(
@@ -147,7 +292,8 @@ def get_organization(
 def update_organization(
     org_id: int,
     organization: OrganizationUpdate,
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """
     Update organization
@@ -160,15 +306,19 @@ def update_organization(
     }
     ```
     """
-    db_org = db.query(Organization).filter(Organization.OrganizationID == org_id).first()
+    db_org = loaders[Organization].load(org_id)
     if not db_org:
         raise HTTPException(status_code=404, detail="Organization not found")
     
-    for field, value in organization.model_dump(exclude_unset=True).items():
+    data = organization.model_dump(exclude_unset=True)
+    ensure_exists(loaders[Department], "department", data.get("TopDepartmentID"), "Department not found")
+    
+    for field, value in data.items():
         setattr(db_org, field, value)
     
     db.commit()
     db.refresh(db_org)
+    invalidate_entity("organization", org_id, org_ids=[org_id])
     return db_org
 
 @router.delete(
@@ -181,12 +331,17 @@ def update_organization(
     Warning: This operation will also delete:
     - All departments in the organization
     - All positions in those departments
-    - All team memberships
-    - All employee associations
+    - All teams and team memberships
+    - All employees and their position assignments
+    
+    Rows are deleted with set-based, chunked DELETEs. Organizations with more
+    than CASCADE_INLINE_MAX_ROWS dependent rows must be deleted in the
+    background (POST /cascades/organization/{org_id}); GET on the same path
+    counts them.
     """,
     responses={
         404: {"description": "Organization not found"},
-        409: {"description": "Cannot delete organization with active dependencies"}
+        409: {"description": "Too many dependent rows to delete within the request"}
     }
 )
 def delete_organization(
@@ -198,6 +353,176 @@ def delete_organization(
     if not db_org:
         raise HTTPException(status_code=404, detail="Organization not found")
     
-    db.delete(db_org)
-    db.commit()
-    return db_org 
\ No newline at end of file
+    cascade = organization_cascade(db, org_id)
+    check_inline(cascade.count(db), "organization", org_id)
+    db.expunge(db_org)  # Keep the loaded row for the response
+    cascade.run(db)
+    return db_org
+
+def _columns(obj) -> dict:
+    """Plain dict of an ORM instance's column attributes"""
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+def _tree(nodes: List[dict], id_field: str, parent_field: str, children_field: str) -> List[dict]:
+    """Link flat nodes into a forest through their parent reference"""
+    by_id = {node[id_field]: node for node in nodes}
+    roots = []
+    for node in nodes:
+        node.setdefault(children_field, [])
+        parent = by_id.get(node[parent_field])
+        if parent is None:
+            roots.append(node)
+        else:
+            parent.setdefault(children_field, []).append(node)
+    return roots
+
+def _build_org_chart(db: Session, db_org: Organization) -> bytes:
+    """
+    Load an organization's full structure in a fixed number of queries
+    and serialize it as a JSON blob.
+    
+    Queries issued (independent of organization size):
+    - departments of the organization
+    - positions of those departments (one IN query)
+    - employees holding those positions (one IN query)
+    - teams of the organization
+    - members of those teams (one IN query)
+    """
+    departments = (
+        db.query(Department)
+        .options(selectinload(Department.positions).selectinload(PositionJob.employees))
+        .filter(Department.OrganizationID == db_org.OrganizationID)
+        .all()
+    )
+    teams = (
+        db.query(Team)
+        .options(selectinload(Team.members))
+        .filter(Team.OrganizationID == db_org.OrganizationID)
+        .all()
+    )
+
+    department_nodes = [
+        {
+            **_columns(dept),
+            "positions": [
+                {**_columns(pos), "employees": [_columns(emp) for emp in pos.employees]}
+                for pos in dept.positions
+            ]
+        }
+        for dept in departments
+    ]
+    team_nodes = [
+        {**_columns(team), "members": [_columns(emp) for emp in team.members]}
+        for team in teams
+    ]
+
+    chart = OrganizationChart.model_validate({
+        **_columns(db_org),
+        "departments": _tree(department_nodes, "DepartmentID", "ParentDepartmentID", "subdepartments"),
+        "teams": _tree(team_nodes, "TeamID", "ParentTeamID", "subteams")
+    })
+    return chart.model_dump_json().encode()
+
+@router.get(
+    "/{org_id}/chart",
+    response_model=OrganizationChart,
+    summary="Get Organization Chart",
+    description="""
+    Retrieve the complete structure of an organization in a single call.
+    
+    Includes:
+    - Department hierarchy (root departments with nested subdepartments)
+    - Positions of each department with the employees holding them
+    - Team hierarchy with team members
+    
+    The chart is built with a fixed number of batched queries and cached.
+    The cache is invalidated by any write to the organization or its
+    departments, positions, employees, teams or team memberships.
+    """,
+    responses={
+        404: {
+            "description": "Organization not found",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Organization not found"}
+                }
+            }
+        }
+    }
+)
+@cached_route(
+    OrganizationChart,
+    settings.CACHE_TTL_ORG_CHART,
+    tags=lambda chart, params: [org_tag(params["org_id"])]
+)
+def get_organization_chart(
+    org_id: int,
+    db: Session = Depends(get_db_session)
+):
+    """
+    Get organization chart
+    
+    Parameters:
+    - org_id: Organization ID (integer)
+    
+    Returns:
+    - Nested department, position, employee and team structure
+    - 404 error if organization not found
+    """
+    db_org = db.query(Organization).filter(Organization.OrganizationID == org_id).first()
+    if not db_org:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    return Response(content=_build_org_chart(db, db_org), media_type="application/json")
+
+@router.get(
+    "/{org_id}/headcount",
+    response_model=OrganizationHeadcount,
+    summary="Get Organization Headcount",
+    description="""
+    Headcounts of an organization for dashboards.
+    
+    Includes:
+    - Number of employees of the organization
+    - Direct and rolled-up (including subdepartments) headcount of every department
+    - Member count of every team
+    
+    Read from counters maintained by the write endpoints and reconciled
+    periodically, without scanning employees, assignments or memberships.
+    """,
+    responses={
+        404: {
+            "description": "Organization not found",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Organization not found"}
+                }
+            }
+        }
+    }
+)
+def get_organization_headcount(
+    org_id: int,
+    db: Session = Depends(get_db_session)
+):
+    """
+    Get organization headcount
+    
+    Parameters:
+    - org_id: Organization ID (integer)
+    
+    Returns:
+    - Employee count with per-department and per-team breakdown
+    - 404 error if organization not found
+    """
+    if db.query(Organization.OrganizationID).filter(Organization.OrganizationID == org_id).first() is None:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    team_ids = [team_id for (team_id,) in db.query(Team.TeamID).filter(
+        Team.OrganizationID == org_id
+    ).order_by(Team.TeamID)]
+    members = get_counters(db, "team", team_ids)
+    return {
+        "OrganizationID": org_id,
+        "employees": get_counters(db, "organization", [org_id])[org_id],
+        "departments": department_headcounts(db, org_id),
+        "teams": [{"TeamID": team_id, "members": members[team_id]} for team_id in team_ids]
+    }
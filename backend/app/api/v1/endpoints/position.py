@@ -1,64 +1,183 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List
+from ....core.cache import cached_route, invalidate_entity, entity_tags, list_tags
+from ....core.changes import changes_page
+from ....core.config import get_settings
+from ....core.counters import refresh_counters
 from ....core.db import get_db_session
-from ....models.tables import PositionJob
-from ....schemas.schemas import PositionCreate, PositionUpdate, PositionResponse
+from ....core.etag import entity_version, ids_version, page_version
+from ....core.export import export_response
+from ....core.filtering import filter_query
+from ....core.includes import check_include_fields, include_response, parse_includes, with_includes
+from ....core.loader import Loaders, get_loaders, load_response, parse_ids
+from ....core.projection import list_response, project, projected_response, select_fields
+from ....core.validation import ensure_exists
+from ....models.tables import PositionJob, Department
+from ....schemas.schemas import ChangesPage, PositionCreate, PositionUpdate, PositionResponse
+
+settings = get_settings()
 
 router = APIRouter()
 
+def _invalidate_position(db: Session, position_id: int, *dept_ids: int, deleted: bool = False):
+    """Invalidate cached data of a position and the organizations owning its departments"""
+    org_ids = db.query(Department.OrganizationID).filter(
+        Department.DepartmentID.in_(set(dept_ids))
+    ).distinct().all()
+    invalidate_entity("position", position_id, org_ids=[org_id for (org_id,) in org_ids], deleted=deleted)
+
+def _list_query(db: Session, department_id: int = None, filters: List[str] = None, sort: str = None):
+    """Base query of the list endpoint, filtered and sorted, then ordered by primary key for stable pages"""
+    query = db.query(PositionJob)
+    if department_id:
+        query = query.filter(PositionJob.DepartmentID == department_id)
+    return filter_query(query, PositionJob, filters, sort, scoped_by=["DepartmentID"] if department_id else [])
+
+def _list_version(db: Session, params: dict):
+    """ETag version of a list response: the requested rows for ?ids=, otherwise the page"""
+    if params.get("include"):
+        return None  # Included rows aren't covered by the version
+    ids = parse_ids(params.get("ids"))
+    if ids is not None:
+        return ids_version(db, PositionJob, ids)
+    return page_version(
+        db,
+        _list_query(db, params.get("department_id"), params.get("filters"), params.get("sort")),
+        params["skip"],
+        params["limit"]
+    )
+
 @router.get("/", response_model=List[PositionResponse])
+@cached_route(
+    List[PositionResponse],
+    settings.CACHE_TTL_LIST,
+    tags=lambda positions, params: list_tags("position"),
+    when=lambda params: not params.get("skip") and not params.get("include"),
+    version=_list_version
+)
 def list_positions(
     skip: int = 0,
     limit: int = 100,
     department_id: int = None,
+    fields: str = None,
+    include: str = None,
+    filters: List[str] = Query(None, alias="filter"),
+    sort: str = None,
+    ids: str = None,
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """List positions (filtered by department and filter/sort expressions), or a batch by ?ids=1,2,3; ?include= embeds related records"""
+    selected = select_fields(fields, PositionJob, PositionResponse)
+    includes = parse_includes(include, PositionJob)
+    check_include_fields(includes, selected)
+    requested = parse_ids(ids)
+    if requested is not None:
+        return load_response(loaders, PositionJob, requested, PositionResponse, selected, includes)
+    query = _list_query(db, department_id, filters, sort).offset(skip).limit(limit)
+    if includes:
+        return include_response(with_includes(query, PositionJob, includes).all(), PositionJob, includes)
+    if selected or settings.FAST_LIST_SERIALIZATION:
+        return list_response(query, PositionJob, PositionResponse, selected)
+    return query.all()
+
+@router.get("/export")
+def export_positions(
+    format: str = "ndjson",
+    org_id: int = None,
+    department_id: int = None
+):
+    """Stream all positions as NDJSON or CSV, optionally filtered by organization or department"""
+    def build_query(db: Session):
+        query = _list_query(db, department_id)
+        if org_id:
+            query = query.filter(PositionJob.DepartmentID.in_(
+                db.query(Department.DepartmentID).filter(Department.OrganizationID == org_id)
+            ))
+        return query
+    return export_response(build_query, PositionJob, PositionResponse, format, "positions")
+
+@router.get("/changes", response_model=ChangesPage[PositionResponse])
+def position_changes(
+    since: str = None,
+    limit: int = Query(100, ge=1, le=settings.DELTA_SYNC_MAX_LIMIT),
     db: Session = Depends(get_db_session)
 ):
-    """List positions, optionally filtered by department"""
-    query = db.query(PositionJob)
-    if department_id:
-        query = query.filter(PositionJob.DepartmentID == department_id)
-    return query.offset(skip).limit(limit).all()
+    """Positions changed or deleted since a sync cursor (omit since for a full first sync); pass the returned cursor to continue"""
+    return changes_page(db, PositionJob, since, limit)
 
 @router.post("/", response_model=PositionResponse)
 def create_position(
     position: PositionCreate,
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Create new position"""
+    ensure_exists(loaders[Department], "department", position.DepartmentID, "Department not found")
     db_position = PositionJob(**position.model_dump())
     db.add(db_position)
     db.commit()
     db.refresh(db_position)
+    _invalidate_position(db, db_position.PositionID, db_position.DepartmentID)
     return db_position
 
 @router.get("/{position_id}", response_model=PositionResponse)
+@cached_route(
+    PositionResponse,
+    settings.CACHE_TTL_ENTITY,
+    tags=lambda position, params: entity_tags("position", params["position_id"]),
+    local=True,
+    when=lambda params: not params.get("include"),
+    version=lambda db, params: None if params.get("include") else entity_version(db, PositionJob, params["position_id"])
+)
 def get_position(
     position_id: int,
+    fields: str = None,
+    include: str = None,
     db: Session = Depends(get_db_session)
 ):
-    """Get position by ID"""
-    db_position = db.query(PositionJob).filter(PositionJob.PositionID == position_id).first()
+    """Get position by ID, optionally embedding related records (?include=)"""
+    query = db.query(PositionJob).filter(PositionJob.PositionID == position_id)
+    selected = select_fields(fields, PositionJob, PositionResponse)
+    includes = parse_includes(include, PositionJob)
+    check_include_fields(includes, selected)
+    if includes:
+        query = with_includes(query, PositionJob, includes)
+    db_position = project(query, PositionJob, selected).first() if selected else query.first()
     if not db_position:
         raise HTTPException(status_code=404, detail="Position not found")
+    if selected:
+        return projected_response(db_position, PositionResponse, selected)
+    if includes:
+        return include_response(db_position, PositionJob, includes)
     return db_position
 
 @router.put("/{position_id}", response_model=PositionResponse)
 def update_position(
     position_id: int,
     position: PositionUpdate,
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Update position"""
-    db_position = db.query(PositionJob).filter(PositionJob.PositionID == position_id).first()
+    db_position = loaders[PositionJob].load(position_id)
     if not db_position:
         raise HTTPException(status_code=404, detail="Position not found")
     
-    for field, value in position.model_dump(exclude_unset=True).items():
+    data = position.model_dump(exclude_unset=True)
+    ensure_exists(loaders[Department], "department", data.get("DepartmentID"), "Department not found")
+    
+    old_dept_id = db_position.DepartmentID
+    for field, value in data.items():
         setattr(db_position, field, value)
     
+    if db_position.DepartmentID != old_dept_id:
+        db.flush()
+        refresh_counters(db, "department", [old_dept_id, db_position.DepartmentID])
     db.commit()
     db.refresh(db_position)
+    _invalidate_position(db, position_id, old_dept_id, db_position.DepartmentID)
     return db_position
 
 @router.delete("/{position_id}", response_model=PositionResponse)
@@ -72,5 +191,8 @@ def delete_position(
         raise HTTPException(status_code=404, detail="Position not found")
     
     db.delete(db_position)
+    db.flush()
+    refresh_counters(db, "department", [db_position.DepartmentID])
     db.commit()
+    _invalidate_position(db, position_id, db_position.DepartmentID, deleted=True)
     return db_position 
\ No newline at end of file
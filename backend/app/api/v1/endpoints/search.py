@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+from ....core.config import get_settings
+from ....core.db import get_db_session
+from ....core.search import search, search_types
+from ....schemas.schemas import SearchResult
+
+settings = get_settings()
+
+router = APIRouter()
+
+def _check_limit(limit: int):
+    if not 1 <= limit <= settings.SEARCH_MAX_RESULTS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {settings.SEARCH_MAX_RESULTS}")
+
+@router.get("/", response_model=List[SearchResult])
+def search_entities(
+    q: str,
+    org_id: int = None,
+    types: str = None,
+    limit: int = 20,
+    db: Session = Depends(get_db_session)
+):
+    """
+    Ranked full-text search across employees, departments, teams and positions.
+
+    Parameters:
+    - q: Search text
+    - org_id: Optional organization scope
+    - types: Optional comma-separated entity types (employee, department, team, position)
+    - limit: Maximum number of results
+    """
+    _check_limit(limit)
+    return search(db, q, search_types(types), org_id, limit)
+
+@router.get("/autocomplete", response_model=List[SearchResult])
+def autocomplete(
+    q: str,
+    org_id: int = None,
+    types: str = None,
+    limit: int = 10,
+    db: Session = Depends(get_db_session)
+):
+    """Names starting with q across the searchable entity types, ordered by name"""
+    _check_limit(limit)
+    return search(db, q, search_types(types), org_id, limit, prefix=True)
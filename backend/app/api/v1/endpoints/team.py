@@ -1,64 +1,188 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
+from ....core.cache import cached_route, invalidate_entity, entity_tags, list_tags, cache, org_tag
+from ....core.changes import changes_page
+from ....core.config import get_settings
+from ....core.counters import adjust_counter, delete_counters, get_counters
 from ....core.db import get_db_session
-from ....models.tables import Team, TeamMember
-from ....schemas.schemas import TeamCreate, TeamUpdate, TeamResponse, TeamMemberBase
+from ....core.etag import entity_version, ids_version, page_version
+from ....core.export import export_response
+from ....core.filtering import filter_query
+from ....core.includes import check_include_fields, include_response, parse_includes, with_includes
+from ....core.loader import Loaders, get_loaders, load_response, parse_ids
+from ....core.outbox import record_changes
+from ....core.projection import list_response, project, projected_response, select_fields
+from ....core.validation import ensure_exists
+from ....models.tables import Team, TeamMember, Employee, Organization
+from ....schemas.schemas import (
+    ChangesPage, TeamCreate, TeamUpdate, TeamResponse, TeamMemberCreate, TeamMemberResponse, TeamHeadcount
+)
+
+settings = get_settings()
 
 router = APIRouter()
 
+def _validate_references(data: dict, loaders: Loaders):
+    """Check that referenced organization, leader and parent team exist, through the request's loaders"""
+    ensure_exists(loaders[Organization], "organization", data.get("OrganizationID"), "Organization not found")
+    ensure_exists(loaders[Employee], "employee", data.get("TeamLeaderID"), "Employee not found")
+    ensure_exists(loaders[Team], "team", data.get("ParentTeamID"), "Parent team not found")
+
+def _list_query(db: Session, org_id: int = None, filters: List[str] = None, sort: str = None):
+    """Base query of the list endpoint, filtered and sorted, then ordered by primary key for stable pages"""
+    query = db.query(Team)
+    if org_id:
+        query = query.filter(Team.OrganizationID == org_id)
+    return filter_query(query, Team, filters, sort, scoped_by=["OrganizationID"] if org_id else [])
+
+def _list_version(db: Session, params: dict):
+    """ETag version of a list response: the requested rows for ?ids=, otherwise the page"""
+    if params.get("include"):
+        return None  # Included rows aren't covered by the version
+    ids = parse_ids(params.get("ids"))
+    if ids is not None:
+        return ids_version(db, Team, ids)
+    return page_version(
+        db,
+        _list_query(db, params.get("org_id"), params.get("filters"), params.get("sort")),
+        params["skip"],
+        params["limit"]
+    )
+
 @router.get("/", response_model=List[TeamResponse])
+@cached_route(
+    List[TeamResponse],
+    settings.CACHE_TTL_LIST,
+    tags=lambda teams, params: list_tags("team"),
+    when=lambda params: not params.get("skip") and not params.get("include"),
+    version=_list_version
+)
 def list_teams(
     skip: int = 0,
     limit: int = 100,
     org_id: int = None,
-    db: Session = Depends(get_db_session)
+    fields: str = None,
+    include: str = None,
+    filters: List[str] = Query(None, alias="filter"),
+    sort: str = None,
+    ids: str = None,
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
-    """List teams, optionally filtered by organization"""
-    query = db.query(Team)
-    if org_id:
-        query = query.filter(Team.OrganizationID == org_id)
-    return query.offset(skip).limit(limit).all()
+    """List teams (filtered by organization and filter/sort expressions), or a batch by ?ids=1,2,3; ?include= embeds related records"""
+    selected = select_fields(fields, Team, TeamResponse)
+    includes = parse_includes(include, Team)
+    check_include_fields(includes, selected)
+    requested = parse_ids(ids)
+    if requested is not None:
+        return load_response(loaders, Team, requested, TeamResponse, selected, includes)
+    query = _list_query(db, org_id, filters, sort).offset(skip).limit(limit)
+    if includes:
+        return include_response(with_includes(query, Team, includes).all(), Team, includes)
+    if selected or settings.FAST_LIST_SERIALIZATION:
+        return list_response(query, Team, TeamResponse, selected)
+    return query.all()
+
+@router.get("/export")
+def export_teams(
+    format: str = "ndjson",
+    org_id: int = None
+):
+    """Stream all teams as NDJSON or CSV, optionally filtered by organization"""
+    return export_response(lambda db: _list_query(db, org_id), Team, TeamResponse, format, "teams")
 
 @router.post("/", response_model=TeamResponse)
 def create_team(
     team: TeamCreate,
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Create new team"""
+    _validate_references(team.model_dump(), loaders)
     db_team = Team(**team.model_dump())
     db.add(db_team)
     db.commit()
     db.refresh(db_team)
+    invalidate_entity("team", db_team.TeamID, org_ids=[db_team.OrganizationID])
     return db_team
 
+@router.get("/changes", response_model=ChangesPage[TeamResponse])
+def team_changes(
+    since: str = None,
+    limit: int = Query(100, ge=1, le=settings.DELTA_SYNC_MAX_LIMIT),
+    db: Session = Depends(get_db_session)
+):
+    """Teams changed or deleted since a sync cursor (omit since for a full first sync); pass the returned cursor to continue"""
+    return changes_page(db, Team, since, limit)
+
+@router.get("/members/changes", response_model=ChangesPage[TeamMemberResponse])
+def team_member_changes(
+    since: str = None,
+    limit: int = Query(100, ge=1, le=settings.DELTA_SYNC_MAX_LIMIT),
+    db: Session = Depends(get_db_session)
+):
+    """Team memberships changed or deleted since a sync cursor (omit since for a full first sync); pass the returned cursor to continue"""
+    return changes_page(db, TeamMember, since, limit)
+
 @router.get("/{team_id}", response_model=TeamResponse)
+@cached_route(
+    TeamResponse,
+    settings.CACHE_TTL_ENTITY,
+    tags=lambda team, params: entity_tags("team", params["team_id"]),
+    local=True,
+    when=lambda params: not params.get("include"),
+    version=lambda db, params: None if params.get("include") else entity_version(db, Team, params["team_id"])
+)
 def get_team(
     team_id: int,
+    fields: str = None,
+    include: str = None,
     db: Session = Depends(get_db_session)
 ):
-    """Get team by ID"""
-    db_team = db.query(Team).filter(Team.TeamID == team_id).first()
+    """Get team by ID, optionally embedding related records (?include=)"""
+    query = db.query(Team).filter(Team.TeamID == team_id)
+    selected = select_fields(fields, Team, TeamResponse)
+    includes = parse_includes(include, Team)
+    check_include_fields(includes, selected)
+    if includes:
+        query = with_includes(query, Team, includes)
+    db_team = project(query, Team, selected).first() if selected else query.first()
     if not db_team:
         raise HTTPException(status_code=404, detail="Team not found")
+    if selected:
+        return projected_response(db_team, TeamResponse, selected)
+    if includes:
+        return include_response(db_team, Team, includes)
     return db_team
 
 @router.put("/{team_id}", response_model=TeamResponse)
 def update_team(
     team_id: int,
     team: TeamUpdate,
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Update team"""
-    db_team = db.query(Team).filter(Team.TeamID == team_id).first()
+    data = team.model_dump(exclude_unset=True)
+    # The row and its new parent are fetched together; the parent check reuses the batch
+    loaders[Team].prime(team_id, data.get("ParentTeamID"))
+    db_team = loaders[Team].load(team_id)
     if not db_team:
         raise HTTPException(status_code=404, detail="Team not found")
     
-    for field, value in team.model_dump(exclude_unset=True).items():
+    _validate_references(data, loaders)
+    
+    old_org_id = db_team.OrganizationID
+    for field, value in data.items():
         setattr(db_team, field, value)
     
     db.commit()
     db.refresh(db_team)
+    invalidate_entity("team", team_id, org_ids=[old_org_id, db_team.OrganizationID])
     return db_team
 
 @router.delete("/{team_id}", response_model=TeamResponse)
@@ -72,34 +196,165 @@ def delete_team(
         raise HTTPException(status_code=404, detail="Team not found")
     
     db.delete(db_team)
+    delete_counters(db, "team", [team_id])
     db.commit()
+    invalidate_entity("team", team_id, org_ids=[db_team.OrganizationID], deleted=True)
     return db_team
 
 # Team member management endpoints
+def _team_org_id(db: Session, team_id: int) -> int:
+    """Organization of a team (for cache invalidation), 404 if the team doesn't exist"""
+    org_id = db.query(Team.OrganizationID).filter(Team.TeamID == team_id).scalar()
+    if org_id is None:
+        raise HTTPException(status_code=404, detail="Team not found")
+    return org_id
+
+def _members_query(db: Session, team_id: int, employee_ids):
+    return db.query(TeamMember).filter(
+        TeamMember.TeamID == team_id,
+        TeamMember.EmployeeID.in_(employee_ids)
+    ).order_by(TeamMember.EmployeeID)
+
+def _concurrent_change(db: Session):
+    """
+    409 for a member insert that lost a race: another request added one of
+    the employees (or deleted one of them) since the existence checks
+    """
+    db.rollback()
+    raise HTTPException(status_code=409, detail="Team members changed concurrently, retry the request")
+
+@router.get("/{team_id}/members", response_model=List[TeamMemberResponse])
+def list_team_members(
+    team_id: int,
+    after: int = None,
+    limit: int = Query(100, ge=1, le=settings.MEMBERS_MAX_LIMIT),
+    joined_from: date = None,
+    joined_to: date = None,
+    db: Session = Depends(get_db_session)
+):
+    """
+    List team members ordered by EmployeeID, with keyset pagination.
+
+    Pass the last EmployeeID of a page as after to get the next one; each
+    page is a range scan of the (TeamID, EmployeeID) primary key. Members
+    can be filtered by JoinDate (inclusive bounds).
+    """
+    _team_org_id(db, team_id)
+    query = db.query(TeamMember).filter(TeamMember.TeamID == team_id)
+    if after is not None:
+        query = query.filter(TeamMember.EmployeeID > after)
+    if joined_from is not None:
+        query = query.filter(TeamMember.JoinDate >= joined_from)
+    if joined_to is not None:
+        query = query.filter(TeamMember.JoinDate <= joined_to)
+    return query.order_by(TeamMember.EmployeeID).limit(limit).all()
+
 @router.post("/{team_id}/members", response_model=TeamResponse)
 def add_team_member(
     team_id: int,
-    member: TeamMemberBase,
-    db: Session = Depends(get_db_session)
+    member: TeamMemberCreate,
+    db: Session = Depends(get_db_session),
+    loaders: Loaders = Depends(get_loaders)
 ):
-    """Add member to team"""
-    db_team = db.query(Team).filter(Team.TeamID == team_id).first()
-    if not db_team:
+    """Add member to team; returns the team (use the bulk endpoint to get the membership rows)"""
+    db_team = db.get(Team, team_id)
+    if db_team is None:
         raise HTTPException(status_code=404, detail="Team not found")
+    ensure_exists(loaders[Employee], "employee", member.EmployeeID, "Employee not found")
+    if _members_query(db, team_id, [member.EmployeeID]).first():
+        raise HTTPException(status_code=400, detail="Employee is already a team member")
     
     db_member = TeamMember(**member.model_dump(), TeamID=team_id)
     db.add(db_member)
-    db.commit()
+    adjust_counter(db, "team", team_id, 1)
+    try:
+        db.commit()
+    except IntegrityError:
+        _concurrent_change(db)
     db.refresh(db_team)
+    cache.invalidate(org_tag(db_team.OrganizationID))
     return db_team
 
+@router.post("/{team_id}/members/bulk", response_model=List[TeamMemberResponse])
+def add_team_members(
+    team_id: int,
+    members: List[TeamMemberCreate],
+    db: Session = Depends(get_db_session)
+):
+    """
+    Add many members to a team with one multi-row INSERT.
+
+    Employees that are already members are skipped, so syncing a team from
+    a directory can resend the full list. Returns only the added rows.
+    """
+    if len(members) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BULK_MAX_ITEMS} members per request")
+    org_id = _team_org_id(db, team_id)
+    requested = {member.EmployeeID: member for member in members}
+    if not requested:
+        return []
+    
+    found = {employee_id for (employee_id,) in db.query(Employee.EmployeeID).filter(Employee.EmployeeID.in_(requested))}
+    if set(requested) - found:
+        raise HTTPException(status_code=400, detail=f"Employees not found: {sorted(set(requested) - found)}")
+    existing = {employee_id for (employee_id,) in db.query(TeamMember.EmployeeID).filter(
+        TeamMember.TeamID == team_id,
+        TeamMember.EmployeeID.in_(requested)
+    )}
+    new_ids = [employee_id for employee_id in requested if employee_id not in existing]
+    if not new_ids:
+        return []
+    
+    try:
+        db.execute(insert(TeamMember), [
+            {**requested[employee_id].model_dump(), "TeamID": team_id} for employee_id in new_ids
+        ])
+    except IntegrityError:
+        _concurrent_change(db)
+    record_changes(db, TeamMember, "create", [(team_id, employee_id) for employee_id in new_ids],
+                   fields=["TeamID", *TeamMemberCreate.model_fields])
+    adjust_counter(db, "team", team_id, len(new_ids))
+    db.commit()
+    cache.invalidate(org_tag(org_id))
+    return _members_query(db, team_id, new_ids).all()
+
+@router.delete("/{team_id}/members/bulk", response_model=List[TeamMemberResponse])
+def remove_team_members(
+    team_id: int,
+    employee_ids: List[int],
+    db: Session = Depends(get_db_session)
+):
+    """
+    Remove many members from a team with one multi-row DELETE.
+
+    Employees that are not members are ignored. Returns the removed rows.
+    """
+    if len(employee_ids) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BULK_MAX_ITEMS} members per request")
+    org_id = _team_org_id(db, team_id)
+    removed = _members_query(db, team_id, set(employee_ids)).all()
+    if not removed:
+        return []
+    
+    for member in removed:
+        db.expunge(member)  # Keep the loaded rows for the response
+    db.execute(delete(TeamMember).where(
+        TeamMember.TeamID == team_id,
+        TeamMember.EmployeeID.in_([member.EmployeeID for member in removed])
+    ).execution_options(synchronize_session=False))
+    record_changes(db, TeamMember, "delete", [(team_id, member.EmployeeID) for member in removed])
+    adjust_counter(db, "team", team_id, -len(removed))
+    db.commit()
+    cache.invalidate(org_tag(org_id))
+    return removed
+
 @router.delete("/{team_id}/members/{employee_id}", response_model=TeamResponse)
 def remove_team_member(
     team_id: int,
     employee_id: int,
     db: Session = Depends(get_db_session)
 ):
-    """Remove member from team"""
+    """Remove member from team; returns the team (use the bulk endpoint to get the removed rows)"""
     db_member = db.query(TeamMember).filter(
         TeamMember.TeamID == team_id,
         TeamMember.EmployeeID == employee_id
@@ -108,7 +363,20 @@ def remove_team_member(
     if not db_member:
         raise HTTPException(status_code=404, detail="Team member not found")
     
+    db_team = db.get(Team, team_id)
     db.delete(db_member)
+    adjust_counter(db, "team", team_id, -1)
     db.commit()
-    
-    return db.query(Team).filter(Team.TeamID == team_id).first() 
\ No newline at end of file
+    db.refresh(db_team)
+    cache.invalidate(org_tag(db_team.OrganizationID))
+    return db_team
+
+@router.get("/{team_id}/headcount", response_model=TeamHeadcount)
+def get_team_headcount(
+    team_id: int,
+    db: Session = Depends(get_db_session)
+):
+    """Get the member count of a team from its maintained counter"""
+    if db.query(Team.TeamID).filter(Team.TeamID == team_id).first() is None:
+        raise HTTPException(status_code=404, detail="Team not found")
+    return {"TeamID": team_id, "members": get_counters(db, "team", [team_id])[team_id]}
@@ -4,12 +4,21 @@ from .core.logger import setup_logger
 from .core.config import get_settings
 from .api.v1 import api_router
 from .core.middleware import LoggingMiddleware
+from .core.compression import CompressionMiddleware
+from .core.single_flight import SingleFlightMiddleware, single_flight_stats
 from .core.metrics import get_metrics
 from .core.redis_logger import redis_logger
-from .core.db import get_db_session, check_db_health
+from .core.cache import cache
+from .core.counters import counter_reconciler
+from .core.outbox import outbox_relay
+from .core.search import ngram_index
+from .core.local_cache import local_cache
+from .core.db import engine, pool_telemetry
+from .core.introspection import schema_report
+from .core.health import health_monitor
+from .core.admission import concurrency_limit
 from datetime import datetime
-from fastapi import Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import JSONResponse
 
 logger = setup_logger(__name__)
 settings = get_settings()
@@ -39,37 +48,98 @@ app = FastAPI(
     }
 )
 
+# Coalesce identical concurrent GETs innermost, so every coalesced request
+# is still logged and compressed on its own
+app.add_middleware(SingleFlightMiddleware)
+
 # Add logging middleware
 app.add_middleware(LoggingMiddleware)
 
+# Add response compression outside the logging middleware so logs keep
+# the uncompressed body prefix
+app.add_middleware(CompressionMiddleware)
+
 # Include API router with version prefix
 app.include_router(
     api_router,
     prefix=settings.API_V1_PREFIX
 )
 
+@app.on_event("startup")
+def start_cache_listener():
+    """Subscribe to cross-worker cache invalidation messages"""
+    cache.start_listener()
+
+@app.on_event("startup")
+def start_counter_reconciler():
+    """Periodically reconcile materialized headcounts with the source tables"""
+    counter_reconciler.start()
+
+@app.on_event("startup")
+def start_outbox_relay():
+    """Publish committed change events to the change stream"""
+    outbox_relay.start()
+
+@app.on_event("startup")
+def start_search_index_warmup():
+    """Load the in-process search index (tables without FULLTEXT) in the background"""
+    ngram_index.start_warmup()
+
+@app.on_event("startup")
+async def start_health_monitor():
+    """Refresh readiness checks in the background"""
+    health_monitor.start()
+
+@app.on_event("shutdown")
+def stop_cache_listener():
+    """Stop the cache invalidation subscriber"""
+    cache.stop_listener()
+
+@app.on_event("shutdown")
+def stop_counter_reconciler():
+    """Stop the headcount reconciliation thread"""
+    counter_reconciler.stop()
+
+@app.on_event("shutdown")
+def stop_outbox_relay():
+    """Stop the outbox relay thread"""
+    outbox_relay.stop()
+
+@app.on_event("shutdown")
+def stop_health_monitor():
+    """Stop the readiness refresh task"""
+    health_monitor.stop()
+
+@app.get("/livez", tags=["System"])
+async def liveness():
+    """Liveness probe: the process serves requests (touches no backends)"""
+    return {"status": "alive"}
+
+@app.get("/readyz", tags=["System"])
+async def readiness():
+    """
+    Readiness probe: Redis and database reachable.
+
+    Answered from the health monitor's cached result (see HEALTH_CACHE_TTL);
+    503 while any check fails.
+    """
+    status = await health_monitor.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 @app.get("/health", tags=["System"])
-async def health_check(db: AsyncSession = Depends(get_db_session)):
-    """Health check endpoint"""
-    # Check Redis
-    redis_status = "healthy"
-    try:
-        await redis_logger.connect()
-        await redis_logger.redis.ping()
-    except Exception as e:
-        redis_status = f"unhealthy: {str(e)}"
-
-    # Check Database
-    db_healthy, db_message = await check_db_health(db)
-    db_status = "healthy" if db_healthy else f"unhealthy: {db_message}"
-
-    # Overall status is healthy only if all components are healthy
-    overall_status = "healthy" if (redis_status == "healthy" and db_healthy) else "unhealthy"
+async def health_check():
+    """Health check endpoint (cached backend checks, see /readyz)"""
+    status = await health_monitor.status()
+    checks = status["checks"]
+
+    def describe(name: str) -> str:
+        check = checks[name]
+        return "healthy" if check["healthy"] else f"unhealthy: {check['message']}"
 
     return {
-        "status": overall_status,
-        "redis": redis_status,
-        "database": db_status,
+        "status": "healthy" if status["ready"] else "unhealthy",
+        "redis": describe("redis"),
+        "database": describe("database"),
         "timestamp": datetime.utcnow().isoformat(),
         "version": "0.1.0"
     }
@@ -91,7 +161,25 @@ async def root():
 @app.get("/metrics", tags=["System"])
 async def metrics():
     """Get API metrics"""
-    return get_metrics()
+    return {
+        **get_metrics(),
+        "local_cache": local_cache.stats(),
+        "single_flight": single_flight_stats(),
+        "pool": {**pool_telemetry.stats(), "controller": concurrency_limit.stats()}
+    }
+
+@app.get("/schema", tags=["System"])
+def schema():
+    """
+    Database schema with index advice and drift
+
+    Tables, columns, indexes and foreign keys of the database (four
+    information_schema queries), indexes missing for or made redundant
+    by the queries the API issues, and differences from the models and
+    schema.sql. Also available offline: python -m app.cli.schema
+    """
+    with engine.connect() as conn:
+        return schema_report(conn)
 
 @app.get("/logs", tags=["System"])
 async def get_logs(
@@ -0,0 +1,72 @@
+"""
+Bulk import of organization data from CSV or NDJSON files.
+
+Loads organizations, employees, departments, positions, teams, team
+members and assignments (in that order) with multi-row INSERT batches,
+resolving natural keys (organization names, department paths such as
+"Engineering/Backend", employee emails, team and position names) to IDs.
+Rows that exist already are skipped, so an interrupted import can be run
+again. See app.core.bulk_import for the columns of each file.
+
+Usage (from the backend directory):
+    python -m app.cli.bulk_import --organizations orgs.csv --employees people.ndjson ...
+        [--batch-size N] [--load-data] [--enqueue] [--json]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List
+from ..core.bulk_import import FILES, run_import
+
+def print_report(report: dict):
+    print(f"{'table':<14} {'read':>9} {'inserted':>9} {'existing':>9} {'errors':>7} {'seconds':>9} {'rows/s':>9}")
+    for name, stats in report["tables"].items():
+        print(
+            f"{name:<14} {stats['read']:>9} {stats['inserted']:>9} {stats['existing']:>9} {stats['errors']:>7} "
+            f"{stats['seconds']:>9.2f} {stats['rows_per_second'] or '-':>9}"
+        )
+    print(f"\n{report['rows']} rows in {report['seconds']:.2f}s ({report['rows_per_second'] or '-'} rows/s)")
+    for error in report["errors"]:
+        print(f"  {error}")
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for name in FILES:
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=Path, metavar="FILE",
+                            help=f"{name.replace('_', ' ')} (.csv, .ndjson or .jsonl)")
+    parser.add_argument("--batch-size", type=int, help="rows per INSERT batch (default: BULK_IMPORT_BATCH_SIZE)")
+    parser.add_argument("--load-data", action="store_true",
+                        help="load employees, team members and assignments with LOAD DATA LOCAL INFILE (MySQL)")
+    parser.add_argument("--enqueue", action="store_true",
+                        help="run as a bulk_import background job (the files must be readable by the workers)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    files = {name: getattr(args, name) for name in FILES if getattr(args, name) is not None}
+    if not files:
+        parser.error("no files to import")
+    for name, path in files.items():
+        if not path.is_file():
+            parser.error(f"--{name.replace('_', '-')}: no such file: {path}")
+
+    if args.enqueue:
+        from ..core.jobs import job_queue
+        from ..core import tasks  # noqa: F401 (registers the job types)
+        job = job_queue.enqueue("bulk_import", {
+            "files": {name: str(path.resolve()) for name, path in files.items()},
+            "load_data": args.load_data
+        })
+        print(f"Enqueued job {job['id']}: follow it at /api/v1/jobs/{job['id']}")
+        return
+
+    report = run_import(files, args.batch_size, args.load_data)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if report["errors"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
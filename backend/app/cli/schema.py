@@ -0,0 +1,63 @@
+"""
+Schema introspection and index advice.
+
+Prints the indexes missing for the queries the API issues, redundant
+indexes, and drift between the database, the models and schema.sql.
+With --offline no database is needed: schema.sql is checked instead.
+
+Usage (from the backend directory):
+    python -m app.cli.schema [--offline] [--schema-sql PATH] [--json]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List
+from ..core.db import engine
+from ..core.introspection import SCHEMA_SQL, schema_report
+
+def print_report(report: dict):
+    advice = report["advice"]
+    print(f"Source: {report['source']} ({len(report['tables'])} tables)")
+
+    print(f"\nMissing indexes ({len(advice['missing'])}):")
+    for item in advice["missing"]:
+        print(f"  {item['table']} ({', '.join(item['columns'])}) for {item['used_by']}")
+        print(f"    {item['statement']}")
+
+    print(f"\nRedundant indexes ({len(advice['redundant'])}):")
+    for item in advice["redundant"]:
+        print(f"  {item['table']}.{item['index']} ({', '.join(item['columns'])}) is a prefix of {item['covered_by']}")
+        print(f"    {item['statement']}")
+
+    for name, drift in report["drift"].items():
+        if drift is None:
+            print(f"\nDrift from {name}: not checked")
+            continue
+        print(f"\nDrift from {name} ({len(drift)} tables):")
+        for table, differences in drift.items():
+            for kind, items in differences.items():
+                print(f"  {table}: {kind.replace('_', ' ')}" + (f": {', '.join(items)}" if isinstance(items, list) else ""))
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--offline", action="store_true", help="check schema.sql instead of the database")
+    parser.add_argument("--schema-sql", type=Path, default=SCHEMA_SQL, help="DDL file to compare with")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        report = schema_report(schema_path=args.schema_sql)
+    else:
+        with engine.connect() as conn:
+            report = schema_report(conn, args.schema_sql)
+
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print_report(report)
+    # Non-zero when there is advice, so CI can gate schema changes on it
+    return 1 if report["advice"]["missing"] or report["advice"]["redundant"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
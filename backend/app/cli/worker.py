@@ -0,0 +1,58 @@
+"""
+Background job worker pool.
+
+Starts worker processes that claim jobs from the Redis queue (see
+app.core.jobs) and run them, one job at a time per process. Concurrency
+limits per job type hold across all workers. SIGTERM or Ctrl-C stops
+the workers after their current job.
+
+Usage (from the backend directory):
+    python -m app.cli.worker [--processes N] [--types cascade_delete,...] [--burst]
+"""
+import argparse
+import multiprocessing
+import signal
+from typing import List
+from ..core.jobs import JOB_TYPES, Worker
+from ..core import tasks  # noqa: F401 (registers the job types)
+
+def run_worker(names: List[str], burst: bool):
+    """Entry point of a worker process"""
+    worker = Worker(names)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    worker.run(burst=burst)
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=1, help="worker processes to start")
+    parser.add_argument("--types", help="comma-separated job types to run (default: all)")
+    parser.add_argument("--burst", action="store_true", help="exit once no job is runnable")
+    args = parser.parse_args(argv)
+
+    names = args.types.split(",") if args.types else sorted(JOB_TYPES)
+    unknown = set(names) - set(JOB_TYPES)
+    if unknown:
+        parser.error(f"unknown job types: {', '.join(sorted(unknown))} (one of {', '.join(sorted(JOB_TYPES))})")
+    if args.processes == 1:
+        run_worker(names, args.burst)
+        return
+
+    # Spawned, not forked: every process opens its own database and Redis connections
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=(names, args.burst), name=f"worker-{number}")
+        for number in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # The workers got the SIGINT too and finish their current job
+        for process in processes:
+            process.join()
+
+if __name__ == "__main__":
+    main()
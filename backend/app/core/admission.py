@@ -0,0 +1,199 @@
+import hashlib
+import math
+from threading import Lock
+from typing import Tuple
+from fastapi import HTTPException, Request
+from .cache import cache
+from .config import get_settings
+from .db import pool_pressure, pool_telemetry
+from .logger import setup_logger
+from .metrics import increment_counter
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+# Takes one token from each bucket in KEYS, or none if any bucket is empty.
+# ARGV holds rate and capacity per key. Buckets refill continuously from
+# Redis server time, so every worker sees the same clock. Returns
+# {allowed, seconds until the emptiest bucket has a token}.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local tokens = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local capacity = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    available = math.min(capacity, available + math.max(0, now - updated) * rate)
+    tokens[i] = available
+    if available < 1 then
+        wait = math.max(wait, (1 - available) / rate)
+    end
+end
+local allowed = wait == 0 and 1 or 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local capacity = tonumber(ARGV[2 * i])
+    redis.call('HSET', key, 'tokens', tostring(tokens[i] - allowed), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return {allowed, tostring(wait)}
+"""
+
+_token_bucket = None
+
+def client_id(request: Request) -> str:
+    """Rate limit identity: the credentials sent, otherwise the client address"""
+    credentials = request.headers.get("authorization")
+    if credentials:
+        return "auth:" + hashlib.sha1(credentials.encode()).hexdigest()
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+def take_tokens(client: str, route: str) -> Tuple[bool, float]:
+    """
+    Take a token from the client's and the route's bucket.
+
+    Returns (allowed, seconds to wait before retrying). Fails open when
+    Redis is unavailable, so an outage of the limiter doesn't take the API
+    down with it.
+    """
+    global _token_bucket
+    client_rate = settings.RATE_LIMIT_CLIENT_RATE
+    route_rate = settings.RATE_LIMIT_ROUTE_RATES.get(route, settings.RATE_LIMIT_ROUTE_RATE)
+    try:
+        if _token_bucket is None:
+            _token_bucket = cache.connect().register_script(TOKEN_BUCKET_SCRIPT)
+        allowed, wait = _token_bucket(
+            keys=[f"ratelimit:client:{client}", f"ratelimit:route:{route}"],
+            args=[
+                client_rate, max(client_rate * settings.RATE_LIMIT_BURST_SECONDS, 1),
+                route_rate, max(route_rate * settings.RATE_LIMIT_BURST_SECONDS, 1)
+            ]
+        )
+        return bool(allowed), float(wait)
+    except Exception as e:
+        logger.error(f"Rate limiter unavailable, admitting request: {e}")
+        increment_counter("admission", route, "limiter_errors")
+        return True, 0.0
+
+def overloaded() -> bool:
+    """Whether the DB pool is saturated: too many waiting threads or too long checkout waits"""
+    return (
+        pool_pressure.waiting >= settings.LOAD_SHED_QUEUE_DEPTH
+        or pool_pressure.wait_time() >= settings.LOAD_SHED_WAIT
+    )
+
+class AdaptiveConcurrencyLimit:
+    """
+    Per-worker limit on API requests in flight, adjusted from observed load.
+
+    Starts at the pool capacity (DB_POOL_SIZE + DB_MAX_OVERFLOW). Every
+    POOL_CONTROLLER_INTERVAL completed requests the limit is cut by 10%
+    when the average pool checkout wait exceeds POOL_CONTROLLER_TARGET_WAIT
+    or query latency rises above POOL_CONTROLLER_LATENCY_TOLERANCE times
+    its observed minimum, and raised by one while requests queue at the
+    limit otherwise (AIMD). The resulting limit, with the pool's peak
+    in-use gauge, shows what pool size a worker actually needs.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.max_limit = max(settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW, settings.POOL_CONTROLLER_MIN_LIMIT)
+        self.limit = self.max_limit
+        self.in_flight = 0
+        self.completed = 0
+        self.saturated = False  # A request found the limit reached since the last adjustment
+        self.min_latency = None
+
+    def acquire(self) -> bool:
+        with self.lock:
+            if self.in_flight >= self.limit:
+                self.saturated = True
+                return False
+            self.in_flight += 1
+            if self.in_flight == self.limit:
+                self.saturated = True
+            return True
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+            self.completed += 1
+            if self.completed % settings.POOL_CONTROLLER_INTERVAL == 0:
+                self._adjust()
+
+    def _adjust(self):
+        latency = pool_telemetry.latency()
+        if latency:
+            # The baseline forgets slowly, so a permanently slower database
+            # becomes the new normal instead of throttling forever
+            self.min_latency = latency if self.min_latency is None else min(self.min_latency * 1.05, latency)
+        congested = pool_pressure.wait_time() > settings.POOL_CONTROLLER_TARGET_WAIT or (
+            self.min_latency and latency > self.min_latency * settings.POOL_CONTROLLER_LATENCY_TOLERANCE
+        )
+        if congested:
+            self.limit = max(settings.POOL_CONTROLLER_MIN_LIMIT, math.floor(self.limit * 0.9))
+        elif self.saturated:
+            self.limit = min(self.max_limit, self.limit + 1)
+        self.saturated = False
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "enabled": settings.POOL_CONTROLLER_ENABLED,
+                "limit": self.limit,
+                "max_limit": self.max_limit,
+                "in_flight": self.in_flight,
+                "min_latency": self.min_latency
+            }
+
+# Global concurrency limit of this worker (used with POOL_CONTROLLER_ENABLED)
+concurrency_limit = AdaptiveConcurrencyLimit()
+
+def admission_control(request: Request):
+    """
+    Router dependency admitting a request before its endpoint runs.
+
+    - While the DB pool is saturated (see overloaded) requests are shed at
+      once with 503, instead of queueing for DB_POOL_TIMEOUT and failing
+    - Otherwise each request takes a token from its client's and its
+      route's Redis token bucket, shared by all workers; 429 when empty
+    - With POOL_CONTROLLER_ENABLED, requests beyond the adaptive
+      concurrency limit are shed with 503 as well
+
+    All errors carry Retry-After.
+    """
+    endpoint = request.scope.get("endpoint")
+    route = getattr(endpoint, "__name__", request.url.path)
+    if settings.LOAD_SHED_ENABLED and overloaded():
+        increment_counter("admission", route, "shed")
+        raise HTTPException(
+            status_code=503,
+            detail="Service overloaded, retry later",
+            headers={"Retry-After": str(settings.LOAD_SHED_RETRY_AFTER)}
+        )
+    if settings.RATE_LIMIT_ENABLED:
+        allowed, wait = take_tokens(client_id(request), route)
+        if not allowed:
+            increment_counter("admission", route, "rate_limited")
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))}
+            )
+    limited = settings.POOL_CONTROLLER_ENABLED
+    if limited and not concurrency_limit.acquire():
+        increment_counter("admission", route, "limited")
+        raise HTTPException(
+            status_code=503,
+            detail="Service overloaded, retry later",
+            headers={"Retry-After": str(settings.LOAD_SHED_RETRY_AFTER)}
+        )
+    increment_counter("admission", route, "admitted")
+    try:
+        yield
+    finally:
+        if limited:
+            concurrency_limit.release()
@@ -0,0 +1,604 @@
+import csv
+import json
+import os
+import tempfile
+import time
+from datetime import date, datetime
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import bindparam, create_engine, inspect, insert, select, text, tuple_, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from .cache import cache, org_tag
+from .config import get_settings
+from .counters import refresh_counters
+from .db import engine, mysql_url
+from .logger import setup_logger
+from .outbox import TIMESTAMP_FIELDS, record_changes
+from ..models.tables import Department, Employee, EmployeePosition, Organization, PositionJob, Team, TeamMember
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+# Files of an import, in the order they are loaded. Columns (CSV header or
+# NDJSON keys); references use natural keys and are resolved to IDs:
+# - organizations: Name, Address, Phone, Email, Website, TopDepartment (path)
+# - employees: Organization, Name, Email, Phone
+# - departments: Organization, Path ("Engineering/Backend": the parent is
+#   the path without its last part), Description, Head (employee email)
+# - positions: Organization, Department (path), Name, Description
+# - teams: Organization, Name, Description, Leader (employee email), Parent (team name)
+# - team_members: Organization, Team (name), Employee (email), JoinDate
+# - assignments: Employee (email), Organization, Department (path), Position (name), StartDate, EndDate
+# Rows whose natural key exists already are skipped, so an interrupted
+# import can simply be run again.
+FILES = ("organizations", "employees", "departments", "positions", "teams", "team_members", "assignments")
+
+PATH_SEPARATOR = "/"
+
+# Tables loaded with LOAD DATA LOCAL INFILE when enabled (the large, flat ones)
+LOAD_DATA_TABLES = (Employee, TeamMember, EmployeePosition)
+
+# First import errors kept for the report
+MAX_REPORTED_ERRORS = 100
+
+def read_rows(path: Path) -> Iterator[Tuple[int, dict]]:
+    """(line number, row) of a .csv or .ndjson/.jsonl file, with blank values as None"""
+    path = Path(path)
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.suffix.lower() == ".csv":
+            for row in csv.DictReader(f):
+                yield 0, {key.strip(): (value.strip() or None) if isinstance(value, str) else value for key, value in row.items() if key}
+        else:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    row = json.loads(line)
+                    yield number, {key: (value.strip() or None) if isinstance(value, str) else value for key, value in row.items()}
+
+def _numbered(rows: Iterable[Tuple[int, dict]]) -> Iterator[Tuple[int, dict]]:
+    """Number CSV rows by their position (DictReader doesn't track lines of quoted fields)"""
+    for position, (number, row) in enumerate(rows, 1):
+        yield number or position, row
+
+def _batches(rows: Iterable, size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+def _date(value) -> Optional[date]:
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def _tsv(value) -> str:
+    """A value in LOAD DATA's default text format"""
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+class RowError(ValueError):
+    """A row that can't be imported (it is skipped and reported)"""
+
+class TableStats:
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.existing = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "read": self.read,
+            "inserted": self.inserted,
+            "existing": self.existing,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.read / self.seconds) if self.seconds else None
+        }
+
+def import_engine(load_data: bool = False) -> Engine:
+    """The application engine, or a MySQL engine allowing LOAD DATA LOCAL INFILE"""
+    if load_data and engine.dialect.name == "mysql":
+        return create_engine(mysql_url, poolclass=NullPool, connect_args={"local_infile": True})
+    return engine
+
+class BulkImporter:
+    """
+    Load organization data files (see FILES) in dependency order.
+
+    Rows go through SQLAlchemy Core in batches of BULK_IMPORT_BATCH_SIZE:
+    one multi-row INSERT (or LOAD DATA LOCAL INFILE with load_data) and
+    one SELECT resolving the new IDs per batch, each batch committed on
+    its own. Natural keys (organization names, department paths, employee
+    emails, team and position names) are resolved in memory, loading
+    existing rows of an organization once on first use. Each batch writes
+    the change events of its rows (see core.outbox) in its transaction.
+    Afterwards the headcount counters of touched organizations,
+    departments and teams are recomputed and their cached responses
+    invalidated.
+    """
+    def __init__(self, conn: Connection, batch_size: int = None, load_data: bool = False,
+                 progress: Callable[[str, dict], None] = None):
+        self.conn = conn
+        self.batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+        self.load_data = load_data and conn.dialect.name == "mysql"
+        self.progress = progress
+        self.stats: Dict[str, TableStats] = {}
+        self.errors: List[str] = []
+        self.orgs: Dict[str, int] = {}
+        self.employees: Dict[str, int] = {}
+        self.departments: Dict[Tuple[int, str], int] = {}  # (org, path) -> ID
+        self.teams: Dict[Tuple[int, str], int] = {}  # (org, name) -> ID
+        self.positions: Dict[Tuple[int, str], int] = {}  # (department, name) -> ID
+        self._loaded: Set[Tuple[str, int]] = set()  # (kind, org) whose existing rows are known
+        self.touched = {"organization": set(), "department": set(), "team": set()}
+        self.top_departments: List[Tuple[int, str, str]] = []  # (org, path, row reference)
+
+    # Resolution of natural keys
+
+    def _org_id(self, name: Optional[str]) -> int:
+        if not name:
+            raise RowError("Organization is required")
+        if name not in self.orgs:
+            org_id = self.conn.execute(
+                select(Organization.OrganizationID).where(Organization.Name == name).order_by(Organization.OrganizationID).limit(1)
+            ).scalar()
+            if org_id is None:
+                raise RowError(f"Unknown organization: {name}")
+            self.orgs[name] = org_id
+        return self.orgs[name]
+
+    def _resolve_emails(self, emails: Iterable[str]):
+        """Look up the IDs of employees not seen yet"""
+        missing = list({email for email in emails if email and email not in self.employees})
+        for start in range(0, len(missing), self.batch_size):
+            self.employees.update(self.conn.execute(
+                select(Employee.Email, Employee.EmployeeID).where(Employee.Email.in_(missing[start:start + self.batch_size]))
+            ).all())
+
+    def _employee_id(self, email: Optional[str], required: bool = True) -> Optional[int]:
+        if not email:
+            if required:
+                raise RowError("Employee email is required")
+            return None
+        if email not in self.employees:
+            raise RowError(f"Unknown employee: {email}")
+        return self.employees[email]
+
+    def _load_departments(self, org_id: int, reload: bool = False):
+        """Paths of an organization's departments"""
+        if ("department", org_id) in self._loaded and not reload:
+            return
+        rows = self.conn.execute(
+            select(Department.DepartmentID, Department.ParentDepartmentID, Department.Name).where(Department.OrganizationID == org_id)
+        ).all()
+        by_id = {dept_id: (parent_id, name) for dept_id, parent_id, name in rows}
+        paths = {}
+
+        def path(dept_id: int, seen: frozenset) -> str:
+            if dept_id not in paths:
+                parent_id, name = by_id[dept_id]
+                parent = path(parent_id, seen | {dept_id}) if parent_id in by_id and parent_id not in seen else None
+                paths[dept_id] = f"{parent}{PATH_SEPARATOR}{name}" if parent else name
+            return paths[dept_id]
+
+        for dept_id in sorted(by_id):
+            self.departments.setdefault((org_id, path(dept_id, frozenset())), dept_id)
+        self._loaded.add(("department", org_id))
+
+    def _department_id(self, org_id: int, path: Optional[str]) -> int:
+        if not path:
+            raise RowError("Department path is required")
+        self._load_departments(org_id)
+        path = PATH_SEPARATOR.join(part.strip() for part in path.split(PATH_SEPARATOR))
+        if (org_id, path) not in self.departments:
+            raise RowError(f"Unknown department: {path}")
+        return self.departments[(org_id, path)]
+
+    def _load_teams(self, org_id: int, reload: bool = False):
+        if ("team", org_id) in self._loaded and not reload:
+            return
+        for team_id, name in self.conn.execute(
+            select(Team.TeamID, Team.Name).where(Team.OrganizationID == org_id).order_by(Team.TeamID)
+        ):
+            self.teams.setdefault((org_id, name), team_id)
+        self._loaded.add(("team", org_id))
+
+    def _team_id(self, org_id: int, name: Optional[str]) -> int:
+        self._load_teams(org_id)
+        if (org_id, name) not in self.teams:
+            raise RowError(f"Unknown team: {name}")
+        return self.teams[(org_id, name)]
+
+    def _load_positions(self, org_id: int):
+        if ("position", org_id) in self._loaded:
+            return
+        for position_id, dept_id, name in self.conn.execute(
+            select(PositionJob.PositionID, PositionJob.DepartmentID, PositionJob.Name).join(
+                Department, Department.DepartmentID == PositionJob.DepartmentID
+            ).where(Department.OrganizationID == org_id).order_by(PositionJob.PositionID)
+        ):
+            self.positions.setdefault((dept_id, name), position_id)
+        self._loaded.add(("position", org_id))
+
+    # Writing
+
+    def _error(self, table: str, number: int, error: Exception):
+        self.stats[table].errors += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{table} row {number}: {error}")
+
+    def _record_created(self, model, columns: List[str], now: datetime):
+        """
+        Change events for the rows of a batch, found by the UpdatedAt
+        they were all given (indexed; the IDs of a multi-row INSERT aren't
+        returned)
+        """
+        pk = inspect(model).primary_key
+        fields = [column.key for column in pk] + [column for column in columns if column not in TIMESTAMP_FIELDS]
+        keys = self.conn.execute(select(*pk).where(model.UpdatedAt == now)).all()
+        record_changes(self.conn, model, "create", keys, fields)
+
+    def _insert(self, model, rows: List[dict]):
+        """Insert rows (one multi-row statement per batch) with their change events and commit"""
+        if not rows:
+            return
+        now = datetime.utcnow()
+        columns = list(rows[0])
+        if hasattr(model, "CreatedAt"):
+            rows = [{**row, "CreatedAt": now, "UpdatedAt": now} for row in rows]
+        if self.load_data and model in LOAD_DATA_TABLES:
+            try:
+                self._load_data(model, rows)
+                self._record_created(model, columns, now)
+                self.conn.commit()
+                return
+            except DBAPIError as e:
+                self.conn.rollback()
+                logger.warning(f"LOAD DATA LOCAL INFILE unavailable, using INSERT batches: {e}")
+                self.load_data = False
+        self.conn.execute(insert(model), rows)
+        self._record_created(model, columns, now)
+        self.conn.commit()
+
+    def _load_data(self, model, rows: List[dict]):
+        columns = list(rows[0])
+        with tempfile.NamedTemporaryFile("w", suffix=".tsv", encoding="utf-8", newline="\n", delete=False) as f:
+            for row in rows:
+                f.write("\t".join(_tsv(row[column]) for column in columns) + "\n")
+        try:
+            self.conn.execute(text(
+                f"LOAD DATA LOCAL INFILE :path IGNORE INTO TABLE {model.__tablename__} CHARACTER SET utf8mb4 "
+                r"FIELDS TERMINATED BY '\t' ESCAPED BY '\\' LINES TERMINATED BY '\n' "
+                f"({', '.join(columns)})"
+            ), {"path": f.name})
+        finally:
+            os.unlink(f.name)
+
+    def _run(self, table: str, rows: Iterable[Tuple[int, dict]], load: Callable[[List[Tuple[int, dict]]], None]):
+        """Feed rows to load in batches, timing them and reporting progress"""
+        stats = self.stats.setdefault(table, TableStats())
+        start = time.perf_counter() - stats.seconds  # Tables loaded in rounds add up
+        for batch in _batches(_numbered(rows), self.batch_size):
+            stats.read += len(batch)
+            load(batch)
+            stats.seconds = time.perf_counter() - start
+            if self.progress is not None:
+                self.progress(table, stats.as_dict())
+
+    # Tables
+
+    def import_organizations(self, rows: Iterable[Tuple[int, dict]]):
+        def load(batch):
+            stats = self.stats["organizations"]
+            names = [row.get("Name") for _, row in batch if row.get("Name")]
+            self.orgs.update(self.conn.execute(
+                select(Organization.Name, Organization.OrganizationID).where(Organization.Name.in_(names)).order_by(Organization.OrganizationID.desc())
+            ).all())
+            new, pending = [], {}
+            for number, row in batch:
+                name = row.get("Name")
+                if not name:
+                    self._error("organizations", number, RowError("Name is required"))
+                    continue
+                if name in self.orgs or name in pending:
+                    stats.existing += 1
+                else:
+                    pending[name] = row
+                    new.append({column: row.get(column) for column in ("Name", "Address", "Phone", "Email", "Website")})
+                if row.get("TopDepartment"):
+                    self.top_departments.append((name, row["TopDepartment"], f"organizations row {number}"))
+            self._insert(Organization, new)
+            stats.inserted += len(new)
+            self.orgs.update(self.conn.execute(
+                select(Organization.Name, Organization.OrganizationID).where(Organization.Name.in_(list(pending))).order_by(Organization.OrganizationID.desc())
+            ).all())
+        self._run("organizations", rows, load)
+
+    def import_employees(self, rows: Iterable[Tuple[int, dict]]):
+        def load(batch):
+            stats = self.stats["employees"]
+            self._resolve_emails(row.get("Email") for _, row in batch)
+            new, emails = [], set()
+            for number, row in batch:
+                try:
+                    org_id = self._org_id(row.get("Organization"))
+                    if not row.get("Name") or not row.get("Email"):
+                        raise RowError("Name and Email are required")
+                except RowError as e:
+                    self._error("employees", number, e)
+                    continue
+                if row["Email"] in self.employees or row["Email"] in emails:
+                    stats.existing += 1
+                    continue
+                emails.add(row["Email"])
+                new.append({"Name": row["Name"], "Email": row["Email"], "Phone": row.get("Phone"), "OrganizationID": org_id})
+                self.touched["organization"].add(org_id)
+            self._insert(Employee, new)
+            stats.inserted += len(new)
+            self._resolve_emails(emails)
+        self._run("employees", rows, load)
+
+    def import_departments(self, rows: Iterable[Tuple[int, dict]]):
+        """Departments level by level (parents first), so parent paths resolve to IDs"""
+        levels: Dict[int, List[Tuple[int, dict]]] = {}
+        for number, row in _numbered(rows):
+            path = row.get("Path") or ""
+            row["Path"] = PATH_SEPARATOR.join(part.strip() for part in path.split(PATH_SEPARATOR) if part.strip())
+            levels.setdefault(row["Path"].count(PATH_SEPARATOR), []).append((number, row))
+
+        def load(batch):
+            stats = self.stats["departments"]
+            self._resolve_emails(row.get("Head") for _, row in batch)
+            new, orgs, paths = [], set(), set()
+            for number, row in batch:
+                try:
+                    if not row["Path"]:
+                        raise RowError("Path is required")
+                    org_id = self._org_id(row.get("Organization"))
+                    self._load_departments(org_id)
+                    if (org_id, row["Path"]) in self.departments or (org_id, row["Path"]) in paths:
+                        stats.existing += 1
+                        continue
+                    parent_path, _, name = row["Path"].rpartition(PATH_SEPARATOR)
+                    parent_id = self._department_id(org_id, parent_path) if parent_path else None
+                    head_id = self._employee_id(row.get("Head"), required=False)
+                except RowError as e:
+                    self._error("departments", number, e)
+                    continue
+                paths.add((org_id, row["Path"]))
+                orgs.add(org_id)
+                new.append({
+                    "Name": name,
+                    "Description": row.get("Description"),
+                    "ParentDepartmentID": parent_id,
+                    "HeadOfDepartmentID": head_id,
+                    "OrganizationID": org_id
+                })
+            self._insert(Department, new)
+            stats.inserted += len(new)
+            for org_id in orgs:
+                self._load_departments(org_id, reload=True)
+                self.touched["department"].update(dept_id for (org, _), dept_id in self.departments.items() if org == org_id)
+
+        for depth in sorted(levels):
+            self._run("departments", levels[depth], load)
+
+    def set_top_departments(self):
+        """Point organizations at their TopDepartment, once departments exist"""
+        updates = []
+        for name, path, reference in self.top_departments:
+            try:
+                org_id = self._org_id(name)
+                updates.append({"org_id": org_id, "dept_id": self._department_id(org_id, path)})
+            except RowError as e:
+                self.errors.append(f"{reference}: {e}")
+        if updates:
+            self.conn.execute(
+                update(Organization).where(Organization.OrganizationID == bindparam("org_id")).values(
+                    TopDepartmentID=bindparam("dept_id"), UpdatedAt=datetime.utcnow()
+                ),
+                updates
+            )
+            record_changes(self.conn, Organization, "update", [(row["org_id"],) for row in updates], ["TopDepartmentID"])
+            self.conn.commit()
+
+    def import_positions(self, rows: Iterable[Tuple[int, dict]]):
+        def load(batch):
+            stats = self.stats["positions"]
+            new, keys = [], set()
+            for number, row in batch:
+                try:
+                    org_id = self._org_id(row.get("Organization"))
+                    self._load_positions(org_id)
+                    dept_id = self._department_id(org_id, row.get("Department"))
+                    if not row.get("Name"):
+                        raise RowError("Name is required")
+                except RowError as e:
+                    self._error("positions", number, e)
+                    continue
+                key = (dept_id, row["Name"])
+                if key in self.positions or key in keys:
+                    stats.existing += 1
+                    continue
+                keys.add(key)
+                new.append({"Name": row["Name"], "Description": row.get("Description"), "DepartmentID": dept_id})
+            self._insert(PositionJob, new)
+            stats.inserted += len(new)
+            if keys:
+                for position_id, dept_id, name in self.conn.execute(
+                    select(PositionJob.PositionID, PositionJob.DepartmentID, PositionJob.Name).where(
+                        PositionJob.DepartmentID.in_({dept_id for dept_id, _ in keys}),
+                        PositionJob.Name.in_({name for _, name in keys})
+                    ).order_by(PositionJob.PositionID)
+                ):
+                    self.positions.setdefault((dept_id, name), position_id)
+        self._run("positions", rows, load)
+
+    def import_teams(self, rows: Iterable[Tuple[int, dict]]):
+        """Teams in rounds: each round inserts the teams whose parent exists by then"""
+        pending = list(_numbered(rows))
+        stats = self.stats.setdefault("teams", TableStats())
+
+        def load(batch):
+            self._resolve_emails(row.get("Leader") for _, row in batch)
+            new, orgs, keys = [], set(), set()
+            for number, row in batch:
+                try:
+                    org_id = self._org_id(row.get("Organization"))
+                    if not row.get("Name"):
+                        raise RowError("Name is required")
+                    self._load_teams(org_id)
+                    if (org_id, row["Name"]) in self.teams or (org_id, row["Name"]) in keys:
+                        stats.existing += 1
+                        continue
+                    parent_id = self._team_id(org_id, row["Parent"]) if row.get("Parent") else None
+                    leader_id = self._employee_id(row.get("Leader"), required=False)
+                except RowError as e:
+                    self._error("teams", number, e)
+                    continue
+                keys.add((org_id, row["Name"]))
+                orgs.add(org_id)
+                new.append({
+                    "Name": row["Name"],
+                    "Description": row.get("Description"),
+                    "TeamLeaderID": leader_id,
+                    "ParentTeamID": parent_id,
+                    "OrganizationID": org_id
+                })
+            self._insert(Team, new)
+            stats.inserted += len(new)
+            for org_id in orgs:
+                self._load_teams(org_id, reload=True)
+            self.touched["team"].update(self.teams[key] for key in keys)
+
+        while pending:
+            names = {(row.get("Organization"), row.get("Name")) for _, row in pending}
+            # Teams whose parent is another pending team wait for the next round
+            ready = [(n, row) for n, row in pending if not row.get("Parent") or (row.get("Organization"), row["Parent"]) not in names]
+            waiting = [(n, row) for n, row in pending if (n, row) not in ready]
+            if not ready:
+                stats.read += len(waiting)
+                for number, row in waiting:
+                    self._error("teams", number, RowError(f"Parent cycle through team {row.get('Name')}"))
+                break
+            self._run("teams", ready, load)
+            pending = waiting
+
+    def _new_links(self, model, columns: Tuple[str, str], pairs: Set[Tuple[int, int]]) -> Set[Tuple[int, int]]:
+        """Pairs of a junction table's key that aren't stored yet"""
+        if not pairs:
+            return pairs
+        key = [getattr(model, column) for column in columns]
+        existing = self.conn.execute(select(*key).where(tuple_(*key).in_(list(pairs)))).all()
+        return pairs - {tuple(row) for row in existing}
+
+    def import_team_members(self, rows: Iterable[Tuple[int, dict]]):
+        def load(batch):
+            stats = self.stats["team_members"]
+            self._resolve_emails(row.get("Employee") for _, row in batch)
+            links = {}
+            for number, row in batch:
+                try:
+                    org_id = self._org_id(row.get("Organization"))
+                    key = (self._team_id(org_id, row.get("Team")), self._employee_id(row.get("Employee")))
+                    join_date = _date(row.get("JoinDate"))
+                except (RowError, ValueError) as e:
+                    self._error("team_members", number, e)
+                    continue
+                links.setdefault(key, join_date)
+            new = self._new_links(TeamMember, ("TeamID", "EmployeeID"), set(links))
+            self._insert(TeamMember, [{"TeamID": t, "EmployeeID": e, "JoinDate": links[(t, e)]} for t, e in sorted(new)])
+            stats.inserted += len(new)
+            stats.existing += len(links) - len(new)
+            self.touched["team"].update(team_id for team_id, _ in new)
+        self._run("team_members", rows, load)
+
+    def import_assignments(self, rows: Iterable[Tuple[int, dict]]):
+        def load(batch):
+            stats = self.stats["assignments"]
+            self._resolve_emails(row.get("Employee") for _, row in batch)
+            links, departments = {}, {}
+            for number, row in batch:
+                try:
+                    org_id = self._org_id(row.get("Organization"))
+                    self._load_positions(org_id)
+                    dept_id = self._department_id(org_id, row.get("Department"))
+                    position_id = self.positions.get((dept_id, row.get("Position")))
+                    if position_id is None:
+                        raise RowError(f"Unknown position: {row.get('Position')}")
+                    key = (self._employee_id(row.get("Employee")), position_id)
+                    dates = {"StartDate": _date(row.get("StartDate")), "EndDate": _date(row.get("EndDate"))}
+                except (RowError, ValueError) as e:
+                    self._error("assignments", number, e)
+                    continue
+                links.setdefault(key, dates)
+                departments[position_id] = dept_id
+            new = self._new_links(EmployeePosition, ("EmployeeID", "PositionID"), set(links))
+            self._insert(EmployeePosition, [{"EmployeeID": e, "PositionID": p, **links[(e, p)]} for e, p in sorted(new)])
+            stats.inserted += len(new)
+            stats.existing += len(links) - len(new)
+            self.touched["department"].update(departments[position_id] for _, position_id in new)
+        self._run("assignments", rows, load)
+
+    def finish(self):
+        """Recompute the counters of touched scopes and invalidate cached responses"""
+        org_ids = set(self.orgs.values()) | self.touched["organization"]
+        with Session(bind=self.conn) as db:
+            for scope, ids in self.touched.items():
+                ids = sorted(ids)
+                for start in range(0, len(ids), self.batch_size):
+                    refresh_counters(db, scope, ids[start:start + self.batch_size])
+            db.commit()
+        cache.invalidate(
+            *(f"{entity}:all" for entity in ("organization", "department", "employee", "position", "team")),
+            *(org_tag(org_id) for org_id in org_ids)
+        )
+
+    def run(self, files: Dict[str, Path]) -> dict:
+        """Import the given files ({name in FILES: path}) and return the report"""
+        unknown = set(files) - set(FILES)
+        if unknown:
+            raise ValueError(f"Unknown import files: {', '.join(sorted(unknown))} (expected {', '.join(FILES)})")
+        start = time.perf_counter()
+        loaders = {
+            "organizations": self.import_organizations,
+            "employees": self.import_employees,
+            "departments": self.import_departments,
+            "positions": self.import_positions,
+            "teams": self.import_teams,
+            "team_members": self.import_team_members,
+            "assignments": self.import_assignments,
+        }
+        for name in FILES:
+            if name in files:
+                logger.info(f"Importing {name} from {files[name]}")
+                loaders[name](read_rows(files[name]))
+            if name == "departments":
+                self.set_top_departments()
+        self.finish()
+        seconds = time.perf_counter() - start
+        rows = sum(stats.read for stats in self.stats.values())
+        return {
+            "tables": {name: stats.as_dict() for name, stats in self.stats.items()},
+            "rows": rows,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(rows / seconds) if seconds else None,
+            "errors": self.errors
+        }
+
+def run_import(files: Dict[str, Path], batch_size: int = None, load_data: bool = False,
+               progress: Callable[[str, dict], None] = None) -> dict:
+    """Import files on a connection of their own (see BulkImporter)"""
+    import_db = import_engine(load_data)
+    try:
+        with import_db.connect() as conn:
+            return BulkImporter(conn, batch_size, load_data, progress).run(files)
+    finally:
+        if import_db is not engine:
+            import_db.dispose()
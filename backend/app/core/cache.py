@@ -0,0 +1,485 @@
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from functools import wraps
+from typing import Any, Callable, Iterable, Optional, Tuple
+import redis
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from .config import get_settings
+from .etag import Version, etag_matches, make_etag, result_version
+from .local_cache import local_cache
+from .logger import setup_logger
+from .metrics import increment_counter
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+# Deletes every cache entry registered under the given tag sets, then the
+# tag sets themselves, in one atomic step so a concurrent fill can't slip
+# between reading the members and deleting them. KEYS holds the tag sets,
+# then the tags' generation marks: each mark is set to a new value of the
+# generation counter (ARGV[2]), so fills computed from reads that started
+# before this invalidation can tell they are stale (see _FILL_SCRIPT).
+_INVALIDATE_SCRIPT = """
+local count = #KEYS / 2
+local generation = redis.call('INCR', ARGV[2])
+local deleted = 0
+for i = 1, count do
+    local members = redis.call('SMEMBERS', KEYS[i])
+    for _, key in ipairs(members) do
+        deleted = deleted + redis.call('DEL', ARGV[1] .. key)
+    end
+    redis.call('DEL', KEYS[i])
+    redis.call('SET', KEYS[count + i], generation, 'EX', ARGV[3])
+end
+return deleted
+"""
+
+# Stores an entry (KEYS[1]) and registers it in its tag sets, unless one of
+# the tags was invalidated after the generation ARGV[4] read before the
+# value was computed. KEYS holds the entry, the tag sets, then the tags'
+# generation marks; ARGV the blob, its TTL, the tag set TTL, that
+# generation and the entry's name in the tag sets. Returns 1 if stored.
+_FILL_SCRIPT = """
+local count = (#KEYS - 1) / 2
+local since = tonumber(ARGV[4])
+for i = 1, count do
+    local invalidated = tonumber(redis.call('GET', KEYS[1 + count + i]))
+    if invalidated and invalidated > since then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+for i = 1, count do
+    redis.call('SADD', KEYS[1 + i], ARGV[5])
+    redis.call('EXPIRE', KEYS[1 + i], ARGV[3])
+end
+return 1
+"""
+
+# Releases a fill lock only if it is still held by the caller
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Entity types whose rows a delete can change through ON DELETE CASCADE
+# or ON DELETE SET NULL (see schema.sql)
+DELETE_CASCADES = {
+    "organization": ("department", "employee", "position", "team"),
+    "department": ("organization", "department", "position"),
+    "employee": ("department", "team"),
+    "position": (),
+    "team": ("team",),
+}
+
+def org_tag(org_id: int) -> str:
+    """Cache tag shared by everything derived from an organization's members"""
+    return f"org:{org_id}"
+
+def entity_tags(entity: str, entity_id: int) -> list:
+    """Cache tags for a single entity response"""
+    return [f"{entity}:{entity_id}", f"{entity}:all"]
+
+def list_tags(entity: str) -> list:
+    """Cache tags for a list response of an entity type"""
+    return [f"{entity}:list", f"{entity}:all"]
+
+class RedisCache:
+    def __init__(self):
+        self.redis = None
+        self.prefix = "cache:"
+        self.tag_ttl = 24 * 60 * 60  # Tag sets outlive any single entry
+        self.generation_ttl = 10 * 60  # Generation marks outlive any request computing a fill
+        self.worker_id = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.local_stores = [local_cache]  # Objects with evict(*tags) and clear()
+        self._listener = None
+        self._stop = threading.Event()
+
+    def connect(self):
+        """Connect to Redis"""
+        if not self.redis:
+            logger.debug(f"Connecting cache to Redis at {settings.REDIS_URL}")
+            self.redis = redis.Redis.from_url(settings.REDIS_URL)
+        return self.redis
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    def _generation_key(self, tag: str) -> str:
+        return f"{self.prefix}generation:{tag}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached blob for key, or None on miss or Redis failure"""
+        if not settings.CACHE_ENABLED:
+            return None
+        try:
+            return self.connect().get(self.prefix + key)
+        except Exception as e:
+            logger.error(f"Cache read failed for {key}: {e}")
+            return None
+
+    def generation(self) -> Optional[int]:
+        """
+        The invalidation generation, to read before computing a value for set(since=).
+
+        None when Redis is unavailable.
+        """
+        try:
+            return int(self.connect().get(f"{self.prefix}generation") or 0)
+        except Exception as e:
+            logger.error(f"Cache generation read failed: {e}")
+            return None
+
+    def set(self, key: str, value: bytes, ttl: int, tags: Iterable[str] = (), since: Optional[int] = None) -> bool:
+        """
+        Store a serialized blob and register it under the given tags.
+
+        With since (a generation() read before value was computed) the blob
+        is only stored if none of the tags has been invalidated since, so a
+        read that raced a write can't put back what the write invalidated.
+        Returns whether the blob was stored.
+        """
+        if not settings.CACHE_ENABLED:
+            return False
+        tags = list(tags)
+        try:
+            if since is not None:
+                return bool(self.connect().eval(
+                    _FILL_SCRIPT,
+                    1 + 2 * len(tags),
+                    self.prefix + key,
+                    *[self._tag_key(tag) for tag in tags],
+                    *[self._generation_key(tag) for tag in tags],
+                    value, ttl, self.tag_ttl, since, key
+                ))
+            with self.connect().pipeline() as pipe:
+                pipe.set(self.prefix + key, value, ex=ttl)
+                for tag in tags:
+                    pipe.sadd(self._tag_key(tag), key)
+                    pipe.expire(self._tag_key(tag), self.tag_ttl)
+                pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Cache write failed for {key}: {e}")
+            return False
+
+    def add_local_store(self, store):
+        """
+        Register another per-worker store kept in sync by invalidations.
+
+        store must provide evict(*tags) and clear() like LocalCache.
+        """
+        self.local_stores.append(store)
+
+    def _evict_local(self, tags: Iterable[str]):
+        for store in self.local_stores:
+            store.evict(*tags)
+
+    def _clear_local(self):
+        for store in self.local_stores:
+            store.clear()
+
+    def invalidate(self, *tags: str) -> int:
+        """
+        Drop every entry registered under any of the given tags.
+
+        Evicts this worker's local stores immediately and publishes the tags
+        so every other worker evicts its local copies too.
+        """
+        if not tags:
+            return 0
+        self._evict_local(tags)
+        self.publish(tags)
+        if not settings.CACHE_ENABLED:
+            return 0
+        try:
+            deleted = self.connect().eval(
+                _INVALIDATE_SCRIPT,
+                2 * len(tags),
+                *[self._tag_key(tag) for tag in tags],
+                *[self._generation_key(tag) for tag in tags],
+                self.prefix, f"{self.prefix}generation", self.generation_ttl
+            )
+            logger.debug(f"Invalidated {deleted} cache entries for tags {tags}")
+            return deleted
+        except Exception as e:
+            logger.error(f"Cache invalidation failed for tags {tags}: {e}")
+            return 0
+
+    def publish(self, tags: Iterable[str]):
+        """Broadcast invalidated tags to the other workers' local caches"""
+        try:
+            message = json.dumps({"origin": self.worker_id, "tags": list(tags)})
+            self.connect().publish(settings.CACHE_INVALIDATION_CHANNEL, message)
+        except Exception as e:
+            logger.error(f"Failed to publish cache invalidation for tags {tags}: {e}")
+
+    def _listen(self):
+        """Evict local entries named by invalidation messages from other workers"""
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = redis.Redis.from_url(settings.REDIS_URL).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+                logger.debug(f"Subscribed to {settings.CACHE_INVALIDATION_CHANNEL}")
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if not message:
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload.get("origin") != self.worker_id:
+                        self._evict_local(payload["tags"])
+            except Exception as e:
+                # Messages may have been lost while disconnected
+                logger.error(f"Cache invalidation listener failed: {e}")
+                self._clear_local()
+                self._stop.wait(1.0)
+            finally:
+                if pubsub is not None:
+                    pubsub.close()
+
+    def start_listener(self):
+        """Start the background thread receiving invalidation messages"""
+        needed = settings.LOCAL_CACHE_ENABLED or len(self.local_stores) > 1
+        if self._listener is None and needed:
+            self._stop.clear()
+            self._listener = threading.Thread(target=self._listen, name="cache-invalidation", daemon=True)
+            self._listener.start()
+
+    def stop_listener(self):
+        """Stop the invalidation listener thread"""
+        if self._listener is not None:
+            self._stop.set()
+            self._listener.join(timeout=2.0)
+            self._listener = None
+
+    def acquire_lock(self, key: str) -> Optional[str]:
+        """
+        Try to become the single filler of a cache key.
+
+        Returns a token when the lock was acquired (or Redis is unavailable,
+        in which case every caller fills on its own), None when another
+        caller is already filling the key.
+        """
+        token = uuid.uuid4().hex
+        try:
+            acquired = self.connect().set(
+                f"{self.prefix}lock:{key}", token,
+                nx=True, px=settings.CACHE_LOCK_TIMEOUT_MS
+            )
+            return token if acquired else None
+        except Exception as e:
+            logger.error(f"Cache lock failed for {key}: {e}")
+            return token
+
+    def release_lock(self, key: str, token: str):
+        """Release a fill lock held by token"""
+        try:
+            self.connect().eval(_RELEASE_SCRIPT, 1, f"{self.prefix}lock:{key}", token)
+        except Exception as e:
+            logger.error(f"Cache lock release failed for {key}: {e}")
+
+    def wait_for(self, key: str, timeout: float) -> Optional[bytes]:
+        """Poll for a key being filled by another caller"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.025)
+            blob = self.get(key)
+            if blob is not None:
+                return blob
+        return None
+
+# Global cache instance
+cache = RedisCache()
+
+def invalidate_entity(entity: str, entity_id: int = None, org_ids: Iterable[int] = (), deleted: bool = False):
+    """
+    Invalidate cached responses after a write to an entity.
+
+    Drops the entity's own entry, every cached list of its type and the
+    org-wide views (e.g. the org chart) of the given organizations. Deletes
+    additionally drop every entry of the types the database may have
+    changed through cascading foreign keys.
+    """
+    tags = [f"{entity}:list"]
+    if entity_id is not None:
+        tags.append(f"{entity}:{entity_id}")
+    tags.extend(org_tag(org_id) for org_id in set(org_ids) if org_id is not None)
+    if deleted:
+        tags.extend(f"{dependent}:all" for dependent in DELETE_CASCADES[entity])
+    cache.invalidate(*tags)
+
+def _cache_params(kwargs: dict) -> dict:
+    """Endpoint arguments that identify a response (drops sessions and the like)"""
+    plain = (str, int, float, bool, date, datetime, type(None))
+    return {
+        name: value for name, value in kwargs.items()
+        if isinstance(value, plain)
+        or (isinstance(value, (list, tuple)) and all(isinstance(v, plain) for v in value))
+    }
+
+def _session(kwargs: dict) -> Optional[Session]:
+    """The database session among an endpoint's arguments"""
+    return next((value for value in kwargs.values() if isinstance(value, Session)), None)
+
+def _unpack(stored: bytes) -> Tuple[Optional[str], bytes]:
+    """Split a stored entry into its ETag (if any) and body"""
+    etag, _, blob = stored.partition(b"\n")
+    return etag.decode() or None, blob
+
+def _respond(blob: bytes, etag: Optional[str], if_none_match: Optional[str]) -> Response:
+    """Serve a cached or freshly serialized body, honoring If-None-Match"""
+    if etag is None:
+        return Response(content=blob, media_type="application/json")
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=blob, media_type="application/json", headers={"ETag": etag})
+
+def cached_route(
+    response_model: Any,
+    ttl: int,
+    tags: Callable[[Any, dict], Iterable[str]],
+    when: Callable[[dict], bool] = None,
+    local: bool = False,
+    version: Callable[[Session, dict], Optional[Version]] = None
+):
+    """
+    Read-through Redis cache for a GET endpoint.
+
+    The serialized response body is cached under the endpoint name and its
+    parameters, and registered under the tags returned by tags(result, params)
+    so writes can invalidate it. Concurrent misses for the same key are
+    collapsed: one caller fills the entry while the others wait for it. A
+    fill is dropped when one of its tags was invalidated after the caller
+    started computing it, so a read racing a write can't cache the state
+    from before the write (see RedisCache.set).
+    With local=True the body is also kept in the worker's in-process cache,
+    which is consulted before Redis; tags must then be computable from the
+    parameters alone, as they are evaluated with result=None on Redis hits.
+
+    With version set, responses carry a strong ETag derived from UpdatedAt
+    (max(UpdatedAt) and row count for lists) and If-None-Match is answered
+    with 304: from the ETag stored next to a cached body, or otherwise from
+    version(db, params), a cheap query that must not load the full rows.
+
+    Parameters:
+    - response_model: Model used to serialize the endpoint's return value
+    - ttl: Default time to live in seconds (CACHE_ROUTE_TTLS overrides it)
+    - tags: Callable returning the invalidation tags for a result and its parameters
+    - when: Optional predicate on the parameters deciding whether to cache
+    - local: Also cache in the per-worker LocalCache (small, hot entities)
+    - version: Optional callable returning (max UpdatedAt, count) for ETags
+
+    Usage:
+        @router.get("/{dept_id}", response_model=DepartmentResponse)
+        @cached_route(DepartmentResponse, settings.CACHE_TTL_ENTITY,
+                      tags=lambda dept, params: entity_tags("department", params["dept_id"]))
+        def get_department(dept_id: int, db: Session = Depends(get_db_session)):
+            ...
+    """
+    adapter = TypeAdapter(response_model)
+
+    def decorator(func):
+        route = func.__name__
+        route_ttl = settings.CACHE_ROUTE_TTLS.get(route, ttl)
+        signature = inspect.signature(func)
+        inject_request = version is not None and "request" not in signature.parameters
+
+        def serialize(result) -> bytes:
+            return adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+
+        def lookup(key: str, params: dict) -> Optional[Tuple[Optional[str], bytes]]:
+            if local:
+                entry = local_cache.get(key)
+                if entry is not None:
+                    increment_counter("cache", route, "local_hits")
+                    return entry
+            local_since = local_cache.generation
+            stored = cache.get(key)
+            if stored is None:
+                return None
+            increment_counter("cache", route, "hits")
+            entry = _unpack(stored)
+            if local:
+                local_cache.set(key, entry, tags(None, params), since=local_since)
+            return entry
+
+        def fill(key: str, result_tags: list, etag: Optional[str], blob: bytes, since: Tuple[Optional[int], int]):
+            """Store a response computed after the generations since were read, unless its tags were invalidated meanwhile"""
+            redis_since, local_since = since
+            if redis_since is None:
+                return  # Redis unavailable
+            stored = cache.set(key, (etag or "").encode() + b"\n" + blob, route_ttl, result_tags, since=redis_since)
+            if stored and local:
+                local_cache.set(key, (etag, blob), result_tags, since=local_since)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            request = kwargs.pop("request") if inject_request else kwargs.get("request")
+            if_none_match = request.headers.get("if-none-match") if version is not None else None
+            params = _cache_params(kwargs)
+            use_cache = settings.CACHE_ENABLED and (when is None or when(params))
+            if not use_cache and version is None:
+                return func(*args, **kwargs)
+
+            digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+            key = f"resp:{route}:{digest}"
+
+            if use_cache:
+                entry = lookup(key, params)
+                if entry is not None:
+                    return _respond(entry[1], entry[0], if_none_match)
+                increment_counter("cache", route, "misses")
+
+            if if_none_match:
+                current = version(_session(kwargs), params)
+                etag = make_etag(route, params, current) if current is not None else None
+                if etag is not None and etag_matches(if_none_match, etag):
+                    increment_counter("cache", route, "not_modified")
+                    return Response(status_code=304, headers={"ETag": etag})
+
+            token = cache.acquire_lock(key) if use_cache else None
+            if use_cache and token is None:
+                stored = cache.wait_for(key, settings.CACHE_LOCK_WAIT)
+                if stored is not None:
+                    increment_counter("cache", route, "coalesced")
+                    etag, blob = _unpack(stored)
+                    return _respond(blob, etag, if_none_match)
+            try:
+                # Read before the response is computed: a write invalidating
+                # its tags from now on keeps the (possibly stale) fill out
+                since = (cache.generation(), local_cache.generation) if use_cache else None
+                result = func(*args, **kwargs)
+                if isinstance(result, Response):
+                    if result.status_code != 200:
+                        return result
+                    blob = result.body
+                    current = version(_session(kwargs), params) if version is not None else None
+                else:
+                    blob = serialize(result)
+                    current = result_version(result) if version is not None else None
+                etag = make_etag(route, params, current) if current is not None else None
+                if use_cache:
+                    fill(key, list(tags(result, params)), etag, blob, since)
+            finally:
+                if token is not None:
+                    cache.release_lock(key, token)
+            return _respond(blob, etag, if_none_match)
+
+        if inject_request:
+            wrapper.__signature__ = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+            ])
+        return wrapper
+    return decorator
@@ -0,0 +1,189 @@
+from typing import Callable, Dict, List, Literal, Optional
+from fastapi import HTTPException
+from sqlalchemy import delete, func, inspect, or_, select, tuple_
+from sqlalchemy.orm import Session
+from .cache import cache, invalidate_entity, org_tag
+from .config import get_settings
+from .counters import delete_counters, refresh_counters
+from .logger import setup_logger
+from .metrics import increment_counter
+from .outbox import record_changes, record_detached
+from ..models.tables import Department, Employee, EmployeePosition, Organization, PositionJob, Team, TeamMember
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+# Tables in the order their rows are deleted: rows referencing another
+# table go before it, so foreign keys never have to cascade (and lock) on
+# their own. References from rows that survive (a parent department, a
+# team leader) are set to NULL, with UpdatedAt, just before each delete;
+# their ON DELETE SET NULL covers rows referencing it meanwhile.
+DELETE_ORDER = (TeamMember, EmployeePosition, PositionJob, Team, Department, Employee, Organization)
+
+# Entities whose delete cascades through the set-based delete engine
+CascadeEntity = Literal["organization", "department"]
+
+# Progress callback: (table, rows deleted from it so far)
+Progress = Callable[[str, int], None]
+
+class CascadeDelete:
+    """
+    Set-based delete of an organization or a department (subtree) with everything depending on it.
+
+    conditions select the rows to delete per model. run() deletes them in
+    DELETE_ORDER with DELETE ... WHERE pk IN (...) statements of at most
+    CASCADE_CHUNK_SIZE rows, each committed on its own so locks are held
+    for one chunk only. An interrupted run leaves a consistent (if partly
+    deleted) tree, and running it again finishes the job.
+    """
+    def __init__(self, entity: str, entity_id: int, org_id: int, conditions: dict, scopes: Dict[str, List[int]]):
+        self.entity = entity
+        self.entity_id = entity_id
+        self.org_id = org_id
+        self.conditions = conditions
+        self.scopes = scopes  # Counter scope IDs of the deleted organization, departments and teams
+
+    def _affected(self, db: Session) -> Dict[str, List[int]]:
+        """Teams and departments left in place whose members or assignments are deleted (their counters change)"""
+        affected = {"team": [], "department": []}
+        if TeamMember in self.conditions:
+            affected["team"] = [team_id for (team_id,) in db.query(TeamMember.TeamID).filter(
+                self.conditions[TeamMember], TeamMember.TeamID.not_in(self.scopes.get("team", []))
+            ).distinct()]
+        if EmployeePosition in self.conditions:
+            affected["department"] = [dept_id for (dept_id,) in db.query(PositionJob.DepartmentID).join(
+                EmployeePosition, EmployeePosition.PositionID == PositionJob.PositionID
+            ).filter(
+                self.conditions[EmployeePosition], PositionJob.DepartmentID.not_in(self.scopes.get("department", []))
+            ).distinct()]
+        return affected
+
+    def count(self, db: Session) -> Dict[str, int]:
+        """Rows the delete would remove per table (dry run)"""
+        return {
+            model.__tablename__: db.query(func.count()).select_from(model).filter(self.conditions[model]).scalar()
+            for model in DELETE_ORDER if model in self.conditions
+        }
+
+    def _delete_chunks(self, db: Session, model, progress: Optional[Progress]) -> int:
+        pk = inspect(model).primary_key
+        deleted = 0
+        while True:
+            keys = db.query(*pk).filter(self.conditions[model]).limit(settings.CASCADE_CHUNK_SIZE).all()
+            if not keys:
+                return deleted
+            where = pk[0].in_([key for (key,) in keys]) if len(pk) == 1 else tuple_(*pk).in_([tuple(key) for key in keys])
+            # References from rows left in place are nulled (with UpdatedAt) first
+            record_detached(db, model, keys, exclude=self.conditions)
+            db.execute(delete(model).where(where).execution_options(synchronize_session=False))
+            record_changes(db, model, "delete", keys)
+            db.commit()
+            deleted += len(keys)
+            if progress is not None:
+                progress(model.__tablename__, deleted)
+
+    def run(self, db: Session, progress: Optional[Progress] = None) -> Dict[str, int]:
+        """Delete everything in chunks and fix counters and caches; returns rows deleted per table"""
+        affected = self._affected(db)
+        affected_orgs = {self.org_id}
+        if affected["team"]:
+            affected_orgs.update(org_id for (org_id,) in db.query(Team.OrganizationID).filter(Team.TeamID.in_(affected["team"])).distinct())
+        if affected["department"]:
+            affected_orgs.update(org_id for (org_id,) in db.query(Department.OrganizationID).filter(
+                Department.DepartmentID.in_(affected["department"])
+            ).distinct())
+
+        deleted = {}
+        completed = False
+        try:
+            for model in DELETE_ORDER:
+                if model in self.conditions:
+                    deleted[model.__tablename__] = self._delete_chunks(db, model, progress)
+            completed = True
+        finally:
+            # Also after an interruption (a failure, a cancelled job): the
+            # chunks deleted so far are committed and must be reflected
+            db.rollback()
+            for scope, ids in self.scopes.items():
+                for start in range(0, len(ids), settings.CASCADE_CHUNK_SIZE):
+                    chunk = ids[start:start + settings.CASCADE_CHUNK_SIZE]
+                    if completed:
+                        delete_counters(db, scope, chunk)
+                    else:
+                        refresh_counters(db, scope, chunk)
+            refresh_counters(db, "team", affected["team"])
+            refresh_counters(db, "department", affected["department"])
+            db.commit()
+            invalidate_entity(self.entity, self.entity_id, org_ids=[self.org_id], deleted=True)
+            cache.invalidate(*(org_tag(org_id) for org_id in affected_orgs if org_id is not None))
+
+        increment_counter("cascade", self.entity, "runs")
+        increment_counter("cascade", self.entity, "rows", sum(deleted.values()))
+        return deleted
+
+def organization_cascade(db: Session, org_id: int) -> CascadeDelete:
+    """Plan the delete of an organization with its departments, positions, teams, employees and their links; 404 if missing"""
+    if db.query(Organization.OrganizationID).filter(Organization.OrganizationID == org_id).first() is None:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    departments = select(Department.DepartmentID).where(Department.OrganizationID == org_id)
+    teams = select(Team.TeamID).where(Team.OrganizationID == org_id)
+    employees = select(Employee.EmployeeID).where(Employee.OrganizationID == org_id)
+    positions = select(PositionJob.PositionID).where(PositionJob.DepartmentID.in_(departments))
+    conditions = {
+        TeamMember: or_(TeamMember.TeamID.in_(teams), TeamMember.EmployeeID.in_(employees)),
+        EmployeePosition: or_(EmployeePosition.PositionID.in_(positions), EmployeePosition.EmployeeID.in_(employees)),
+        PositionJob: PositionJob.DepartmentID.in_(departments),
+        Team: Team.OrganizationID == org_id,
+        Department: Department.OrganizationID == org_id,
+        Employee: Employee.OrganizationID == org_id,
+        Organization: Organization.OrganizationID == org_id,
+    }
+    scopes = {
+        "organization": [org_id],
+        "department": [dept_id for (dept_id,) in db.execute(departments)],
+        "team": [team_id for (team_id,) in db.execute(teams)],
+    }
+    return CascadeDelete("organization", org_id, org_id, conditions, scopes)
+
+def department_cascade(db: Session, dept_id: int, subtree: bool = True) -> CascadeDelete:
+    """
+    Plan the delete of a department with its positions and their assignments; 404 if missing.
+
+    With subtree, all its subdepartments (found level by level, one query
+    per level) go too; otherwise they are detached by the foreign key.
+    """
+    org_id = db.query(Department.OrganizationID).filter(Department.DepartmentID == dept_id).scalar()
+    if org_id is None:
+        raise HTTPException(status_code=404, detail="Department not found")
+    dept_ids, level = [dept_id], [dept_id]
+    while subtree and level:
+        level = [child for (child,) in db.query(Department.DepartmentID).filter(
+            Department.ParentDepartmentID.in_(level),
+            Department.DepartmentID.not_in(dept_ids)  # A cycle in bad data must not loop forever
+        )]
+        dept_ids.extend(level)
+    positions = select(PositionJob.PositionID).where(PositionJob.DepartmentID.in_(dept_ids))
+    conditions = {
+        EmployeePosition: EmployeePosition.PositionID.in_(positions),
+        PositionJob: PositionJob.DepartmentID.in_(dept_ids),
+        Department: Department.DepartmentID.in_(dept_ids),
+    }
+    return CascadeDelete("department", dept_id, org_id, conditions, {"department": dept_ids})
+
+def plan_cascade(db: Session, entity: CascadeEntity, entity_id: int, subtree: bool = True) -> CascadeDelete:
+    """CascadeDelete of an organization or department; 400 for any other entity"""
+    if entity == "organization":
+        return organization_cascade(db, entity_id)
+    if entity == "department":
+        return department_cascade(db, entity_id, subtree)
+    raise HTTPException(status_code=400, detail=f"Unknown cascade entity: {entity} (organization or department)")
+
+def check_inline(counts: Dict[str, int], entity: str, entity_id: int):
+    """Refuse (409) deletes too large to run within a request, pointing to the background job"""
+    total = sum(counts.values())
+    if total > settings.CASCADE_INLINE_MAX_ROWS:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Delete affects {total} rows (more than {settings.CASCADE_INLINE_MAX_ROWS}); "
+                   f"run it as a background job with POST /api/v1/cascades/{entity}/{entity_id}"
+        )
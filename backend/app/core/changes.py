@@ -0,0 +1,102 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+from fastapi import HTTPException
+from sqlalchemy import and_, inspect, or_
+from sqlalchemy.orm import Session
+from .config import get_settings
+from .outbox import ENTITIES
+from ..models.tables import Tombstone
+
+settings = get_settings()
+
+def _after(columns: Sequence, values: Sequence):
+    """Rows after a keyset position, spelled out so MySQL uses the (UpdatedAt, PK) index as a range"""
+    return or_(*(
+        and_(*(column == value for column, value in zip(columns[:i], values[:i])), columns[i] > values[i])
+        for i in range(len(columns))
+    ))
+
+def encode_cursor(changed: Optional[list], deleted: list) -> str:
+    """Opaque sync cursor: keyset positions in the rows (UpdatedAt, PK...) and in their tombstones (DeletedAt, ID)"""
+    return base64.urlsafe_b64encode(json.dumps({"c": changed, "d": deleted}).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    """(changed position or None, deleted position) of a cursor; 400 if malformed"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        changed, deleted = position["c"], position["d"]
+        if changed is not None:
+            changed = [datetime.fromisoformat(changed[0]), *changed[1:]]
+        return changed, [datetime.fromisoformat(deleted[0]), int(deleted[1])]
+    except (ValueError, KeyError, TypeError, IndexError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _position(moment: datetime, *keys) -> list:
+    return [moment.isoformat(), *keys]
+
+def _deleted_key(pk: List, tombstone: Tombstone) -> dict:
+    values = tombstone.EntityKey.split(":")
+    return {
+        "key": {column.key: int(value) for column, value in zip(pk, values)},
+        "deleted_at": tombstone.DeletedAt
+    }
+
+def changes_page(db: Session, model, since: Optional[str], limit: int) -> dict:
+    """
+    Rows of model changed since a cursor, and the keys of rows deleted since.
+
+    Without since, every row is returned (paged), and deletions from now
+    on are tracked. Both lists cover the same window of time, so clients
+    apply deleted, then items. Only changes older than DELTA_SYNC_LAG
+    seconds are returned, so a transaction committing shortly after its
+    UpdatedAt isn't skipped. Keyset conditions on (UpdatedAt, PK) and
+    (Entity, DeletedAt, TombstoneID) make a page cost what it returns,
+    whatever the table size. 410 when the cursor is older than the
+    tombstone retention (deletions may be missing): sync from scratch.
+    """
+    now = datetime.utcnow()
+    upper = now - timedelta(seconds=settings.DELTA_SYNC_LAG)
+    if since:
+        changed, deleted = decode_cursor(since)
+        if deleted[0] < now - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS):
+            raise HTTPException(status_code=410, detail="Cursor expired: deletions are no longer tracked that far back, sync without since")
+    else:
+        changed, deleted = None, [upper, 0]
+
+    entity = ENTITIES[model]
+    pk = list(inspect(model).primary_key)
+    order = [model.UpdatedAt, *pk]
+    query = db.query(model).filter(model.UpdatedAt <= upper)
+    if changed is not None:
+        query = query.filter(_after(order, changed))
+    items = query.order_by(*order).limit(limit).all()
+    tombstones = db.query(Tombstone).filter(
+        Tombstone.Entity == entity,
+        Tombstone.DeletedAt <= upper,
+        _after([Tombstone.DeletedAt, Tombstone.TombstoneID], deleted)
+    ).order_by(Tombstone.DeletedAt, Tombstone.TombstoneID).limit(limit).all()
+
+    # A full list may stop before the other one: cut both at the earlier
+    # end, so the page covers one window of time
+    has_more = len(items) == limit or len(tombstones) == limit
+    ends = [rows[-1] for rows in (items, tombstones) if len(rows) == limit]
+    if ends:
+        cutoff = min(row.UpdatedAt if isinstance(row, model) else row.DeletedAt for row in ends)
+        items = [row for row in items if row.UpdatedAt <= cutoff]
+        tombstones = [row for row in tombstones if row.DeletedAt <= cutoff]
+
+    if items:
+        last = items[-1]
+        changed = _position(last.UpdatedAt, *(getattr(last, column.key) for column in pk))
+    elif changed is not None:
+        changed = _position(*changed)
+    if tombstones:
+        deleted = [tombstones[-1].DeletedAt, tombstones[-1].TombstoneID]
+    return {
+        "items": items,
+        "deleted": [_deleted_key(pk, tombstone) for tombstone in tombstones],
+        "cursor": encode_cursor(changed, _position(*deleted)),
+        "has_more": has_more
+    }
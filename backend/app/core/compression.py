@@ -0,0 +1,212 @@
+import zlib
+from typing import Callable, List, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import get_settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+settings = get_settings()
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/xml", "application/javascript")
+
+def no_compression(func: Callable) -> Callable:
+    """
+    Mark an endpoint whose responses must never be compressed.
+
+    Usage:
+        @router.get("/stream")
+        @no_compression
+        def stream(...):
+            ...
+    """
+    func.__no_compression__ = True
+    return func
+
+def available_encodings() -> List[str]:
+    """Supported content codings in server preference order"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the content coding for an Accept-Encoding header.
+
+    The highest client q-value wins; ties are broken by server preference
+    (zstd, br, gzip). Returns None when nothing acceptable is supported.
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in available_encodings():
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+class _Compressor:
+    """Incremental compressor emitting decodable output after every chunk"""
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._obj = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so the client can decode it right away"""
+        if self.encoding == "zstd":
+            return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if self.encoding == "br":
+            return self._obj.process(data) + self._obj.flush()
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "zstd":
+            return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+def decode_prefix(data: bytes, encoding: str) -> bytes:
+    """Best-effort decoding of the beginning of an encoded body (for logging)"""
+    encoding = encoding.lower()
+    try:
+        if encoding in ("gzip", "deflate"):
+            wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+            return zlib.decompressobj(wbits).decompress(data)
+        if encoding == "br" and brotli is not None:
+            return brotli.Decompressor().process(data)
+        if encoding == "zstd" and zstandard is not None:
+            return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    except Exception:
+        pass
+    return b""
+
+def weaken_etag(headers: MutableHeaders):
+    """
+    Turn a strong ETag into a weak one.
+
+    A compressed body differs byte for byte from the identity body the
+    endpoint tagged, so it may not carry the same strong validator.
+    Conditional requests still match (see etag_matches).
+    """
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = "W/" + etag
+
+class CompressionMiddleware:
+    """
+    Response compression negotiated from Accept-Encoding (zstd, br, gzip).
+
+    - Complete bodies smaller than COMPRESSION_MINIMUM_SIZE are sent as is
+    - Streamed bodies are compressed chunk by chunk and flushed after each
+      chunk, so memory stays flat and clients receive data incrementally
+    - Endpoints marked with @no_compression, responses that already carry
+      a Content-Encoding and non-text content types are passed through
+    - Every other response, compressed or not (small bodies, 304s, clients
+      not accepting any coding), carries Vary: Accept-Encoding, and a weak
+      ETag whenever a coding was negotiated, so its validator is the same
+      whatever the body size
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+
+        start_message: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                status = start_message["status"]
+                endpoint = scope.get("endpoint")
+                varies = not (
+                    getattr(endpoint, "__no_compression__", False)
+                    or "content-encoding" in headers
+                    or (status != 304 and not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES))
+                )
+                if varies:
+                    headers.add_vary_header("Accept-Encoding")
+                    if encoding is not None:
+                        weaken_etag(headers)
+                excluded = (
+                    not varies
+                    or encoding is None
+                    or status in (204, 304)
+                    or (not more_body and len(body) < settings.COMPRESSION_MINIMUM_SIZE)
+                )
+                if excluded:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    del headers["Content-Length"]
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressor.compress(body), "more_body": True})
+                else:
+                    compressed = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed})
+                return
+
+            data = compressor.compress(body) if body else b""
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,7 +1,7 @@
 # backend/app/core/config.py
 from logging import getLogger
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 import os
 from dotenv import load_dotenv
 
@@ -53,6 +53,121 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # Response cache
+    CACHE_ENABLED: bool = True
+    CACHE_TTL_ENTITY: int = 60
+    CACHE_TTL_LIST: int = 30
+    CACHE_TTL_ORG_CHART: int = 300
+    CACHE_ROUTE_TTLS: Dict[str, int] = {}  # Per-route overrides keyed by endpoint name
+    CACHE_LOCK_TIMEOUT_MS: int = 5000
+    CACHE_LOCK_WAIT: float = 2.0
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"
+    
+    # Serialize list pages from plain rows with a precompiled serializer
+    FAST_LIST_SERIALIZATION: bool = False
+    
+    # Rows fetched per server-side cursor batch by export endpoints
+    EXPORT_BATCH_SIZE: int = 1000
+    
+    # Maximum number of items accepted by bulk endpoints
+    BULK_MAX_ITEMS: int = 1000
+    
+    # Largest page of keyset-paginated member lists
+    MEMBERS_MAX_LIMIT: int = 1000
+    
+    # Cascade deletes of organizations and department subtrees: rows per
+    # DELETE statement (and transaction), largest delete run within the
+    # request (bigger ones must run as background jobs)
+    CASCADE_CHUNK_SIZE: int = 1000
+    CASCADE_INLINE_MAX_ROWS: int = 5000
+    
+    # Rows per INSERT statement (and transaction) of bulk imports (app.cli.bulk_import)
+    BULK_IMPORT_BATCH_SIZE: int = 5000
+    
+    # Background jobs (app.core.jobs): worker poll interval and lease
+    # seconds (a job of a dead worker is requeued after its lease), retries
+    # after failures with exponential backoff from JOBS_RETRY_BACKOFF
+    # seconds, seconds finished jobs are kept, per-type concurrency overrides
+    JOBS_POLL_INTERVAL: float = 0.5
+    JOBS_LEASE_SECONDS: int = 60
+    JOBS_MAX_RETRIES: int = 3
+    JOBS_RETRY_BACKOFF: float = 5.0
+    JOBS_RETRY_BACKOFF_MAX: float = 300.0
+    JOBS_RESULT_TTL: int = 24 * 60 * 60
+    JOBS_CONCURRENCY: Dict[str, int] = {}
+    
+    # Change-data stream (app.core.outbox): Redis Stream key and its
+    # approximate length cap, seconds between outbox relay runs (0 disables
+    # the relay), events published per relay batch
+    CHANGES_STREAM: str = "changes"
+    CHANGES_STREAM_MAXLEN: int = 1000000
+    CHANGES_RELAY_INTERVAL: float = 1.0
+    CHANGES_RELAY_BATCH: int = 500
+    # Seconds an outbox row must be old before it is published, so events
+    # of a transaction committing late keep their place in the stream
+    CHANGES_RELAY_LAG: float = 2.0
+    
+    # Incremental sync (GET .../changes): seconds a change must be old
+    # before it is returned (covers transactions committing after their
+    # UpdatedAt), largest page, days tombstones of deleted rows are kept
+    # (older cursors must resync from scratch)
+    DELTA_SYNC_LAG: float = 5.0
+    DELTA_SYNC_MAX_LIMIT: int = 1000
+    TOMBSTONE_RETENTION_DAYS: int = 30
+    
+    # Seconds between headcount counter reconciliations (0 disables them)
+    COUNTER_RECONCILE_INTERVAL: int = 3600
+    
+    # Reject list filters/sorts no index can serve (otherwise only log them)
+    FILTER_REJECT_FULL_SCANS: bool = True
+    
+    # Search: "auto" uses MySQL FULLTEXT indexes when present, "fulltext"
+    # always does, "ngram" always uses the in-process index
+    SEARCH_BACKEND: str = "auto"
+    SEARCH_MAX_RESULTS: int = 100
+    
+    # Admission control: Redis token buckets (requests per second, bursts of
+    # RATE_LIMIT_BURST_SECONDS worth of requests) per client and per route
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_CLIENT_RATE: float = 50.0
+    RATE_LIMIT_ROUTE_RATE: float = 500.0
+    RATE_LIMIT_ROUTE_RATES: Dict[str, float] = {}  # Per-route overrides keyed by endpoint name
+    RATE_LIMIT_BURST_SECONDS: float = 2.0
+    
+    # Load shedding: answer 503 while the DB pool is saturated
+    LOAD_SHED_ENABLED: bool = True
+    LOAD_SHED_WAIT: float = 1.0  # Average pool checkout wait in seconds
+    LOAD_SHED_QUEUE_DEPTH: int = 20  # Threads waiting for a pool connection
+    LOAD_SHED_RETRY_AFTER: int = 1
+    
+    # Adaptive per-worker concurrency limit driven by pool wait and DB latency
+    POOL_CONTROLLER_ENABLED: bool = False
+    POOL_CONTROLLER_TARGET_WAIT: float = 0.05  # Average checkout wait (seconds) considered congested
+    POOL_CONTROLLER_LATENCY_TOLERANCE: float = 2.0  # Query latency over this multiple of its minimum is congested
+    POOL_CONTROLLER_MIN_LIMIT: int = 2
+    POOL_CONTROLLER_INTERVAL: int = 50  # Completed requests between adjustments
+    
+    # Readiness checks: seconds results are reused, and per-check timeout
+    HEALTH_CACHE_TTL: float = 5.0
+    HEALTH_CHECK_TIMEOUT: float = 2.0
+    
+    # Coalescing of identical concurrent GET requests (per worker)
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_WAIT: float = 5.0  # Seconds a follower waits before running the request itself
+    SINGLE_FLIGHT_MAX_BODY: int = 1024 * 1024  # Larger responses are not shared
+    
+    # Response compression
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    
+    # In-process entity cache
+    LOCAL_CACHE_ENABLED: bool = True
+    LOCAL_CACHE_MAX_ENTRIES: int = 10000
+    LOCAL_CACHE_TTL: float = 30.0
+    
     class Config:
         env_file = env_file
         case_sensitive = True
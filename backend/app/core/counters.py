@@ -0,0 +1,231 @@
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import delete, func, or_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from .cache import cache
+from .config import get_settings
+from .db import SessionLocal
+from .logger import setup_logger
+from .metrics import increment_counter
+from ..models.tables import AggregateCounter, Department, Employee, EmployeePosition, PositionJob, TeamMember
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+# Counter scopes:
+# - organization: employees of the organization
+# - department: distinct employees with a not yet ended position in the department
+# - team: members of the team
+SCOPES = ("organization", "department", "team")
+
+def _source_counts(db: Session, scope: str, ids: Iterable[int] = None) -> Dict[int, int]:
+    """Count a scope from the source tables, grouped by scope ID (index-only scans)"""
+    if scope == "organization":
+        key = Employee.OrganizationID
+        query = db.query(key, func.count())
+    elif scope == "department":
+        key = PositionJob.DepartmentID
+        today = date.today()
+        query = db.query(key, func.count(EmployeePosition.EmployeeID.distinct())).join(
+            PositionJob, PositionJob.PositionID == EmployeePosition.PositionID
+        ).filter(or_(EmployeePosition.EndDate.is_(None), EmployeePosition.EndDate >= today))
+    else:
+        key = TeamMember.TeamID
+        query = db.query(key, func.count())
+    if ids is not None:
+        query = query.filter(key.in_(list(ids)))
+    return dict(query.group_by(key).all())
+
+def _upsert(db: Session, rows: List[dict], increment: bool):
+    """Insert counter rows, adding to (increment=True) or replacing existing values"""
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    now = datetime.utcnow()
+    rows = [{**row, "UpdatedAt": now} for row in rows]
+    if dialect == "mysql":
+        stmt = mysql_insert(AggregateCounter).values(rows)
+        new_value = stmt.inserted.Value
+        stmt = stmt.on_duplicate_key_update(
+            Value=AggregateCounter.Value + new_value if increment else new_value,
+            UpdatedAt=stmt.inserted.UpdatedAt
+        )
+    else:  # SQLite, for local development
+        stmt = sqlite_insert(AggregateCounter).values(rows)
+        new_value = stmt.excluded.Value
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AggregateCounter.Scope, AggregateCounter.ScopeID],
+            set_={
+                "Value": AggregateCounter.Value + new_value if increment else new_value,
+                "UpdatedAt": stmt.excluded.UpdatedAt
+            }
+        )
+    db.execute(stmt)
+
+def adjust_counter(db: Session, scope: str, scope_id: Optional[int], delta: int):
+    """
+    Add delta to a counter in the caller's transaction.
+
+    Call before committing the write that changes the count, so the
+    counter commits (or rolls back) together with it.
+    """
+    if scope_id is None or not delta:
+        return
+    _upsert(db, [{"Scope": scope, "ScopeID": scope_id, "Value": delta}], increment=True)
+
+def refresh_counters(db: Session, scope: str, ids: Iterable[int]):
+    """
+    Recompute counters of a few scope IDs from the source tables.
+
+    Used where a delta is not known up front (distinct department
+    headcounts, cascading deletes). Call after the write has been flushed.
+    """
+    ids = {scope_id for scope_id in ids if scope_id is not None}
+    if not ids:
+        return
+    counts = _source_counts(db, scope, ids)
+    _upsert(db, [{"Scope": scope, "ScopeID": scope_id, "Value": counts.get(scope_id, 0)} for scope_id in ids], increment=False)
+
+def delete_counters(db: Session, scope: str, ids: Iterable[int]):
+    """Drop the counters of deleted scope rows"""
+    ids = [scope_id for scope_id in ids if scope_id is not None]
+    if ids:
+        db.execute(delete(AggregateCounter).where(
+            AggregateCounter.Scope == scope,
+            AggregateCounter.ScopeID.in_(ids)
+        ))
+
+def get_counters(db: Session, scope: str, ids: Iterable[int]) -> Dict[int, int]:
+    """Stored counter values by scope ID (missing counters are 0)"""
+    ids = list(ids)
+    if not ids:
+        return {}
+    rows = db.query(AggregateCounter.ScopeID, AggregateCounter.Value).filter(
+        AggregateCounter.Scope == scope,
+        AggregateCounter.ScopeID.in_(ids)
+    ).all()
+    counts = dict.fromkeys(ids, 0)
+    counts.update(rows)
+    return counts
+
+def department_headcounts(db: Session, org_id: int) -> List[dict]:
+    """
+    Direct and rolled-up headcounts of every department of an organization.
+
+    Reads the department tree (by the organization index) and the stored
+    direct counters; totals add each department's subdepartments. An
+    employee with positions in several departments of one branch is
+    counted in each of them.
+    """
+    departments = db.query(Department.DepartmentID, Department.ParentDepartmentID).filter(
+        Department.OrganizationID == org_id
+    ).order_by(Department.DepartmentID).all()
+    direct = get_counters(db, "department", [dept_id for dept_id, _ in departments])
+    children = {}
+    for dept_id, parent_id in departments:
+        children.setdefault(parent_id, []).append(dept_id)
+
+    totals = {}
+    def total(dept_id: int, path: frozenset) -> int:
+        if dept_id not in totals:
+            totals[dept_id] = direct[dept_id] + sum(
+                total(child, path | {dept_id}) for child in children.get(dept_id, []) if child not in path
+            )
+        return totals[dept_id]
+
+    return [
+        {
+            "DepartmentID": dept_id,
+            "ParentDepartmentID": parent_id,
+            "direct": direct[dept_id],
+            "total": total(dept_id, frozenset())
+        }
+        for dept_id, parent_id in departments
+    ]
+
+def reconcile_counters(db: Session) -> int:
+    """
+    Recompute every counter from the source tables and fix drifted values.
+
+    Also zeroes departments whose open assignments have ended since the
+    last write and drops counters of deleted rows. Returns the number of
+    corrected counters.
+    """
+    corrected = 0
+    for scope in SCOPES:
+        actual = _source_counts(db, scope)
+        stored = dict(db.query(AggregateCounter.ScopeID, AggregateCounter.Value).filter(
+            AggregateCounter.Scope == scope
+        ).all())
+        changed = [
+            {"Scope": scope, "ScopeID": scope_id, "Value": value}
+            for scope_id, value in actual.items() if stored.get(scope_id) != value
+        ]
+        stale = [scope_id for scope_id in stored if scope_id not in actual]
+        _upsert(db, changed, increment=False)
+        delete_counters(db, scope, stale)
+        corrected += len(changed) + sum(1 for scope_id in stale if stored[scope_id])
+    db.commit()
+    return corrected
+
+class CounterReconciler:
+    """
+    Background thread reconciling counters every COUNTER_RECONCILE_INTERVAL seconds.
+
+    Every worker runs the thread, but a Redis lock held for one interval
+    lets only one of them reconcile per interval.
+    """
+    def __init__(self):
+        self._thread = None
+        self._stop = threading.Event()
+
+    def run_once(self) -> Optional[int]:
+        """Reconcile unless another worker did so this interval; returns corrections made"""
+        try:
+            acquired = cache.connect().set(
+                "counters:reconcile", cache.worker_id,
+                nx=True, ex=settings.COUNTER_RECONCILE_INTERVAL
+            )
+        except Exception as e:
+            logger.error(f"Counter reconciliation lock failed: {e}")
+            acquired = True
+        if not acquired:
+            return None
+        db = SessionLocal()
+        try:
+            corrected = reconcile_counters(db)
+            increment_counter("counters", "reconcile", "runs")
+            increment_counter("counters", "reconcile", "corrections", corrected)
+            if corrected:
+                logger.info(f"Counter reconciliation corrected {corrected} counters")
+            return corrected
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Counter reconciliation failed: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.wait(settings.COUNTER_RECONCILE_INTERVAL):
+            self.run_once()
+
+    def start(self):
+        """Start the reconciliation thread (COUNTER_RECONCILE_INTERVAL=0 disables it)"""
+        if self._thread is None and settings.COUNTER_RECONCILE_INTERVAL > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="counter-reconciler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the reconciliation thread"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+# Global reconciler instance
+counter_reconciler = CounterReconciler()
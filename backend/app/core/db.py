@@ -1,10 +1,15 @@
-from sqlalchemy import create_engine, text
+import math
+import time
+from collections import defaultdict
+from threading import Lock
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.pool import QueuePool
 from urllib.parse import urlparse
 from contextlib import contextmanager
 from .config import get_settings
 from .logger import setup_logger
+from .metrics import Histogram
 
 logger = setup_logger(__name__)
 settings = get_settings()
@@ -21,6 +26,172 @@ try:
 except Exception as e:
     logger.error(f"Error parsing DATABASE_URL: {str(e)}")
 
+class PoolPressure:
+    """
+    Checkout pressure on the connection pool.
+
+    Tracks the threads currently waiting for a connection and a moving
+    average of checkout wait times that decays towards zero while nothing
+    is checked out, so load shedding based on it can't lock itself in.
+    """
+    def __init__(self, window: float = 5.0):
+        self.lock = Lock()
+        self.window = window  # Seconds for the average to decay to 1/e
+        self.waiting = 0
+        self._wait_avg = 0.0
+        self._updated = time.monotonic()
+
+    def _decayed(self, now: float) -> float:
+        return self._wait_avg * math.exp(-(now - self._updated) / self.window)
+
+    def enter(self):
+        with self.lock:
+            self.waiting += 1
+
+    def leave(self, waited: float):
+        with self.lock:
+            self.waiting -= 1
+            now = time.monotonic()
+            self._wait_avg = 0.8 * self._decayed(now) + 0.2 * waited
+            self._updated = now
+
+    def wait_time(self) -> float:
+        """Recent average checkout wait in seconds"""
+        with self.lock:
+            return self._decayed(time.monotonic())
+
+# Global pool pressure, fed by TimedQueuePool
+pool_pressure = PoolPressure()
+
+class PoolTelemetry:
+    """
+    Connection pool and query metrics, reported under "pool" in /metrics.
+
+    Fed by pool and engine events (connect, checkout, checkin, invalidate,
+    close, cursor execution) and by TimedQueuePool's checkout timing:
+    - checkout wait and query latency histograms
+    - in-use, peak in-use and overflow gauges
+    - counters of connects, overflow connects, checkouts and invalidations
+    - age of the open connections
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.pool = None
+        self.checkout_wait = Histogram()
+        self.query_latency = Histogram()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.counts = defaultdict(int)
+        self.connected_at = {}  # id(connection record) -> monotonic connect time
+        self._latency_avg = 0.0
+
+    def attach(self, engine):
+        """Listen to the engine's pool and cursor events"""
+        self.pool = engine.pool
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "close", self._on_close)
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def _overflow(self) -> int:
+        return max(self.pool.overflow(), 0) if hasattr(self.pool, "overflow") else 0
+
+    def _on_connect(self, dbapi_connection, record):
+        with self.lock:
+            self.counts["connects"] += 1
+            if self._overflow():
+                self.counts["overflow_connects"] += 1
+            self.connected_at[id(record)] = time.monotonic()
+
+    def _on_checkout(self, dbapi_connection, record, proxy):
+        with self.lock:
+            self.counts["checkouts"] += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def _on_checkin(self, dbapi_connection, record):
+        with self.lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def _on_invalidate(self, dbapi_connection, record, exception):
+        with self.lock:
+            self.counts["invalidations"] += 1
+            self.connected_at.pop(id(record), None)
+
+    def _on_close(self, dbapi_connection, record):
+        with self.lock:
+            self.counts["closes"] += 1
+            self.connected_at.pop(id(record), None)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("query_start")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        self.query_latency.observe(elapsed)
+        with self.lock:
+            self._latency_avg = 0.9 * self._latency_avg + 0.1 * elapsed if self._latency_avg else elapsed
+
+    def record_wait(self, waited: float):
+        self.checkout_wait.observe(waited)
+
+    def latency(self) -> float:
+        """Moving average of query execution time in seconds"""
+        with self.lock:
+            return self._latency_avg
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self.lock:
+            ages = [now - connected for connected in self.connected_at.values()]
+            stats = {
+                "size": self.pool.size() if hasattr(self.pool, "size") else None,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "overflow": self._overflow(),
+                "waiting": pool_pressure.waiting,
+                "counts": dict(self.counts),
+                "connection_age": {
+                    "count": len(ages),
+                    "max": round(max(ages), 3) if ages else 0.0,
+                    "avg": round(sum(ages) / len(ages), 3) if ages else 0.0
+                },
+                "query_latency_avg": round(self._latency_avg, 6)
+            }
+        stats["checkout_wait"] = self.checkout_wait.stats()
+        stats["checkout_wait_p95"] = self.checkout_wait.quantile(0.95)
+        stats["query_latency"] = self.query_latency.stats()
+        return stats
+
+# Global pool telemetry, attached to the engine below
+pool_telemetry = PoolTelemetry()
+
+class TimedQueuePool(QueuePool):
+    """QueuePool reporting checkout waits to pool_pressure and pool_telemetry"""
+    def _do_get(self):
+        pool_pressure.enter()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            pool_pressure.leave(waited)
+            pool_telemetry.record_wait(waited)
+
+def server_version(conn) -> str:
+    """Database server name and version, e.g. "MySQL version: 8.0.36" """
+    if conn.dialect.name == "mysql":
+        version = conn.execute(text("SELECT VERSION()")).scalar()
+        return f"MySQL version: {version}"
+    version = ".".join(str(part) for part in conn.dialect.server_version_info or ())
+    return f"{conn.dialect.name} version: {version}"
+
 # Modify URL to use PyMySQL
 mysql_url = settings.DATABASE_URL.replace('mysql://', 'mysql+pymysql://')
 
@@ -28,7 +199,7 @@ mysql_url = settings.DATABASE_URL.replace('mysql://', 'mysql+pymysql://')
 try:
     engine = create_engine(
         mysql_url,
-        poolclass=QueuePool,
+        poolclass=TimedQueuePool,
         pool_size=settings.DB_POOL_SIZE,
         max_overflow=settings.DB_MAX_OVERFLOW,
         pool_timeout=settings.DB_POOL_TIMEOUT,
@@ -37,12 +208,12 @@ try:
         echo=settings.DEBUG,
         echo_pool=settings.DEBUG
     )
+    pool_telemetry.attach(engine)
     logger.info("Database engine created successfully")
     
     # Test connection and get version
     with engine.connect() as conn:
-        version = conn.execute(text("SELECT VERSION()")).scalar()
-        logger.info(f"Connected to MySQL version: {version}")
+        logger.info(f"Connected to {server_version(conn)}")
         
 except Exception as e:
     logger.error(f"Failed to create database engine: {str(e)}")
@@ -90,99 +261,138 @@ def get_db_session():
     finally:
         db.close()
 
+# information_schema queries of introspect_schema, each covering every table of the database
+SCHEMA_QUERIES = {
+    "tables": """
+        SELECT TABLE_NAME, ENGINE, TABLE_ROWS, CREATE_TIME
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'
+        ORDER BY TABLE_NAME
+    """,
+    "columns": """
+        SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, EXTRA
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+        ORDER BY TABLE_NAME, ORDINAL_POSITION
+    """,
+    "indexes": """
+        SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, NON_UNIQUE, INDEX_TYPE
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+    """,
+    "foreign_keys": """
+        SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+        FROM information_schema.KEY_COLUMN_USAGE
+        WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL
+        ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION
+    """,
+}
+
+def _empty_table() -> dict:
+    return {"engine": None, "rows": None, "created": None, "columns": {}, "indexes": {}, "foreign_keys": {}}
+
+def _inspect_schema(conn) -> dict:
+    """introspect_schema through the SQLAlchemy inspector, for databases without information_schema (SQLite in development)"""
+    inspector = inspect(conn)
+    tables = {}
+    for name in inspector.get_table_names():
+        table = tables[name] = _empty_table()
+        for column in inspector.get_columns(name):
+            table["columns"][column["name"]] = {"type": str(column["type"]), "nullable": column["nullable"]}
+        primary_key = inspector.get_pk_constraint(name)["constrained_columns"]
+        if primary_key:
+            table["indexes"]["PRIMARY"] = {"columns": primary_key, "unique": True, "type": "BTREE"}
+        for index in inspector.get_indexes(name) + inspector.get_unique_constraints(name):
+            table["indexes"][index["name"]] = {
+                "columns": index["column_names"],
+                "unique": bool(index.get("unique", True)),
+                "type": "BTREE"
+            }
+        for number, fk in enumerate(inspector.get_foreign_keys(name)):
+            table["foreign_keys"][fk["name"] or f"fk_{name}_{number}"] = {
+                "columns": fk["constrained_columns"],
+                "references": fk["referred_table"],
+                "referenced_columns": fk["referred_columns"]
+            }
+    return tables
+
+def introspect_schema(conn) -> dict:
+    """
+    Tables of the connected database with their columns, indexes and foreign keys.
+
+    Runs the four SCHEMA_QUERIES, whatever the number of tables, and groups
+    their rows per table:
+    {table: {engine, rows, created, columns: {name: {type, nullable}},
+             indexes: {name: {columns, unique, type}},
+             foreign_keys: {name: {columns, references, referenced_columns}}}}
+    """
+    if conn.dialect.name != "mysql":
+        return _inspect_schema(conn)
+    tables = defaultdict(_empty_table)
+    for row in conn.execute(text(SCHEMA_QUERIES["tables"])):
+        tables[row.TABLE_NAME].update(engine=row.ENGINE, rows=row.TABLE_ROWS, created=row.CREATE_TIME)
+    for row in conn.execute(text(SCHEMA_QUERIES["columns"])):
+        tables[row.TABLE_NAME]["columns"][row.COLUMN_NAME] = {
+            "type": row.COLUMN_TYPE,
+            "nullable": row.IS_NULLABLE == "YES"
+        }
+    for row in conn.execute(text(SCHEMA_QUERIES["indexes"])):
+        index = tables[row.TABLE_NAME]["indexes"].setdefault(row.INDEX_NAME, {
+            "columns": [],
+            "unique": not row.NON_UNIQUE,
+            "type": row.INDEX_TYPE
+        })
+        index["columns"].append(row.COLUMN_NAME)
+    for row in conn.execute(text(SCHEMA_QUERIES["foreign_keys"])):
+        fk = tables[row.TABLE_NAME]["foreign_keys"].setdefault(row.CONSTRAINT_NAME, {
+            "columns": [],
+            "references": row.REFERENCED_TABLE_NAME,
+            "referenced_columns": []
+        })
+        fk["columns"].append(row.COLUMN_NAME)
+        fk["referenced_columns"].append(row.REFERENCED_COLUMN_NAME)
+    return dict(tables)
+
 def get_db_info():
-    """Get database structure information"""
+    """Log the database structure (see introspect_schema)"""
     try:
         with engine.connect() as conn:
-            # Get current database
-            db_name = conn.execute(text("SELECT DATABASE()")).scalar()
-            logger.info(f"Current database: {db_name}")
-            
-            # Get tables
-            tables = conn.execute(text("""
-                SELECT TABLE_NAME, ENGINE, TABLE_ROWS, CREATE_TIME
-                FROM information_schema.TABLES 
-                WHERE TABLE_SCHEMA = :db
-                ORDER BY TABLE_NAME
-            """), {"db": db_name}).fetchall()
-            
-            logger.info(f"Found {len(tables)} tables:")
-            for table in tables:
-                logger.info(f"\nTable: {table.TABLE_NAME}")
-                logger.info(f"  Engine: {table.ENGINE}")
-                logger.info(f"  Rows (approximate): {table.TABLE_ROWS}")
-                logger.info(f"  Created: {table.CREATE_TIME}")
-                
-                # Get columns
-                columns = conn.execute(text("""
-                    SELECT COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, EXTRA
-                    FROM information_schema.COLUMNS
-                    WHERE TABLE_SCHEMA = :db AND TABLE_NAME = :table
-                    ORDER BY ORDINAL_POSITION
-                """), {"db": db_name, "table": table.TABLE_NAME}).fetchall()
-                
-                logger.info("  Columns:")
-                for col in columns:
-                    nullable = "NULL" if col.IS_NULLABLE == "YES" else "NOT NULL"
-                    key = f", {col.COLUMN_KEY}" if col.COLUMN_KEY else ""
-                    extra = f", {col.EXTRA}" if col.EXTRA else ""
-                    logger.info(f"    - {col.COLUMN_NAME}: {col.COLUMN_TYPE} {nullable}{key}{extra}")
-                
-                # Get indexes
-                indexes = conn.execute(text("""
-                    SELECT INDEX_NAME, COLUMN_NAME, NON_UNIQUE
-                    FROM information_schema.STATISTICS
-                    WHERE TABLE_SCHEMA = :db AND TABLE_NAME = :table
-                    ORDER BY INDEX_NAME, SEQ_IN_INDEX
-                """), {"db": db_name, "table": table.TABLE_NAME}).fetchall()
-                
-                if indexes:
-                    logger.info("  Indexes:")
-                    current_index = None
-                    columns = []
-                    for idx in indexes:
-                        if current_index != idx.INDEX_NAME:
-                            if current_index:
-                                unique = "UNIQUE " if not indexes[0].NON_UNIQUE else ""
-                                logger.info(f"    - {unique}{current_index}: {', '.join(columns)}")
-                                columns = []
-                            current_index = idx.INDEX_NAME
-                        columns.append(idx.COLUMN_NAME)
-                    if columns:
-                        unique = "UNIQUE " if not indexes[-1].NON_UNIQUE else ""
-                        logger.info(f"    - {unique}{current_index}: {', '.join(columns)}")
-                
-                # Get foreign keys
-                foreign_keys = conn.execute(text("""
-                    SELECT CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
-                    FROM information_schema.KEY_COLUMN_USAGE
-                    WHERE TABLE_SCHEMA = :db AND TABLE_NAME = :table
-                        AND REFERENCED_TABLE_NAME IS NOT NULL
-                    ORDER BY CONSTRAINT_NAME
-                """), {"db": db_name, "table": table.TABLE_NAME}).fetchall()
-                
-                if foreign_keys:
-                    logger.info("  Foreign Keys:")
-                    for fk in foreign_keys:
-                        logger.info(f"    - {fk.CONSTRAINT_NAME}: {fk.COLUMN_NAME} -> {fk.REFERENCED_TABLE_NAME}.{fk.REFERENCED_COLUMN_NAME}")
-            
-            return True
-            
+            tables = introspect_schema(conn)
     except Exception as e:
         logger.error(f"Error getting database information: {str(e)}")
         return False
 
-async def check_db_health(db_session) -> tuple[bool, str]:
-    """Check database connectivity and return status"""
+    logger.info(f"Found {len(tables)} tables:")
+    for name, table in tables.items():
+        logger.info(f"\nTable: {name}")
+        logger.info(f"  Engine: {table['engine']}")
+        logger.info(f"  Rows (approximate): {table['rows']}")
+        logger.info(f"  Created: {table['created']}")
+        logger.info("  Columns:")
+        for column, info in table["columns"].items():
+            logger.info(f"    - {column}: {info['type']} {'NULL' if info['nullable'] else 'NOT NULL'}")
+        if table["indexes"]:
+            logger.info("  Indexes:")
+            for index, info in table["indexes"].items():
+                unique = "UNIQUE " if info["unique"] else ""
+                logger.info(f"    - {unique}{index}: {', '.join(info['columns'])}")
+        if table["foreign_keys"]:
+            logger.info("  Foreign Keys:")
+            for fk, info in table["foreign_keys"].items():
+                logger.info(f"    - {fk}: {', '.join(info['columns'])} -> "
+                            f"{info['references']}.{', '.join(info['referenced_columns'])}")
+    return True
+
+def check_db_health() -> tuple[bool, str]:
+    """Check database connectivity with a short-lived pooled connection and return status"""
     try:
-        # Get database version
-        result = await db_session.execute(text("SELECT VERSION()"))
-        version = result.scalar()
-        await db_session.commit()
-        return True, f"Connected to MySQL version: {version}"
+        with engine.connect() as conn:
+            version = server_version(conn)
+        return True, f"Connected to {version}"
     except Exception as e:
         logger.error(f"Database health check failed: {e}")
         return False, f"Database error: {str(e)}"
 
 # Export commonly used database components
-__all__ = ['engine', 'Base', 'get_db', 'get_db_session', 'get_db_info'] 
\ No newline at end of file
+__all__ = ['engine', 'Base', 'get_db', 'get_db_session', 'get_db_info', 'introspect_schema', 'pool_pressure', 'pool_telemetry'] 
\ No newline at end of file
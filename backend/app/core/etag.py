@@ -0,0 +1,71 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Query, Session
+
+# (max UpdatedAt, row count) identifying the state of a response
+Version = Tuple[Optional[datetime], int]
+
+def make_etag(route: str, params: dict, version: Version) -> str:
+    """Strong ETag for a response of route with params at the given version"""
+    updated_at, count = version
+    source = "|".join([
+        route,
+        json.dumps(params, sort_keys=True, default=str),
+        updated_at.isoformat() if updated_at else "",
+        str(count)
+    ])
+    return f'"{hashlib.sha1(source.encode()).hexdigest()}"'
+
+def _opaque_tag(etag: str) -> str:
+    """An ETag without its weakness indicator"""
+    return etag[2:] if etag.startswith("W/") else etag
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header value matches etag.
+
+    Uses the weak comparison of If-None-Match: W/"x" matches "x", as
+    compressed responses carry the weak form of the endpoint's ETag.
+    """
+    if not if_none_match:
+        return False
+    candidates = [_opaque_tag(value.strip()) for value in if_none_match.split(",")]
+    return "*" in candidates or _opaque_tag(etag) in candidates
+
+def result_version(result) -> Version:
+    """Version of an already loaded entity or list of entities"""
+    if isinstance(result, list):
+        return max((row.UpdatedAt for row in result), default=None), len(result)
+    return result.UpdatedAt, 1
+
+def entity_version(db: Session, model, entity_id: int) -> Optional[Version]:
+    """
+    Version of a single row, read by primary key without loading the row.
+
+    Returns None when the row does not exist.
+    """
+    pk = model.__mapper__.primary_key[0]
+    row = db.query(model.UpdatedAt).filter(pk == entity_id).first()
+    return (row[0], 1) if row else None
+
+def ids_version(db: Session, model, ids: List[int]) -> Version:
+    """Version of the rows with the given primary keys (an ?ids= batch), read by primary key"""
+    pk = model.__mapper__.primary_key[0]
+    updated_at, count = db.query(func.max(model.UpdatedAt), func.count()).filter(pk.in_(ids)).one()
+    return updated_at, count
+
+def page_version(db: Session, query: Query, skip: int, limit: int) -> Version:
+    """
+    Version of a list page: max(UpdatedAt) and row count of the rows that
+    query.offset(skip).limit(limit) would return, without loading them.
+
+    query must have a deterministic ORDER BY so the page matches the one
+    returned by the endpoint.
+    """
+    model = query.column_descriptions[0]["entity"]
+    page = query.with_entities(model.UpdatedAt.label("UpdatedAt")).offset(skip).limit(limit).subquery()
+    updated_at, count = db.query(func.max(page.c.UpdatedAt), func.count()).select_from(page).one()
+    return updated_at, count
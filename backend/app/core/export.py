@@ -0,0 +1,92 @@
+import csv
+import io
+from datetime import date, datetime
+from itertools import islice
+from typing import Callable, Iterator
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Query, Session
+from .config import get_settings
+from .db import SessionLocal
+from .serialization import RowSerializer, dumps, row_serializer
+
+settings = get_settings()
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+def _batches(query: Query, size: int) -> Iterator[list]:
+    """Lists of up to size rows read from an unbuffered server-side cursor"""
+    rows = iter(query.yield_per(size))
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+def _csv_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def _encode_ndjson(serializer: RowSerializer, batches: Iterator[list]) -> Iterator[bytes]:
+    names = serializer.names
+    for batch in batches:
+        yield b"".join(dumps(dict(zip(names, row))) + b"\n" for row in batch)
+
+def _encode_csv(serializer: RowSerializer, batches: Iterator[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(serializer.names)
+    yield buffer.getvalue().encode()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode()
+
+def export_response(
+    build_query: Callable[[Session], Query],
+    model,
+    response_model,
+    format: str,
+    filename: str
+) -> StreamingResponse:
+    """
+    Stream every row of a query as NDJSON or CSV.
+
+    Rows are read as plain column tuples through a server-side cursor in
+    batches of EXPORT_BATCH_SIZE and encoded one batch at a time, so memory
+    stays flat regardless of table size. The export runs in its own session
+    that lives as long as the stream, independent of the request's session.
+
+    Parameters:
+    - build_query: Builds the (ordered, filtered) query on the model from a session
+    - model: ORM model exported
+    - response_model: Schema whose fields become the exported columns
+    - format: "ndjson" or "csv"
+    - filename: Download name without extension
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported export format: {format} (expected one of {', '.join(EXPORT_FORMATS)})"
+        )
+    serializer = row_serializer(model, response_model)
+    encode = _encode_csv if format == "csv" else _encode_ndjson
+
+    def stream() -> Iterator[bytes]:
+        db = SessionLocal()
+        try:
+            query = serializer.query(build_query(db))
+            yield from encode(serializer, _batches(query, settings.EXPORT_BATCH_SIZE))
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'}
+    )
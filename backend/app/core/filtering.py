@@ -0,0 +1,202 @@
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy.orm import Query
+from .config import get_settings
+from .logger import setup_logger
+from .metrics import increment_counter
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+# Operators whose condition can be answered by an index: equality-like ones
+# fix a column for the next index column, range ones end the usable prefix
+EQUALITY_OPERATORS = ("eq", "in", "null")
+RANGE_OPERATORS = ("lt", "le", "gt", "ge", "prefix")
+FILTER_OPERATORS = EQUALITY_OPERATORS + RANGE_OPERATORS + ("ne",)
+
+# (column name, operator, parsed value)
+Condition = Tuple[str, str, Any]
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so value matches literally (use with escape="\\")"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+@lru_cache(maxsize=None)
+def index_columns(model) -> Tuple[Tuple[str, ...], ...]:
+    """
+    Column lists of every index on a model's table, in index order.
+
+    Covers the primary key, declared B-tree indexes (index=True and
+    __table_args__, mirroring schema.sql) and single-column unique
+    constraints. FULLTEXT indexes can't serve filters and are skipped.
+    """
+    table = model.__table__
+    indexes = [tuple(column.name for column in table.primary_key.columns)]
+    indexes.extend(
+        tuple(column.name for column in index.columns) for index in table.indexes
+        if index.kwargs.get("mysql_prefix") != "FULLTEXT"
+    )
+    indexes.extend((column.name,) for column in table.columns if column.unique)
+    return tuple(indexes)
+
+def _column(model, name: str):
+    column = model.__table__.columns.get(name)
+    if column is None:
+        raise HTTPException(status_code=400, detail=f"Unknown column: {name}")
+    return column
+
+def _convert(column, raw: str):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return raw
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(raw)
+        if python_type is date:
+            return date.fromisoformat(raw)
+        return python_type(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid value for {column.name}: {raw}")
+
+def parse_filters(model, filters: Optional[List[str]]) -> List[Condition]:
+    """
+    Parse ?filter=Column:operator:value expressions.
+
+    Operators: eq, ne, lt, le, gt, ge, prefix (string starts with value),
+    in (values separated by "|") and null (value true or false). Raises a
+    400 error for unknown columns, operators or unparsable values.
+    """
+    conditions = []
+    for expression in filters or []:
+        parts = expression.split(":", 2)
+        if len(parts) != 3:
+            raise HTTPException(status_code=400, detail=f"Invalid filter: {expression} (expected Column:operator:value)")
+        name, operator, raw = parts
+        column = _column(model, name)
+        if operator not in FILTER_OPERATORS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown filter operator: {operator} (expected one of {', '.join(FILTER_OPERATORS)})"
+            )
+        if operator == "null":
+            if raw not in ("true", "false"):
+                raise HTTPException(status_code=400, detail=f"Invalid value for null filter on {name}: {raw}")
+            value = raw == "true"
+        elif operator == "prefix":
+            value = raw
+        elif operator == "in":
+            value = [_convert(column, item) for item in raw.split("|")]
+        else:
+            value = _convert(column, raw)
+        conditions.append((name, operator, value))
+    return conditions
+
+def parse_sort(model, sort: Optional[str]) -> List[Tuple[str, bool]]:
+    """Parse ?sort=Column,-Column into (column name, descending) pairs"""
+    order = []
+    for item in (sort or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        descending = item.startswith("-")
+        name = item.lstrip("+-")
+        _column(model, name)
+        order.append((name, descending))
+    return order
+
+def full_scan_reason(
+    model,
+    conditions: List[Condition],
+    order: List[Tuple[str, bool]],
+    scoped_by: Iterable[str] = ()
+) -> Optional[str]:
+    """
+    Why a filtered/sorted list query would read the whole table, or None.
+
+    An index can serve the query when its leading columns are fixed by
+    equality conditions up to a column that is filtered (by equality or a
+    range) or, without usable filters, that is the first sort column.
+    Unfiltered pages ordered by primary key are served by the primary key.
+    """
+    equal = set(scoped_by) | {name for name, operator, _ in conditions if operator in EQUALITY_OPERATORS}
+    ranged = {name for name, operator, _ in conditions if operator in RANGE_OPERATORS}
+
+    def served_by_index(column: str) -> bool:
+        for columns in index_columns(model):
+            for indexed in columns:
+                if indexed == column:
+                    return True
+                if indexed not in equal:
+                    break
+        return False
+
+    filtered = bool(equal or ranged or conditions)
+    if filtered:
+        if any(served_by_index(column) for column in equal | ranged):
+            return None
+        return f"no index on the filtered columns of {model.__tablename__}"
+    if order and not served_by_index(order[0][0]):
+        return f"no index to sort {model.__tablename__} by {order[0][0]}"
+    return None
+
+def _clause(model, name: str, operator: str, value):
+    column = getattr(model, name)
+    if operator == "eq":
+        return column == value
+    if operator == "ne":
+        return column != value
+    if operator == "lt":
+        return column < value
+    if operator == "le":
+        return column <= value
+    if operator == "gt":
+        return column > value
+    if operator == "ge":
+        return column >= value
+    if operator == "prefix":
+        return column.like(escape_like(value) + "%", escape="\\")
+    if operator == "in":
+        return column.in_(value)
+    return column.is_(None) if value else column.isnot(None)
+
+def filter_query(
+    query: Query,
+    model,
+    filters: Optional[List[str]] = None,
+    sort: Optional[str] = None,
+    scoped_by: Iterable[str] = ()
+) -> Query:
+    """
+    Apply ?filter= and ?sort= to a list query on model.
+
+    The result is always ordered by the requested columns and then the
+    primary key, so pages stay stable. Requests no index can serve are
+    rejected with a 400 error, or only logged and counted when
+    FILTER_REJECT_FULL_SCANS is disabled.
+
+    Parameters:
+    - filters: Column:operator:value expressions (see parse_filters)
+    - sort: Comma-separated columns, "-" prefix for descending order
+    - scoped_by: Columns the query already restricts by equality (e.g. org_id)
+    """
+    conditions = parse_filters(model, filters)
+    order = parse_sort(model, sort)
+    reason = full_scan_reason(model, conditions, order, scoped_by)
+    if reason is not None:
+        if settings.FILTER_REJECT_FULL_SCANS:
+            raise HTTPException(status_code=400, detail=f"Query would scan the full table: {reason}")
+        logger.warning(f"Full table scan for filter={filters} sort={sort}: {reason}")
+        increment_counter("filters", model.__tablename__, "full_scans")
+
+    for name, operator, value in conditions:
+        query = query.filter(_clause(model, name, operator, value))
+    ordering = [getattr(model, name).desc() if descending else getattr(model, name) for name, descending in order]
+    sorted_names = {name for name, _ in order}
+    ordering.extend(
+        getattr(model, column.name) for column in model.__table__.primary_key.columns
+        if column.name not in sorted_names
+    )
+    return query.order_by(*ordering)
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+from .cache import cache
+from .config import get_settings
+from .db import check_db_health
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+def check_redis() -> Tuple[bool, str]:
+    """PING the Redis server used by the cache and rate limits"""
+    try:
+        cache.connect().ping()
+        return True, "healthy"
+    except Exception as e:
+        return False, f"Redis error: {e}"
+
+# Backend checks run by readiness probes; each is a blocking call returning (healthy, message)
+CHECKS: Dict[str, Callable[[], Tuple[bool, str]]] = {
+    "redis": check_redis,
+    "database": check_db_health,
+}
+
+class HealthMonitor:
+    """
+    Cached readiness state of the backends.
+
+    The checks in CHECKS run concurrently in threads, each bounded by
+    HEALTH_CHECK_TIMEOUT. Results are kept for HEALTH_CACHE_TTL seconds
+    and refreshed by a background task, so probes are answered from memory;
+    if the state is stale anyway, one refresh runs and concurrent probes
+    wait for it.
+    """
+    def __init__(self):
+        self.result: Optional[dict] = None
+        self.checked_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _check(self, name: str, check: Callable[[], Tuple[bool, str]]) -> Tuple[bool, str]:
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(check), settings.HEALTH_CHECK_TIMEOUT)
+        except asyncio.TimeoutError:
+            return False, f"timed out after {settings.HEALTH_CHECK_TIMEOUT}s"
+        except Exception as e:
+            return False, str(e)
+
+    async def _run_checks(self) -> dict:
+        names = list(CHECKS)
+        outcomes = await asyncio.gather(*(self._check(name, CHECKS[name]) for name in names))
+        checks = {name: {"healthy": healthy, "message": message} for name, (healthy, message) in zip(names, outcomes)}
+        for name, check in checks.items():
+            if not check["healthy"]:
+                logger.warning(f"Readiness check {name} failed: {check['message']}")
+        self.result = {
+            "ready": all(check["healthy"] for check in checks.values()),
+            "checks": checks,
+            "checked_at": datetime.utcnow().isoformat()
+        }
+        self.checked_at = time.monotonic()
+        return self.result
+
+    async def refresh(self) -> dict:
+        """Run the checks now (joining a refresh already in progress)"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._run_checks())
+        return await asyncio.shield(self._refreshing)
+
+    async def status(self) -> dict:
+        """Latest readiness result, refreshed first if older than HEALTH_CACHE_TTL"""
+        if self.result is None or time.monotonic() - self.checked_at > settings.HEALTH_CACHE_TTL:
+            return await self.refresh()
+        return self.result
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Readiness refresh failed: {e}")
+            await asyncio.sleep(settings.HEALTH_CACHE_TTL / 2)
+
+    def start(self):
+        """Start refreshing in the background (call from the running event loop)"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stop the background refresh"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+# Global health monitor instance
+health_monitor = HealthMonitor()
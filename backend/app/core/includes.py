@@ -0,0 +1,121 @@
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import Query, joinedload, raiseload, selectinload
+from ..models.tables import Department, Employee, Organization, PositionJob, Team
+from ..schemas.schemas import DepartmentResponse, EmployeeResponse, OrganizationResponse, PositionResponse, TeamResponse
+
+# Response model used for rows of each model reachable through ?include=
+RESPONSE_MODELS = {
+    Organization: OrganizationResponse,
+    Department: DepartmentResponse,
+    Employee: EmployeeResponse,
+    PositionJob: PositionResponse,
+    Team: TeamResponse,
+}
+
+# Deepest include path accepted, e.g. head.organization.top_department
+INCLUDE_MAX_DEPTH = 3
+
+# Parsed includes: ((relationship name, nested includes), ...) sorted by name,
+# so equal include sets share generated models
+Includes = Tuple[Tuple[str, "Includes"], ...]
+
+def _relationships(model) -> dict:
+    """Relationships of model that can be included (their target has a response model)"""
+    return {
+        name: relationship for name, relationship in inspect(model).relationships.items()
+        if relationship.mapper.class_ in RESPONSE_MODELS
+    }
+
+def parse_includes(include: Optional[str], model) -> Optional[Includes]:
+    """
+    Parse an ?include=head,organization,parent.organization value.
+
+    Dotted paths include relationships of included rows. Returns None when
+    nothing was requested and raises a 400 error for unknown relationships
+    or paths deeper than INCLUDE_MAX_DEPTH.
+    """
+    if not include:
+        return None
+    tree = {}
+    for path in include.split(","):
+        path = path.strip()
+        if not path:
+            continue
+        names = path.split(".")
+        if len(names) > INCLUDE_MAX_DEPTH:
+            raise HTTPException(status_code=400, detail=f"Include path too deep: {path} (at most {INCLUDE_MAX_DEPTH} levels)")
+        node, current = tree, model
+        for name in names:
+            relationships = _relationships(current)
+            if name not in relationships:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown include: {path} ({current.__name__} has {', '.join(sorted(relationships))})"
+                )
+            node = node.setdefault(name, {})
+            current = relationships[name].mapper.class_
+
+    def freeze(node: dict) -> Includes:
+        return tuple((name, freeze(children)) for name, children in sorted(node.items()))
+    return freeze(tree) or None
+
+def _loader_options(model, includes: Includes) -> list:
+    """
+    Eager loading options for includes, each guarded by raiseload("*").
+
+    Many-to-one references are joined into the query that loads their
+    parent rows; collections are loaded with one SELECT ... IN per level.
+    Either way the number of queries depends on the include paths, not on
+    the number of rows. Relationships that were not included raise instead
+    of lazy loading row by row.
+    """
+    relationships = _relationships(model)
+    options = []
+    for name, children in includes:
+        relationship = relationships[name]
+        attribute = getattr(model, name)
+        strategy = selectinload(attribute) if relationship.uselist else joinedload(attribute)
+        options.append(strategy.options(
+            *_loader_options(relationship.mapper.class_, children),
+            raiseload("*")
+        ))
+    return options
+
+def with_includes(query: Query, model, includes: Includes) -> Query:
+    """Eager load the included relationships of a query on model"""
+    return query.options(*_loader_options(model, includes), raiseload("*"))
+
+@lru_cache(maxsize=256)
+def include_model(model, includes: Includes):
+    """Response model of model extended with the included relationships, built once per include set"""
+    response_model = RESPONSE_MODELS[model]
+    if not includes:
+        return response_model
+    relationships = _relationships(model)
+    fields = {}
+    for name, children in includes:
+        relationship = relationships[name]
+        nested = include_model(relationship.mapper.class_, children)
+        fields[name] = (List[nested], []) if relationship.uselist else (Optional[nested], None)
+    suffix = "".join(name.title().replace("_", "") for name, _ in includes)
+    return create_model(f"{response_model.__name__}With{suffix}", __base__=response_model, **fields)
+
+@lru_cache(maxsize=256)
+def _adapter(model, includes: Includes, many: bool) -> TypeAdapter:
+    schema = include_model(model, includes)
+    return TypeAdapter(List[schema] if many else schema)
+
+def include_response(rows, model, includes: Includes) -> Response:
+    """Serialize rows (a list, or a single row) loaded by with_includes together with their includes"""
+    adapter = _adapter(model, includes, isinstance(rows, list))
+    body = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    return Response(content=body, media_type="application/json")
+
+def check_include_fields(includes: Optional[Includes], selected: Optional[tuple]):
+    """Reject ?include= combined with ?fields= (projected rows carry no relationships)"""
+    if includes and selected:
+        raise HTTPException(status_code=400, detail="include can't be combined with fields")
@@ -0,0 +1,293 @@
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy import UniqueConstraint
+from .db import Base, introspect_schema
+from .logger import setup_logger
+from ..models import tables as _models  # Registers the tables on Base.metadata
+
+logger = setup_logger(__name__)
+
+# DDL the database is created from (repository root)
+SCHEMA_SQL = Path(__file__).resolve().parents[3] / "schema.sql"
+
+class QueryPattern(NamedTuple):
+    """A lookup the API issues: equality filters on columns, then a range or ORDER BY on columns"""
+    table: str
+    equality: tuple
+    order: tuple
+    used_by: str
+
+# Index-relevant queries of the endpoints, core helpers and counters
+QUERY_PATTERNS: List[QueryPattern] = [
+    QueryPattern("Organization", (), ("Name",), "organization lists sorted by name"),
+    QueryPattern("Department", ("OrganizationID",), ("Name",), "org-filtered, name-sorted department lists"),
+    QueryPattern("Employee", ("OrganizationID",), ("Name",), "org-filtered, name-sorted employee lists"),
+    QueryPattern("Team", ("OrganizationID",), ("Name",), "org-filtered, name-sorted team lists"),
+    QueryPattern("PositionJob", ("DepartmentID",), ("Name",), "department-filtered, name-sorted position lists"),
+    QueryPattern("Employee", ("Email",), (), "email uniqueness checks"),
+    QueryPattern("Organization", ("TopDepartmentID",), (), "top department references on department delete"),
+    QueryPattern("Department", ("ParentDepartmentID",), (), "subdepartments (org chart, cycle checks)"),
+    QueryPattern("Department", ("HeadOfDepartmentID",), (), "head references on employee delete"),
+    QueryPattern("Team", ("ParentTeamID",), (), "subteams (cycle checks)"),
+    QueryPattern("Team", ("TeamLeaderID",), (), "leader references on employee delete"),
+    QueryPattern("EmployeePosition", ("EmployeeID",), (), "positions of an employee"),
+    QueryPattern("EmployeePosition", ("PositionID",), ("StartDate",), "holders of a position over time"),
+    QueryPattern("TeamMember", ("TeamID",), ("EmployeeID",), "keyset-paginated team members"),
+    QueryPattern("TeamMember", ("EmployeeID",), (), "teams of an employee (employee deletes, counters)"),
+    QueryPattern("AggregateCounter", ("Scope", "ScopeID"), (), "materialized counters"),
+    QueryPattern("Tombstone", ("Entity",), ("DeletedAt",), "deletions since a sync cursor"),
+] + [
+    QueryPattern(table, (), ("UpdatedAt",), "ETag versions of lists, changes since a sync cursor")
+    for table in ("Organization", "Department", "Employee", "PositionJob", "Team")
+] + [
+    QueryPattern(table, (), ("UpdatedAt",), "changes since a sync cursor")
+    for table in ("EmployeePosition", "TeamMember")
+]
+
+def model_schema() -> dict:
+    """Tables declared by the models, in the shape of introspect_schema"""
+    tables = {}
+    for table in Base.metadata.sorted_tables:
+        indexes = {}
+        if table.primary_key.columns:
+            indexes["PRIMARY"] = {"columns": [c.name for c in table.primary_key.columns], "unique": True, "type": "BTREE"}
+        for index in table.indexes:
+            prefix = index.dialect_options["mysql"]["prefix"]
+            indexes[index.name] = {
+                "columns": [c.name for c in index.columns],
+                "unique": bool(index.unique),
+                "type": prefix.upper() if prefix else "BTREE"
+            }
+        for constraint in table.constraints:
+            if isinstance(constraint, UniqueConstraint):
+                columns = [c.name for c in constraint.columns]
+                indexes[constraint.name or "_".join(columns)] = {"columns": columns, "unique": True, "type": "BTREE"}
+        tables[table.name] = {
+            "columns": {c.name: {"type": str(c.type), "nullable": c.nullable} for c in table.columns},
+            "indexes": indexes,
+            "foreign_keys": {
+                fk.name or f"fk_{table.name}_{'_'.join(fk.column_keys)}": {
+                    "columns": list(fk.column_keys),
+                    "references": fk.referred_table.name,
+                    "referenced_columns": [element.column.name for element in fk.elements]
+                }
+                for fk in table.foreign_key_constraints
+            }
+        }
+    return tables
+
+def _split_definitions(body: str) -> List[str]:
+    """Split the body of a CREATE TABLE on commas outside parentheses"""
+    parts, depth, current = [], 0, []
+    for char in body:
+        if char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        depth += (char == "(") - (char == ")")
+        current.append(char)
+    parts.append("".join(current).strip())
+    return [part for part in parts if part]
+
+def _column_list(columns: str) -> List[str]:
+    return [re.sub(r"\(\d+\)$", "", c.strip().strip("`")) for c in columns.split(",")]
+
+_CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?\s*\((.*)\)[^)]*$", re.I | re.S)
+_INDEX = re.compile(r"(UNIQUE\s+|FULLTEXT\s+)?(?:INDEX|KEY)\s+`?(\w+)`?\s*\((.*)\)", re.I | re.S)
+_PRIMARY_KEY = re.compile(r"PRIMARY\s+KEY\s*\((.*)\)", re.I | re.S)
+_CREATE_INDEX = re.compile(r"CREATE\s+(UNIQUE\s+|FULLTEXT\s+)?INDEX\s+`?(\w+)`?\s+ON\s+`?(\w+)`?\s*\((.*)\)", re.I | re.S)
+_ALTER_TABLE = re.compile(r"ALTER\s+TABLE\s+`?(\w+)`?(.*)", re.I | re.S)
+_FOREIGN_KEY = re.compile(
+    r"ADD\s+CONSTRAINT\s+`?(\w+)`?\s+FOREIGN\s+KEY\s*\(([^)]*)\)\s*REFERENCES\s+`?(\w+)`?\s*\(([^)]*)\)", re.I
+)
+
+def parse_schema_sql(path: Path = SCHEMA_SQL) -> dict:
+    """
+    Tables declared by a DDL file such as schema.sql, in the shape of introspect_schema.
+
+    Understands the statements our DDL uses: CREATE TABLE with inline
+    indexes, CREATE INDEX and ALTER TABLE ... ADD CONSTRAINT ... FOREIGN KEY.
+    """
+    sql = re.sub(r"--[^\n]*", "", Path(path).read_text())
+    tables = {}
+    for statement in sql.split(";"):
+        statement = statement.strip()
+        create = _CREATE_TABLE.match(statement)
+        if create:
+            table = tables[create.group(1)] = {"columns": {}, "indexes": {}, "foreign_keys": {}}
+            for definition in _split_definitions(create.group(2)):
+                index = _INDEX.match(definition)
+                primary_key = _PRIMARY_KEY.match(definition)
+                if index:
+                    kind = (index.group(1) or "").strip().upper()
+                    table["indexes"][index.group(2)] = {
+                        "columns": _column_list(index.group(3)),
+                        "unique": kind == "UNIQUE",
+                        "type": "FULLTEXT" if kind == "FULLTEXT" else "BTREE"
+                    }
+                elif primary_key:
+                    table["indexes"]["PRIMARY"] = {"columns": _column_list(primary_key.group(1)), "unique": True, "type": "BTREE"}
+                elif not re.match(r"(CONSTRAINT|FOREIGN|CHECK)\b", definition, re.I):
+                    name, column_type = definition.split()[:2]
+                    upper = definition.upper()
+                    table["columns"][name.strip("`")] = {
+                        "type": column_type,
+                        "nullable": "NOT NULL" not in upper and "PRIMARY KEY" not in upper
+                    }
+                    if "PRIMARY KEY" in upper:
+                        table["indexes"]["PRIMARY"] = {"columns": [name.strip("`")], "unique": True, "type": "BTREE"}
+                    elif re.search(r"\bUNIQUE\b", upper):
+                        table["indexes"][name.strip("`")] = {"columns": [name.strip("`")], "unique": True, "type": "BTREE"}
+            continue
+        create_index = _CREATE_INDEX.match(statement)
+        if create_index and create_index.group(3) in tables:
+            kind = (create_index.group(1) or "").strip().upper()
+            tables[create_index.group(3)]["indexes"][create_index.group(2)] = {
+                "columns": _column_list(create_index.group(4)),
+                "unique": kind == "UNIQUE",
+                "type": "FULLTEXT" if kind == "FULLTEXT" else "BTREE"
+            }
+            continue
+        alter = _ALTER_TABLE.match(statement)
+        if alter and alter.group(1) in tables:
+            for name, columns, references, referenced_columns in _FOREIGN_KEY.findall(alter.group(2)):
+                tables[alter.group(1)]["foreign_keys"][name] = {
+                    "columns": _column_list(columns),
+                    "references": references,
+                    "referenced_columns": _column_list(referenced_columns)
+                }
+    return tables
+
+def _btree_indexes(table: dict) -> Dict[str, dict]:
+    return {name: index for name, index in table["indexes"].items() if index["type"] == "BTREE"}
+
+def _key_columns(name: str, index: dict, primary_key: List[str]) -> List[str]:
+    """Columns an InnoDB index can be searched and sorted by: secondary indexes end with the primary key"""
+    if name == "PRIMARY":
+        return index["columns"]
+    return index["columns"] + [c for c in primary_key if c not in index["columns"]]
+
+def serves(pattern: QueryPattern, table: dict) -> Optional[str]:
+    """Name of an index of table that serves pattern (equality columns first, in any order, then the order columns)"""
+    primary_key = table["indexes"].get("PRIMARY", {}).get("columns", [])
+    width = len(pattern.equality)
+    for name, index in _btree_indexes(table).items():
+        columns = _key_columns(name, index, primary_key)
+        if set(columns[:width]) == set(pattern.equality) and tuple(columns[width:width + len(pattern.order)]) == pattern.order:
+            return name
+    return None
+
+def _index_name(table: str, columns: tuple) -> str:
+    return f"idx_{table.lower()}_{'_'.join(column.lower() for column in columns)}"
+
+def advise(tables: dict) -> dict:
+    """
+    Index advice for tables (in the shape of introspect_schema).
+
+    missing: QUERY_PATTERNS no BTREE index serves, with the CREATE INDEX
+    that would. redundant: non-unique indexes whose columns are a leading
+    prefix of another index, which serves every query they serve (and
+    the foreign key they may back), while costing writes and buffer pool.
+    """
+    missing = []
+    for pattern in QUERY_PATTERNS:
+        table = tables.get(pattern.table)
+        if table is None or serves(pattern, table):
+            continue
+        columns = pattern.equality + pattern.order
+        missing.append({
+            "table": pattern.table,
+            "columns": list(columns),
+            "used_by": pattern.used_by,
+            "statement": f"CREATE INDEX {_index_name(pattern.table, columns)} ON {pattern.table} ({', '.join(columns)});"
+        })
+
+    redundant = []
+    for table_name, table in tables.items():
+        indexes = _btree_indexes(table)
+        for name, index in indexes.items():
+            if name == "PRIMARY" or index["unique"]:
+                continue
+            width = len(index["columns"])
+            for other_name, other in indexes.items():
+                if other_name == name or other["columns"][:width] != index["columns"]:
+                    continue
+                # Of two identical non-unique indexes only the later name is reported
+                if len(other["columns"]) == width and not other["unique"] and other_name != "PRIMARY" and other_name > name:
+                    continue
+                redundant.append({
+                    "table": table_name,
+                    "index": name,
+                    "columns": index["columns"],
+                    "covered_by": other_name,
+                    "statement": f"DROP INDEX {name} ON {table_name};"
+                })
+                break
+    return {"missing": missing, "redundant": redundant}
+
+def compare(expected: dict, actual: dict) -> dict:
+    """
+    Differences between two schemas, per table.
+
+    Indexes are matched by columns, uniqueness and type, foreign keys by
+    columns and referenced table, so differently named equivalents (such as
+    generated names) don't count. Column types aren't compared, as DDL and
+    SQLAlchemy spell them differently.
+    """
+    def index_keys(table: dict) -> dict:
+        return {(tuple(i["columns"]), i["unique"], i["type"]): name for name, i in table["indexes"].items()}
+
+    def fk_keys(table: dict) -> dict:
+        return {(tuple(fk["columns"]), fk["references"]): name for name, fk in table["foreign_keys"].items()}
+
+    drift = {}
+    for name in sorted(set(expected) | set(actual)):
+        if name not in actual:
+            drift[name] = {"missing_table": True}
+            continue
+        if name not in expected:
+            drift[name] = {"unexpected_table": True}
+            continue
+        differences = {}
+        for kind, keys in (("columns", lambda t: {c: c for c in t["columns"]}), ("indexes", index_keys), ("foreign_keys", fk_keys)):
+            wanted, found = keys(expected[name]), keys(actual[name])
+            missing = sorted(wanted[key] for key in wanted.keys() - found.keys())
+            unexpected = sorted(found[key] for key in found.keys() - wanted.keys())
+            if missing:
+                differences[f"missing_{kind}"] = missing
+            if unexpected:
+                differences[f"unexpected_{kind}"] = unexpected
+        if differences:
+            drift[name] = differences
+    return drift
+
+def schema_report(conn=None, schema_path: Path = SCHEMA_SQL) -> dict:
+    """
+    Introspect the database and report index advice and drift.
+
+    With a connection the advice is for the live database, and both the
+    models and schema.sql are compared with it. Without one (offline), the
+    advice is for schema.sql and only the models are compared with it.
+    """
+    try:
+        declared = parse_schema_sql(schema_path)
+    except OSError as e:
+        logger.warning(f"Schema file unavailable, skipping its comparison: {e}")
+        declared = None
+    if conn is not None:
+        source, tables = "database", introspect_schema(conn)
+    elif declared is not None:
+        source, tables = "schema.sql", declared
+    else:
+        raise ValueError("Nothing to introspect: no database connection and no schema file")
+
+    drift = {"models": compare(model_schema(), tables)}
+    if conn is not None:
+        drift["schema_sql"] = compare(declared, tables) if declared is not None else None
+    return {
+        "source": source,
+        "tables": tables,
+        "advice": advise(tables),
+        "drift": drift
+    }
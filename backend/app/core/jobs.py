@@ -0,0 +1,386 @@
+import inspect
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, get_type_hints
+from fastapi import HTTPException
+from pydantic import TypeAdapter, ValidationError
+from .cache import cache
+from .config import get_settings
+from .logger import setup_logger
+from .metrics import increment_counter
+from .outbox import request_id_var
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+PREFIX = "jobs:"
+
+# Job states; the last three are final
+STATUSES = ("queued", "running", "retrying", "completed", "failed", "cancelled")
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# Pops the next job of a type unless the type's running jobs reached its
+# limit. KEYS: queue list, active lease zset; ARGV: limit, lease seconds.
+# Leases that expired (their worker died) are requeued first. Scores are
+# Redis server time, so every worker sees the same clock.
+CLAIM_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)) do
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('RPUSH', KEYS[1], id)
+end
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[1]) then
+    return false
+end
+local id = redis.call('RPOP', KEYS[1])
+if id then
+    redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), id)
+end
+return id
+"""
+
+# Moves due retries ("type:id" members of the delayed zset, scored by
+# due time) to the front of their type's queue. KEYS: delayed zset;
+# ARGV: queue key prefix.
+PROMOTE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now)
+for _, member in ipairs(due) do
+    redis.call('ZREM', KEYS[1], member)
+    local separator = string.find(member, ':', 1, true)
+    redis.call('RPUSH', ARGV[1] .. string.sub(member, 1, separator - 1), string.sub(member, separator + 1))
+end
+return #due
+"""
+
+# Extends a lease while the job still holds it. KEYS: active lease zset;
+# ARGV: job ID, lease seconds.
+RENEW_SCRIPT = """
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return 0
+end
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[1])
+return 1
+"""
+
+class JobCancelled(Exception):
+    """Raised inside a job by JobContext.check_cancelled once cancellation was requested"""
+
+class JobType(NamedTuple):
+    name: str
+    handler: Callable
+    concurrency: int  # Jobs of the type running at once across all workers
+    max_retries: int
+    description: str
+    api: bool  # Whether POST /jobs may queue it (False: CLI and server code only)
+
+# Registered job types by name (see job_type)
+JOB_TYPES: Dict[str, JobType] = {}
+
+def job_type(name: str, concurrency: int = 1, max_retries: int = None, api: bool = True):
+    """
+    Register a function as the handler of a job type.
+
+    The handler is called as handler(context, **params) in a worker process
+    and returns the job's JSON-serializable result. Params are checked
+    against the handler's signature and type hints when enqueued. It should report
+    progress and call context.check_cancelled() between units of work.
+    Exceptions fail the attempt and are retried with backoff, except
+    HTTPException (a bad request doesn't get better) and JobCancelled.
+    JOBS_CONCURRENCY overrides concurrency per type. Types registered with
+    api=False can't be queued through POST /jobs, for params API clients
+    must not choose (e.g. server file paths).
+    """
+    def register(handler: Callable) -> Callable:
+        JOB_TYPES[name] = JobType(
+            name=name,
+            handler=handler,
+            concurrency=concurrency,
+            max_retries=settings.JOBS_MAX_RETRIES if max_retries is None else max_retries,
+            description=(handler.__doc__ or "").strip().split("\n")[0],
+            api=api
+        )
+        return handler
+    return register
+
+@lru_cache(maxsize=64)
+def _adapter(annotation) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+def _validate_params(name: str, params: dict) -> dict:
+    """Params bound to the handler's signature and validated against its type hints; 400 if invalid"""
+    handler = JOB_TYPES[name].handler
+    try:
+        bound = inspect.signature(handler).bind(None, **params)
+    except TypeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid params for {name}: {e}")
+    hints = get_type_hints(handler)
+    validated = {}
+    for param, value in list(bound.arguments.items())[1:]:
+        try:
+            validated[param] = _adapter(hints[param]).validate_python(value) if param in hints else value
+        except ValidationError as e:
+            errors = "; ".join(error["msg"] for error in e.errors())
+            raise HTTPException(status_code=400, detail=f"Invalid params for {name}: {param}: {errors}")
+    return validated
+
+def _job_key(job_id: str) -> str:
+    return f"{PREFIX}job:{job_id}"
+
+def _queue_key(name: str) -> str:
+    return f"{PREFIX}queue:{name}"
+
+def _active_key(name: str) -> str:
+    return f"{PREFIX}active:{name}"
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+# Job hash fields holding JSON
+_JSON_FIELDS = ("params", "result", "details")
+
+def _decode(stored: dict) -> dict:
+    job = {key.decode(): value.decode() for key, value in stored.items()}
+    for field in _JSON_FIELDS:
+        job[field] = json.loads(job[field]) if job.get(field) else None
+    job["attempts"] = int(job.get("attempts", 0))
+    job["progress"] = float(job.get("progress", 0))
+    job["cancel_requested"] = job.get("cancel_requested") == "1"
+    for field in ("error", "started_at", "finished_at"):
+        job[field] = job.get(field) or None
+    return job
+
+class JobQueue:
+    """
+    Redis-backed queue of background jobs.
+
+    Each job is a hash (jobs:job:{id}) with its type, params, status,
+    attempts, progress, result and error. Queued job IDs wait in a list
+    per type; a running job holds a lease in its type's active set, so a
+    type's concurrency is the size of that set, and jobs of a worker that
+    died are requeued once their lease expires. Failed attempts wait in
+    the delayed set for their retry with exponential backoff. Finished jobs
+    are kept for JOBS_RESULT_TTL seconds.
+    """
+    def __init__(self):
+        self._scripts = None
+
+    def _script(self, name: str):
+        if self._scripts is None:
+            redis = cache.connect()
+            self._scripts = {
+                "claim": redis.register_script(CLAIM_SCRIPT),
+                "promote": redis.register_script(PROMOTE_SCRIPT),
+                "renew": redis.register_script(RENEW_SCRIPT),
+            }
+        return self._scripts[name]
+
+    def concurrency(self, name: str) -> int:
+        return settings.JOBS_CONCURRENCY.get(name, JOB_TYPES[name].concurrency)
+
+    def enqueue(self, name: str, params: dict = None) -> dict:
+        """Queue a job of a registered type; 400 for unknown types"""
+        if name not in JOB_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unknown job type: {name} (one of {', '.join(sorted(JOB_TYPES))})")
+        params = _validate_params(name, params or {})
+        job_id = uuid.uuid4().hex
+        redis = cache.connect()
+        with redis.pipeline() as pipe:
+            pipe.hset(_job_key(job_id), mapping={
+                "id": job_id,
+                "type": name,
+                "params": json.dumps(params),
+                "status": "queued",
+                "attempts": 0,
+                "progress": 0,
+                "created_at": _now()
+            })
+            pipe.lpush(_queue_key(name), job_id)
+            pipe.execute()
+        increment_counter("jobs", name, "enqueued")
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Job state, None if unknown or expired"""
+        stored = cache.connect().hgetall(_job_key(job_id))
+        return _decode(stored) if stored else None
+
+    def _update(self, job_id: str, **fields):
+        mapping = {
+            key: json.dumps(value) if key in _JSON_FIELDS else ("" if value is None else value)
+            for key, value in fields.items()
+        }
+        cache.connect().hset(_job_key(job_id), mapping=mapping)
+
+    def _finish(self, job: dict, status: str, **fields):
+        """Record a final status, release the lease and let the job expire"""
+        self._update(job["id"], status=status, finished_at=_now(), **fields)
+        redis = cache.connect()
+        redis.zrem(_active_key(job["type"]), job["id"])
+        redis.expire(_job_key(job["id"]), settings.JOBS_RESULT_TTL)
+        increment_counter("jobs", job["type"], status)
+
+    def cancel(self, job_id: str) -> dict:
+        """
+        Cancel a job; 404 if unknown.
+
+        Queued and retrying jobs are cancelled at once (workers skip them);
+        running jobs are asked to stop and end at their next
+        check_cancelled(). Finished jobs are returned unchanged.
+        """
+        job = self.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job["status"] in FINAL_STATUSES:
+            return job
+        self._update(job_id, cancel_requested=1)
+        if job["status"] in ("queued", "retrying"):
+            cache.connect().zrem(f"{PREFIX}delayed", f"{job['type']}:{job_id}")
+            self._finish(job, "cancelled")
+        return self.get(job_id)
+
+    def claim(self, names: Iterable[str]) -> Optional[dict]:
+        """Take the next runnable job of the given types, respecting their concurrency limits"""
+        self._script("promote")(keys=[f"{PREFIX}delayed"], args=[f"{PREFIX}queue:"])
+        for name in names:
+            job_id = self._script("claim")(
+                keys=[_queue_key(name), _active_key(name)],
+                args=[self.concurrency(name), settings.JOBS_LEASE_SECONDS]
+            )
+            if job_id is None:
+                continue
+            job = self.get(job_id.decode())
+            if job is None or job["status"] in FINAL_STATUSES:
+                # Cancelled (or expired) while queued
+                cache.connect().zrem(_active_key(name), job_id)
+                continue
+            return job
+        return None
+
+    def renew(self, job: dict) -> bool:
+        """Extend the lease of a running job; False once the job lost it"""
+        return bool(self._script("renew")(keys=[_active_key(job["type"])], args=[job["id"], settings.JOBS_LEASE_SECONDS]))
+
+    def retry(self, job: dict, error: str):
+        """Schedule another attempt after exponential backoff (with jitter)"""
+        delay = min(settings.JOBS_RETRY_BACKOFF * 2 ** (job["attempts"] - 1), settings.JOBS_RETRY_BACKOFF_MAX)
+        delay *= random.uniform(0.8, 1.2)
+        redis = cache.connect()
+        self._update(job["id"], status="retrying", error=error)
+        redis.zadd(f"{PREFIX}delayed", {f"{job['type']}:{job['id']}": time.time() + delay})
+        redis.zrem(_active_key(job["type"]), job["id"])
+        increment_counter("jobs", job["type"], "retries")
+
+    def stats(self) -> dict:
+        """Queued and running jobs per type"""
+        redis = cache.connect()
+        return {
+            name: {
+                "queued": redis.llen(_queue_key(name)),
+                "running": redis.zcard(_active_key(name)),
+                "concurrency": self.concurrency(name)
+            }
+            for name in sorted(JOB_TYPES)
+        }
+
+# Global job queue instance
+job_queue = JobQueue()
+
+class JobContext:
+    """Handle of a running job passed to its handler"""
+    def __init__(self, job: dict):
+        self.job = job
+        self.job_id = job["id"]
+        self.attempt = job["attempts"]
+
+    def progress(self, fraction: float, **details):
+        """Record progress (0..1) and optional JSON-serializable details"""
+        fields = {"progress": round(min(max(fraction, 0.0), 1.0), 4)}
+        if details:
+            fields["details"] = details
+        job_queue._update(self.job_id, **fields)
+
+    def cancelled(self) -> bool:
+        return cache.connect().hget(_job_key(self.job_id), "cancel_requested") == b"1"
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancellation was requested"""
+        if self.cancelled():
+            raise JobCancelled()
+
+class Worker:
+    """
+    Runs jobs of the given types (all registered types by default) one at a time.
+
+    A heartbeat thread renews the job's lease every third of
+    JOBS_LEASE_SECONDS. Start several worker processes for parallelism,
+    see app.cli.worker.
+    """
+    def __init__(self, names: List[str] = None):
+        self.names = list(names or sorted(JOB_TYPES))
+        self._stop = threading.Event()
+
+    def _heartbeat(self, job: dict, done: threading.Event):
+        while not done.wait(settings.JOBS_LEASE_SECONDS / 3):
+            try:
+                if not job_queue.renew(job):
+                    logger.warning(f"Job {job['id']} lost its lease")
+                    return
+            except Exception as e:
+                logger.error(f"Failed to renew lease of job {job['id']}: {e}")
+
+    def execute(self, job: dict):
+        """Run one claimed job and record its outcome"""
+        job_type = JOB_TYPES[job["type"]]
+        job["attempts"] += 1
+        request_id_var.set(f"job:{job['id']}")  # Tags the change events of the job's writes
+        job_queue._update(job["id"], status="running", attempts=job["attempts"], started_at=_now(), error=None)
+        done = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job, done), daemon=True).start()
+        try:
+            result = job_type.handler(JobContext(job), **job["params"])
+            job_queue._finish(job, "completed", result=result, progress=1)
+        except JobCancelled:
+            job_queue._finish(job, "cancelled")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.error(f"Job {job['id']} ({job['type']}) attempt {job['attempts']} failed: {error}")
+            if isinstance(e, HTTPException) or job["attempts"] > job_type.max_retries:
+                job_queue._finish(job, "failed", error=error)
+            else:
+                job_queue.retry(job, error)
+        finally:
+            done.set()
+
+    def run_once(self) -> bool:
+        """Claim and run one job; False when none was runnable"""
+        job = job_queue.claim(self.names)
+        if job is None:
+            return False
+        self.execute(job)
+        return True
+
+    def run(self, burst: bool = False):
+        """Process jobs until stopped (or, with burst, until none is runnable)"""
+        logger.info(f"Worker started for job types: {', '.join(self.names)}")
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                logger.error(f"Worker failed to claim a job: {e}")
+            if burst:
+                return
+            self._stop.wait(settings.JOBS_POLL_INTERVAL)
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,123 @@
+from typing import Dict, Iterable, List, Optional
+from fastapi import Depends, HTTPException
+from sqlalchemy.orm import Session
+from .config import get_settings
+from .db import get_db_session
+from .includes import Includes, include_response, with_includes
+from .projection import projected_response
+
+settings = get_settings()
+
+def parse_ids(ids: Optional[str]) -> Optional[List[int]]:
+    """
+    Parse an ?ids=1,2,3 value into unique IDs in request order.
+
+    Returns None when no IDs were requested and raises a 400 error for
+    non-integer values or more than BULK_MAX_ITEMS IDs.
+    """
+    if ids is None:
+        return None
+    try:
+        parsed = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+    parsed = list(dict.fromkeys(parsed))
+    if len(parsed) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BULK_MAX_ITEMS} ids per request")
+    return parsed
+
+class Loader:
+    """
+    Batches primary key lookups of one model within a request.
+
+    Code paths prime() the IDs they will need; the first load() fetches
+    every pending ID with a single IN query and later loads of any primed
+    or already loaded ID are answered without touching the database.
+    Missing rows load as None. With includes, the batch query eager loads
+    the included relationships (see core.includes).
+    """
+    def __init__(self, db: Session, model, includes: Optional[Includes] = None):
+        self.db = db
+        self.model = model
+        self.includes = includes
+        self.pk = model.__mapper__.primary_key[0]
+        self.pending = set()
+        self.loaded: Dict[int, object] = {}
+
+    def prime(self, *ids: Optional[int]):
+        """Queue IDs for the next batch (None and known IDs are ignored)"""
+        self.pending.update(
+            entity_id for entity_id in ids
+            if entity_id is not None and entity_id not in self.loaded
+        )
+
+    def _dispatch(self):
+        ids = list(self.pending)
+        self.pending.clear()
+        for start in range(0, len(ids), settings.BULK_MAX_ITEMS):
+            chunk = ids[start:start + settings.BULK_MAX_ITEMS]
+            query = self.db.query(self.model).filter(self.pk.in_(chunk))
+            if self.includes:
+                query = with_includes(query, self.model, self.includes)
+            rows = query.all()
+            self.loaded.update(dict.fromkeys(chunk))
+            self.loaded.update((getattr(row, self.pk.key), row) for row in rows)
+
+    def load_many(self, ids: Iterable[int]) -> List[Optional[object]]:
+        """Rows for ids in the same order, None where a row doesn't exist"""
+        ids = list(ids)
+        self.prime(*ids)
+        if self.pending:
+            self._dispatch()
+        return [self.loaded.get(entity_id) for entity_id in ids]
+
+    def load(self, entity_id: int) -> Optional[object]:
+        """Row for one ID, fetched together with every other pending ID"""
+        return self.load_many([entity_id])[0]
+
+class Loaders:
+    """Per-request registry holding one Loader per model (and include set)"""
+    def __init__(self, db: Session):
+        self.db = db
+        self.loaders = {}
+
+    def __getitem__(self, model) -> Loader:
+        return self.including(model, None)
+
+    def including(self, model, includes: Optional[Includes]) -> Loader:
+        """Loader of model rows with the included relationships eager loaded"""
+        key = (model, includes or None)
+        if key not in self.loaders:
+            self.loaders[key] = Loader(self.db, model, includes or None)
+        return self.loaders[key]
+
+def get_loaders(db: Session = Depends(get_db_session)) -> Loaders:
+    """
+    Dependency providing the request's loaders.
+
+    FastAPI resolves it once per request, so every dependency and endpoint
+    of the request shares the same batches (and database session).
+    """
+    return Loaders(db)
+
+def load_response(
+    loaders: Loaders,
+    model,
+    ids: List[int],
+    response_model,
+    selected: Optional[tuple] = None,
+    includes: Optional[Includes] = None
+):
+    """
+    Response of an ?ids= batch fetch: the existing rows in requested order.
+
+    IDs without a row are left out; selected restricts the fields as with
+    ?fields= on list endpoints. The rows come from the request's loader of
+    model and includes, which eager loads the included relationships.
+    """
+    rows = [row for row in loaders.including(model, includes).load_many(ids) if row is not None]
+    if includes:
+        return include_response(rows, model, includes)
+    if selected:
+        return projected_response(rows, response_model, selected)
+    return rows
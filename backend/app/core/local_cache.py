@@ -0,0 +1,109 @@
+import time
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from typing import Any, Iterable, Optional
+from .config import get_settings
+
+settings = get_settings()
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with per-entry TTL and tag-based eviction.
+
+    Each worker holds its own instance; cross-worker consistency comes from
+    the invalidation messages published by RedisCache.invalidate.
+    """
+    def __init__(self, max_entries: int, ttl: float):
+        self.lock = Lock()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self.tags = defaultdict(set)  # tag -> keys
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.generation = 0  # Bumped by every eviction, see set(since=)
+
+    def _remove(self, key: str):
+        _, _, tags = self.entries.pop(key)
+        for tag in tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a live entry and mark it most recently used"""
+        if not settings.LOCAL_CACHE_ENABLED:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = (), since: Optional[int] = None):
+        """
+        Store an entry, evicting the least recently used ones over capacity.
+
+        With since (the generation read before value was computed) nothing
+        is stored if any eviction happened meanwhile, as it may have been
+        meant for value; the next caller fills the entry instead.
+        """
+        if not settings.LOCAL_CACHE_ENABLED:
+            return
+        tags = tuple(tags)
+        with self.lock:
+            if since is not None and since != self.generation:
+                return
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self.tags[tag].add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def evict(self, *tags: str) -> int:
+        """Drop every entry registered under any of the given tags"""
+        with self.lock:
+            self.generation += 1
+            keys = set()
+            for tag in tags:
+                keys.update(self.tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Drop all entries (used when invalidation messages may have been missed)"""
+        with self.lock:
+            self.generation += 1
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            self.tags.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+# Global per-worker cache instance
+local_cache = LocalCache(settings.LOCAL_CACHE_MAX_ENTRIES, settings.LOCAL_CACHE_TTL)
@@ -1,8 +1,53 @@
+from bisect import bisect_left
 from collections import defaultdict
 from statistics import mean
 from threading import Lock
+from typing import Sequence
 import time
 
+# Default histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Thread-safe histogram of durations with fixed buckets, reported Prometheus style (cumulative)"""
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.lock = Lock()
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        with self.lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.total += value
+            self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf beyond the last bucket)"""
+        with self.lock:
+            rank = q * self.count
+            seen = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                seen += count
+                if seen >= rank and seen:
+                    return bound
+            return 0.0
+
+    def stats(self) -> dict:
+        with self.lock:
+            cumulative, seen = {}, 0
+            for bound, count in zip(self.buckets, self.counts):
+                seen += count
+                cumulative[str(bound)] = seen
+            cumulative["+Inf"] = self.count
+            return {
+                "buckets": cumulative,
+                "count": self.count,
+                "sum": round(self.total, 6),
+                "avg": round(self.total / self.count, 6) if self.count else 0.0
+            }
+
 class Metrics:
     def __init__(self):
         self.lock = Lock()
@@ -10,6 +55,7 @@ class Metrics:
         self.status_codes = defaultdict(int)
         self.endpoints = defaultdict(int)
         self.response_times = defaultdict(list)
+        self.counters = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
         
     def update(self, method: str, path: str, status_code: int, response_time: float):
         with self.lock:
@@ -23,6 +69,10 @@ class Metrics:
             cutoff = time.time() - 3600
             self.requests[key] = [t for t in self.requests[key] if t > cutoff]
     
+    def increment(self, group: str, key: str, field: str, amount: int = 1):
+        with self.lock:
+            self.counters[group][key][field] += amount
+    
     def get_stats(self):
         with self.lock:
             stats = {
@@ -43,6 +93,8 @@ class Metrics:
                     for endpoint, times in self.requests.items()
                 }
             }
+            for group, keys in self.counters.items():
+                stats[group] = {key: dict(fields) for key, fields in keys.items()}
             return stats
 
 # Global metrics instance
@@ -52,6 +104,10 @@ def update_metrics(method: str, path: str, status_code: int, response_time: floa
     """Update global metrics"""
     _metrics.update(method, path, status_code, response_time)
 
+def increment_counter(group: str, key: str, field: str, amount: int = 1):
+    """Increment a named counter reported under its group in /metrics"""
+    _metrics.increment(group, key, field, amount)
+
 def get_metrics():
     """Get current metrics"""
     return _metrics.get_stats() 
\ No newline at end of file
@@ -4,20 +4,61 @@ import uuid
 from typing import Callable
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.concurrency import iterate_in_threadpool
+from .compression import decode_prefix
 from .logger import setup_logger
 from .metrics import update_metrics
+from .outbox import request_id_var
 from .redis_logger import redis_logger
 import asyncio
 import traceback
 
 logger = setup_logger(__name__)
 
+LOG_BODY_LIMIT = 1000  # Characters of the response body kept in the log
+
+# Probe endpoints hit every few seconds by load balancers; not logged
+UNLOGGED_PATHS = ("/livez", "/readyz")
+
 class LoggingMiddleware(BaseHTTPMiddleware):
+    async def _log_response(self, body_iterator, response: Response, request: Request,
+                            request_id: str, process_time: float):
+        """Pass the body through while capturing its prefix, then log the response"""
+        prefix = bytearray()
+        size = 0
+        try:
+            async for chunk in body_iterator:
+                size += len(chunk)
+                if len(prefix) < LOG_BODY_LIMIT:
+                    prefix.extend(chunk[:LOG_BODY_LIMIT - len(prefix)])
+                yield chunk
+        finally:
+            encoding = response.headers.get("content-encoding", "")
+            body = decode_prefix(bytes(prefix), encoding) if encoding else bytes(prefix)
+            try:
+                await redis_logger.log(
+                    level="INFO",
+                    message=f"Response {response.status_code} for {request.method} {request.url.path}",
+                    request_id=request_id,
+                    response={
+                        "status_code": response.status_code,
+                        "headers": dict(response.headers),
+                        "body": body.decode(errors="replace")[:LOG_BODY_LIMIT],
+                        "body_truncated": size > len(prefix),
+                        "body_size": size,
+                        "process_time_ms": round(process_time, 2)
+                    }
+                )
+            except Exception as e:
+                logger.error(f"Failed to log response for request {request_id}: {e}")
+
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        if request.url.path in UNLOGGED_PATHS:
+            return await call_next(request)
+
         # Generate request ID
         request_id = str(uuid.uuid4())
         request.state.request_id = request_id
+        request_id_var.set(request_id)  # Tags the change events of the request's writes
         
         # Start timer
         start_time = time.time()
@@ -61,23 +102,10 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             process_time = (time.time() - start_time) * 1000
             update_metrics(request.method, str(request.url.path), response.status_code, process_time)
             
-            # Log response directly to Redis
-            response_body = ""
-            if not response.headers.get("content-encoding", ""):
-                response_body = [section async for section in response.body_iterator]
-                response.body_iterator = iterate_in_threadpool(iter(response_body))
-                response_body = b"".join(response_body).decode()
-
-            await redis_logger.log(
-                level="INFO",
-                message=f"Response {response.status_code} for {request.method} {request.url.path}",
-                request_id=request_id,
-                response={
-                    "status_code": response.status_code,
-                    "headers": dict(response.headers),
-                    "body": response_body if len(response_body) < 1000 else "(body too large)",
-                    "process_time_ms": round(process_time, 2)
-                }
+            # Log the response once its body has been sent; only a decoded
+            # prefix is kept so streamed and large bodies are never buffered
+            response.body_iterator = self._log_response(
+                response.body_iterator, response, request, request_id, process_time
             )
             
             return response
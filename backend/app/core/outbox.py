@@ -0,0 +1,372 @@
+import itertools
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Sequence
+from sqlalchemy import delete, event, inspect, insert, not_, select, update
+from sqlalchemy.orm import Session
+from .cache import cache
+from .config import get_settings
+from .db import SessionLocal
+from .logger import setup_logger
+from .metrics import increment_counter
+from ..models.tables import (
+    ChangeOutbox, Department, Employee, EmployeePosition, Organization, PositionJob, Team, TeamMember, Tombstone
+)
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+# ID of the request (or job) whose writes are being recorded; set by the
+# logging middleware and the job worker
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Models whose writes are published, with their entity names in events
+ENTITIES = {
+    Organization: "organization",
+    Department: "department",
+    Employee: "employee",
+    PositionJob: "position",
+    Team: "team",
+    TeamMember: "team_member",
+    EmployeePosition: "assignment",
+}
+
+# Membership rows removed by ON DELETE CASCADE when their parent row is
+# deleted; the ORM doesn't see them, so they are looked up before the flush
+DEPENDENTS = {
+    Employee: ((TeamMember, TeamMember.EmployeeID), (EmployeePosition, EmployeePosition.EmployeeID)),
+    Team: ((TeamMember, TeamMember.TeamID),),
+    PositionJob: ((EmployeePosition, EmployeePosition.PositionID),),
+}
+
+# Foreign keys with ON DELETE SET NULL: (referencing model, column) per
+# deleted model. The database's own nulling neither bumps UpdatedAt nor is
+# seen by the ORM, so the references are nulled explicitly before the
+# delete and published as updates of the referencing rows.
+REFERENCES = {
+    Department: ((Organization, Organization.TopDepartmentID), (Department, Department.ParentDepartmentID)),
+    Employee: ((Department, Department.HeadOfDepartmentID), (Team, Team.TeamLeaderID)),
+    Team: ((Team, Team.ParentTeamID),),
+}
+
+# Columns maintained on every write, left out of the changed fields
+TIMESTAMP_FIELDS = ("CreatedAt", "UpdatedAt")
+
+# Seconds between tombstone expiry runs (one worker per interval)
+TOMBSTONE_PRUNE_INTERVAL = 3600
+
+_CASCADED = "outbox_cascaded"
+_DETACHED = "outbox_detached"
+_PENDING = "outbox_pending"
+
+def _entity_key(values: Sequence) -> str:
+    return ":".join(str(value) for value in values)
+
+def _change(model, key: Sequence, operation: str, fields: Optional[Iterable[str]], updated_at: Optional[datetime]) -> dict:
+    now = datetime.utcnow()
+    return {
+        "EventID": uuid.uuid4().hex,
+        "Entity": ENTITIES[model],
+        "EntityKey": _entity_key(key),
+        "Operation": operation,
+        "Fields": ",".join(fields) if fields else None,
+        "UpdatedAt": updated_at or now,
+        "RequestID": request_id_var.get(),
+        "CreatedAt": now,
+    }
+
+def _write(connection, rows: list):
+    """Insert change events, and tombstones for the deletes among them"""
+    connection.execute(insert(ChangeOutbox), rows)
+    tombstones = [
+        {"Entity": row["Entity"], "EntityKey": row["EntityKey"], "DeletedAt": row["CreatedAt"]}
+        for row in rows if row["Operation"] == "delete"
+    ]
+    if tombstones:
+        connection.execute(insert(Tombstone), tombstones)
+
+def _detach(connection, model, ids: list, updated_at: datetime, exclude: dict = None) -> dict:
+    """
+    Null the foreign keys referencing the model rows with ids (about to be
+    deleted) and set UpdatedAt on the rows holding them; returns
+    {(model, primary key): nulled columns}. Rows matching exclude[model]
+    (deleted by the same operation) are left alone.
+    """
+    detached = {}
+    for referencing, column in REFERENCES.get(model, ()):
+        (pk,) = inspect(referencing).primary_key
+        query = select(pk).where(column.in_(ids))
+        if exclude and referencing in exclude:
+            query = query.where(not_(exclude[referencing]))
+        keys = [key for (key,) in connection.execute(query)]
+        if not keys:
+            continue
+        connection.execute(update(referencing).where(pk.in_(keys)).values({column: None, referencing.UpdatedAt: updated_at}))
+        for key in keys:
+            detached.setdefault((referencing, (key,)), set()).add(column.key)
+    return detached
+
+def _detached_changes(detached: dict, updated_at: datetime) -> list:
+    return [
+        _change(model, key, "update", sorted(fields), updated_at)
+        for (model, key), fields in sorted(detached.items(), key=lambda item: (ENTITIES[item[0][0]], item[0][1]))
+    ]
+
+def record_detached(db: Session, model, keys: Iterable[Sequence], exclude: dict = None):
+    """
+    Null the ON DELETE SET NULL foreign keys referencing model rows about
+    to be deleted by a Core statement, bumping UpdatedAt, and write their
+    update events; call it before the DELETE. exclude maps models to
+    conditions of rows deleted by the same operation, which get delete
+    events instead.
+    """
+    if model not in REFERENCES:
+        return
+    updated_at = datetime.utcnow()
+    rows = _detached_changes(_detach(db, model, [key[0] for key in keys], updated_at, exclude), updated_at)
+    if rows:
+        _write(db, rows)
+        db.info[_PENDING] = True
+
+def record_changes(db: Session, model, operation: str, keys: Iterable[Sequence], fields: Iterable[str] = None):
+    """
+    Write change events for rows changed by a Core statement (bulk INSERT
+    or DELETE) that the flush listener can't see; keys are primary key
+    tuples. The events commit or roll back with the transaction of db (a
+    session or a connection).
+    """
+    if model not in ENTITIES:
+        return
+    fields = list(fields) if fields is not None else None
+    rows = [_change(model, key, operation, fields, None) for key in keys]
+    if rows:
+        _write(db, rows)
+        db.info[_PENDING] = True
+
+@event.listens_for(Session, "before_flush")
+def _collect_cascaded(session: Session, flush_context, instances):
+    """Membership rows the database deletes along with deleted rows; nulls the references to them"""
+    keys = set()
+    updated_at, detached = session.info.setdefault(_DETACHED, (datetime.utcnow(), {}))
+    for obj in session.deleted:
+        parent_id = inspect(obj).mapper.primary_key_from_instance(obj)[0]
+        for model, column in DEPENDENTS.get(type(obj), ()):
+            pk = inspect(model).primary_key
+            keys.update((model, tuple(key)) for key in session.connection().execute(select(*pk).where(column == parent_id)))
+        for key, fields in _detach(session.connection(), type(obj), [parent_id], updated_at).items():
+            detached.setdefault(key, set()).update(fields)
+    if keys:
+        session.info.setdefault(_CASCADED, set()).update(keys)
+
+@event.listens_for(Session, "after_flush")
+def _write_outbox(session: Session, flush_context):
+    """
+    Write the change events of a flush into the outbox, in its transaction.
+
+    Runs after the statements (new rows have their IDs) while the session
+    still knows what changed: creates list their set columns, updates
+    their changed columns, deletes none.
+    """
+    rows = []
+    deleted = set()
+    for obj in session.deleted:
+        model = type(obj)
+        if model in ENTITIES:
+            key = tuple(inspect(obj).mapper.primary_key_from_instance(obj))
+            deleted.add((model, key))
+            rows.append(_change(model, key, "delete", None, None))
+    for model, key in sorted(session.info.pop(_CASCADED, set()) - deleted, key=lambda item: (ENTITIES[item[0]], item[1])):
+        rows.append(_change(model, key, "delete", None, None))
+    # Loaded children the ORM nulled itself are in session.dirty and get their update below
+    skipped = deleted | {(type(obj), tuple(inspect(obj).mapper.primary_key_from_instance(obj))) for obj in session.dirty}
+    updated_at, detached = session.info.pop(_DETACHED, (None, {}))
+    rows.extend(_detached_changes({key: fields for key, fields in detached.items() if key not in skipped}, updated_at))
+    for operation, objects in (("create", session.new), ("update", session.dirty)):
+        for obj in objects:
+            model = type(obj)
+            if model not in ENTITIES:
+                continue
+            state = inspect(obj)
+            if operation == "create":
+                fields = [attr.key for attr in state.mapper.column_attrs
+                          if attr.key not in TIMESTAMP_FIELDS and state.dict.get(attr.key) is not None]
+            else:
+                fields = [attr.key for attr in state.mapper.column_attrs
+                          if attr.key not in TIMESTAMP_FIELDS and state.attrs[attr.key].history.has_changes()]
+                if not fields:
+                    continue
+            key = state.mapper.primary_key_from_instance(obj)
+            rows.append(_change(model, key, operation, fields, state.dict.get("UpdatedAt")))
+    if rows:
+        _write(session.connection(), rows)
+        session.info[_PENDING] = True
+
+@event.listens_for(Session, "after_commit")
+def _notify_relay(session: Session):
+    if session.info.pop(_PENDING, False):
+        outbox_relay.notify()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    # The events rolled back with the writes
+    session.info.pop(_PENDING, None)
+    session.info.pop(_CASCADED, None)
+    session.info.pop(_DETACHED, None)
+
+def prune_tombstones(db: Session) -> int:
+    """Delete tombstones older than TOMBSTONE_RETENTION_DAYS in chunks; returns how many"""
+    horizon = datetime.utcnow() - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS)
+    pruned = 0
+    for entity in ENTITIES.values():
+        while True:
+            ids = db.execute(select(Tombstone.TombstoneID).where(
+                Tombstone.Entity == entity, Tombstone.DeletedAt < horizon
+            ).limit(settings.CASCADE_CHUNK_SIZE)).scalars().all()
+            if not ids:
+                break
+            db.execute(delete(Tombstone).where(Tombstone.TombstoneID.in_(ids)))
+            db.commit()
+            pruned += len(ids)
+    return pruned
+
+def _event(row: ChangeOutbox) -> dict:
+    """Stream entry of an outbox row (Redis Streams fields are flat strings)"""
+    return {
+        "event_id": row.EventID,
+        "entity": row.Entity,
+        "id": row.EntityKey,
+        "op": row.Operation,
+        "fields": row.Fields or "",
+        "updated_at": row.UpdatedAt.isoformat(),
+        "request_id": row.RequestID or "",
+    }
+
+class OutboxRelay:
+    """
+    Background thread publishing outbox rows to the CHANGES_STREAM Redis Stream
+    (and hourly expiring old tombstones).
+
+    Rows are read in OutboxID order, added to the stream in one pipeline
+    per CHANGES_RELAY_BATCH and deleted once Redis accepted them. A crash
+    in between publishes a batch twice, never loses it: consumers dedupe
+    on event_id. Commits writing events wake the relay of their process;
+    it also polls every CHANGES_RELAY_INTERVAL seconds for events written
+    elsewhere (jobs, other workers). A Redis lock lets one relay publish
+    at a time, which keeps the stream in outbox order.
+
+    Ordering: OutboxIDs are allocated at flush, not at commit, so a
+    transaction committing after a later one would have its events
+    skipped past. Events of one row are always in order (the row lock
+    serializes its writers, so the later writer's events are inserted
+    after the earlier commit). Across rows, rows are published only once
+    CHANGES_RELAY_LAG seconds old, so transactions committing within that
+    lag of their flush keep their place; consumers must only rely on the
+    order of events of the same entity and id.
+    """
+    def __init__(self):
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def notify(self):
+        """Publish soon (called after commits that wrote events)"""
+        self._wake.set()
+
+    def publish_batch(self, db: Session) -> int:
+        """Publish the oldest outbox rows; returns how many"""
+        horizon = datetime.utcnow() - timedelta(seconds=settings.CHANGES_RELAY_LAG)
+        rows = db.execute(
+            select(ChangeOutbox).order_by(ChangeOutbox.OutboxID).limit(settings.CHANGES_RELAY_BATCH)
+        ).scalars().all()
+        # Stop at the first row within the lag, so rows never overtake an earlier one
+        rows = list(itertools.takewhile(lambda row: row.CreatedAt <= horizon, rows))
+        if not rows:
+            return 0
+        pipe = cache.connect().pipeline(transaction=False)
+        for row in rows:
+            pipe.xadd(settings.CHANGES_STREAM, _event(row), maxlen=settings.CHANGES_STREAM_MAXLEN, approximate=True)
+        pipe.execute()
+        db.execute(delete(ChangeOutbox).where(ChangeOutbox.OutboxID.in_([row.OutboxID for row in rows])))
+        db.commit()
+        return len(rows)
+
+    def run_once(self) -> Optional[int]:
+        """Drain the outbox unless another relay is at it; returns events published"""
+        token = cache.acquire_lock("outbox:relay")
+        if token is None:
+            return None
+        # Stop well within the lock's lifetime; the next run continues
+        deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT_MS / 2000
+        published = 0
+        db = SessionLocal()
+        try:
+            while time.monotonic() < deadline:
+                count = self.publish_batch(db)
+                published += count
+                if count < settings.CHANGES_RELAY_BATCH:
+                    break
+            if published:
+                increment_counter("outbox", "relay", "published", published)
+            return published
+        except Exception as e:
+            db.rollback()
+            increment_counter("outbox", "relay", "failures")
+            logger.error(f"Outbox relay failed after {published} events: {e}")
+            return published
+        finally:
+            db.close()
+            cache.release_lock("outbox:relay", token)
+
+    def prune_once(self) -> Optional[int]:
+        """Expire old tombstones unless another worker did so this hour; returns how many"""
+        try:
+            acquired = cache.connect().set("tombstones:prune", cache.worker_id, nx=True, ex=TOMBSTONE_PRUNE_INTERVAL)
+        except Exception as e:
+            logger.error(f"Tombstone pruning lock failed: {e}")
+            return None
+        if not acquired:
+            return None
+        db = SessionLocal()
+        try:
+            pruned = prune_tombstones(db)
+            increment_counter("outbox", "tombstones", "pruned", pruned)
+            return pruned
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Tombstone pruning failed: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _run(self):
+        pruned_at = time.monotonic()
+        while not self._stop.is_set():
+            self._wake.wait(settings.CHANGES_RELAY_INTERVAL)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            self.run_once()
+            if time.monotonic() - pruned_at >= TOMBSTONE_PRUNE_INTERVAL:
+                pruned_at = time.monotonic()
+                self.prune_once()
+
+    def start(self):
+        """Start the relay thread (CHANGES_RELAY_INTERVAL=0 disables it)"""
+        if self._thread is None and settings.CHANGES_RELAY_INTERVAL > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the relay thread"""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+# Global relay instance
+outbox_relay = OutboxRelay()
@@ -0,0 +1,66 @@
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, Response
+from pydantic import ConfigDict, TypeAdapter, create_model
+from sqlalchemy.orm import Query
+from .config import get_settings
+from .serialization import row_serializer
+
+settings = get_settings()
+
+def select_fields(fields: Optional[str], model, response_model) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a ?fields= value into the ordered response fields to return.
+
+    The primary key is always included. Returns None when no projection
+    was requested and raises a 400 error for unknown field names.
+    """
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(response_model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add(model.__mapper__.primary_key[0].key)
+    return tuple(name for name in response_model.model_fields if name in requested)
+
+def project(query: Query, model, selected: Tuple[str, ...]) -> Query:
+    """Restrict a query on model to the selected columns (keeps filters, order and paging)"""
+    return query.with_entities(*[getattr(model, name) for name in selected])
+
+@lru_cache(maxsize=256)
+def projected_model(response_model, selected: Tuple[str, ...]):
+    """Response model limited to the selected fields, built once per field set"""
+    return create_model(
+        f"{response_model.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{
+            name: (field.annotation, field)
+            for name, field in response_model.model_fields.items()
+            if name in selected
+        }
+    )
+
+@lru_cache(maxsize=256)
+def _adapter(response_model, selected: Tuple[str, ...], many: bool) -> TypeAdapter:
+    schema = projected_model(response_model, selected)
+    return TypeAdapter(List[schema] if many else schema)
+
+def projected_response(rows, response_model, selected: Tuple[str, ...]) -> Response:
+    """Serialize projected rows (a list, or a single row) with the projected model"""
+    adapter = _adapter(response_model, selected, isinstance(rows, list))
+    body = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    return Response(content=body, media_type="application/json")
+
+def list_response(query: Query, model, response_model, selected: Optional[Tuple[str, ...]]) -> Response:
+    """
+    List response built from plain column rows instead of ORM instances.
+
+    With FAST_LIST_SERIALIZATION enabled the rows are encoded directly by a
+    precompiled RowSerializer; otherwise they are validated through the
+    response model restricted to the selected fields.
+    """
+    if settings.FAST_LIST_SERIALIZATION:
+        serializer = row_serializer(model, response_model, selected)
+        return Response(content=serializer.dumps(serializer.query(query).all()), media_type="application/json")
+    return projected_response(project(query, model, selected).all(), response_model, selected)
@@ -1,7 +1,7 @@
 import json
 from datetime import datetime, timedelta
 from typing import Any, Dict
-import aioredis
+from redis import asyncio as aioredis
 from .config import get_settings
 import logging
 
@@ -0,0 +1,350 @@
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session
+from .cache import cache
+from .config import get_settings
+from .db import SessionLocal
+from .filtering import escape_like
+from .logger import setup_logger
+from ..models.tables import Department, Employee, PositionJob, Team
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+class SearchTarget:
+    """
+    A searchable entity type.
+
+    Parameters:
+    - model: ORM model searched
+    - text_columns: Columns covered by the FULLTEXT index (Name first)
+    - org_column: Column holding the owning organization
+    - join: Optional (model, onclause) needed to reach org_column
+    """
+    def __init__(self, model, text_columns: tuple, org_column, join: tuple = None):
+        self.model = model
+        self.pk = model.__mapper__.primary_key[0]
+        self.name = text_columns[0]
+        self.text_columns = text_columns
+        self.org_column = org_column
+        self.join = join
+
+    def query(self, db: Session, *columns):
+        """Query of columns from the model (and the join reaching its organization)"""
+        query = db.query(*columns).select_from(self.model)
+        if self.join is not None:
+            query = query.join(*self.join)
+        return query
+
+SEARCH_TARGETS = {
+    "employee": SearchTarget(Employee, (Employee.Name, Employee.Email), Employee.OrganizationID),
+    "department": SearchTarget(Department, (Department.Name, Department.Description), Department.OrganizationID),
+    "team": SearchTarget(Team, (Team.Name, Team.Description), Team.OrganizationID),
+    "position": SearchTarget(
+        PositionJob, (PositionJob.Name, PositionJob.Description), Department.OrganizationID,
+        join=(Department, Department.DepartmentID == PositionJob.DepartmentID)
+    ),
+}
+
+def search_types(types: Optional[str]) -> List[str]:
+    """Parse a ?types= value into entity types, raising 400 for unknown ones"""
+    if not types:
+        return list(SEARCH_TARGETS)
+    requested = [name.strip() for name in types.split(",") if name.strip()]
+    unknown = set(requested) - set(SEARCH_TARGETS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(sorted(unknown))}")
+    return requested
+
+def _result(entity: str, entity_id: int, name: str, org_id: Optional[int], score: float) -> dict:
+    return {"type": entity, "id": entity_id, "name": name, "organization_id": org_id, "score": score}
+
+# Tables found to have a FULLTEXT index, per database
+_fulltext_tables: Dict[str, Set[str]] = {}
+
+def fulltext_available(db: Session, target: SearchTarget) -> bool:
+    """
+    Whether the target's table can be searched with MATCH ... AGAINST.
+
+    SEARCH_BACKEND="ngram" forces the in-process index, "fulltext" forces
+    MySQL; "auto" checks information_schema once per database.
+    """
+    if settings.SEARCH_BACKEND != "auto":
+        return settings.SEARCH_BACKEND == "fulltext"
+    if db.get_bind().dialect.name != "mysql":
+        return False
+    url = str(db.get_bind().url)
+    if url not in _fulltext_tables:
+        try:
+            rows = db.execute(text("""
+                SELECT DISTINCT TABLE_NAME
+                FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND INDEX_TYPE = 'FULLTEXT'
+            """)).fetchall()
+            _fulltext_tables[url] = {row[0] for row in rows}
+        except Exception as e:
+            logger.error(f"Could not inspect FULLTEXT indexes: {e}")
+            _fulltext_tables[url] = set()
+    return target.model.__tablename__ in _fulltext_tables[url]
+
+def _words(value: str) -> List[str]:
+    return re.findall(r"\w+", value.lower())
+
+def _grams(word: str) -> Set[str]:
+    """Trigrams of a word, anchored at its start so 2-character prefixes are indexed"""
+    padded = f" {word}"
+    return {padded[i:i + 3] for i in range(max(len(padded) - 2, 1))}
+
+class NGramIndex:
+    """
+    In-process trigram index over the searchable text of each entity type.
+
+    Used when MySQL FULLTEXT indexes are not available. The entity types
+    are loaded in the background at startup (see start_warmup), or on first
+    use; afterwards the index follows writes through the cache invalidation
+    tags: "<entity>:<id>" marks a row for reloading on the next search and
+    "<entity>:all" (cascading deletes) drops the type.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()  # One full load at a time
+        self.docs: Dict[str, Dict[int, Tuple[Optional[int], str, str]]] = {}  # entity -> id -> (org, name, text)
+        self.grams: Dict[str, Dict[str, Set[int]]] = {}  # entity -> gram -> ids
+        self.dirty: Dict[str, Set[int]] = defaultdict(set)
+
+    def evict(self, *tags: str):
+        """Mark rows named by invalidation tags as stale"""
+        with self.lock:
+            for tag in tags:
+                entity, _, key = tag.partition(":")
+                if entity not in SEARCH_TARGETS:
+                    continue
+                if key == "all":
+                    self.docs.pop(entity, None)
+                    self.grams.pop(entity, None)
+                    self.dirty.pop(entity, None)
+                elif key.isdigit() and entity in self.docs:
+                    self.dirty[entity].add(int(key))
+
+    def clear(self):
+        """Drop the whole index (it is reloaded on demand)"""
+        with self.lock:
+            self.docs.clear()
+            self.grams.clear()
+            self.dirty.clear()
+
+    def _add(self, entity: str, entity_id: int, org_id: Optional[int], values: Sequence[Optional[str]]):
+        content = " ".join(value for value in values if value).lower()
+        self.docs[entity][entity_id] = (org_id, values[0] or "", content)
+        for word in set(_words(content)):
+            for gram in _grams(word):
+                self.grams[entity][gram].add(entity_id)
+
+    def _remove(self, entity: str, entity_id: int):
+        doc = self.docs[entity].pop(entity_id, None)
+        if doc is None:
+            return
+        for word in set(_words(doc[2])):
+            for gram in _grams(word):
+                ids = self.grams[entity].get(gram)
+                if ids is not None:
+                    ids.discard(entity_id)
+                    if not ids:
+                        del self.grams[entity][gram]
+
+    def _rows(self, db: Session, target: SearchTarget, ids: Iterable[int] = None):
+        query = target.query(db, target.pk, target.org_column, *target.text_columns)
+        if ids is not None:
+            query = query.filter(target.pk.in_(list(ids)))
+        return query.yield_per(settings.EXPORT_BATCH_SIZE)
+
+    def _refresh(self, db: Session, entity: str):
+        """Load an entity type on first use, or reload its rows marked stale"""
+        with self.lock:
+            loaded = entity in self.docs
+        if loaded:
+            self._reload(db, entity)
+            return
+        # A search arriving while the warmup loads the type waits for it instead of loading it again
+        with self.load_lock:
+            self._reload(db, entity)
+
+    def _reload(self, db: Session, entity: str):
+        target = SEARCH_TARGETS[entity]
+        with self.lock:
+            loaded = entity in self.docs
+            stale = self.dirty.pop(entity, set())
+        if loaded and not stale:
+            return
+        rows = list(self._rows(db, target, stale if loaded else None))
+        with self.lock:
+            if entity not in self.docs:
+                if loaded:
+                    return  # Dropped by an invalidation meanwhile; reload next time
+                self.docs[entity] = {}
+                self.grams[entity] = defaultdict(set)
+            for entity_id in stale:
+                self._remove(entity, entity_id)
+            for entity_id, org_id, *values in rows:
+                self._remove(entity, entity_id)
+                self._add(entity, entity_id, org_id, values)
+
+    def _word_candidates(self, entity: str, word: str) -> Set[int]:
+        """IDs of rows with a word starting with word (trigram lookups, or a gram scan for a single character)"""
+        grams = self.grams[entity]
+        if len(word) == 1:
+            # No trigram to look up: scan the grams starting a word with the character
+            start = f" {word}"
+            return set().union(*(ids for gram, ids in grams.items() if gram.startswith(start)))
+        candidates = None
+        for gram in _grams(word):
+            ids = grams.get(gram, set())
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                break
+        return candidates
+
+    def _candidates(self, entity: str, words: List[str]) -> Iterable[int]:
+        candidates = None
+        for word in words:
+            ids = self._word_candidates(entity, word)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return ()
+        return candidates if candidates is not None else ()
+
+    def search(
+        self,
+        db: Session,
+        entity: str,
+        q: str,
+        org_id: Optional[int],
+        limit: int,
+        prefix: bool = False
+    ) -> List[dict]:
+        """
+        Ranked matches of q in an entity type.
+
+        Every query word must occur in the row's text; words matching the
+        start of a word rank higher than inner matches, and a name starting
+        with the query ranks highest. With prefix=True only names starting
+        with q match (autocomplete).
+        """
+        self._refresh(db, entity)
+        query_words = _words(q)
+        if not query_words:
+            return []
+        needle = q.strip().lower()
+        matches = []
+        with self.lock:
+            docs = self.docs.get(entity, {})
+            for entity_id in self._candidates(entity, query_words):
+                doc_org, name, content = docs[entity_id]
+                if org_id is not None and doc_org != org_id:
+                    continue
+                if prefix:
+                    if name.lower().startswith(needle):
+                        matches.append(_result(entity, entity_id, name, doc_org, 1.0))
+                    continue
+                doc_words = _words(content)
+                score = 0.0
+                for word in query_words:
+                    if any(doc_word.startswith(word) for doc_word in doc_words):
+                        score += 2.0
+                    elif word in content:
+                        score += 1.0
+                    else:
+                        score = 0.0
+                        break
+                if score and name.lower().startswith(needle):
+                    score += 2.0
+                if score:
+                    matches.append(_result(entity, entity_id, name, doc_org, score))
+        if prefix:
+            matches.sort(key=lambda match: (match["name"].lower(), match["id"]))
+        else:
+            matches.sort(key=lambda match: (-match["score"], match["id"]))
+        return matches[:limit]
+
+    def warm(self):
+        """Load every entity type searched without a FULLTEXT index"""
+        db = SessionLocal()
+        try:
+            for entity, target in SEARCH_TARGETS.items():
+                if not fulltext_available(db, target):
+                    self._refresh(db, entity)
+            logger.info("Search index loaded")
+        except Exception as e:
+            logger.error(f"Search index warmup failed: {e}")
+        finally:
+            db.close()
+
+    def start_warmup(self):
+        """Warm the index in a background thread, so no search waits for the initial load"""
+        threading.Thread(target=self.warm, name="search-index-warmup", daemon=True).start()
+
+# Global fallback index, kept in sync with writes through cache invalidations
+ngram_index = NGramIndex()
+cache.add_local_store(ngram_index)
+
+def _autocomplete_sql(db: Session, target: SearchTarget, entity: str, q: str, org_id: Optional[int], limit: int):
+    """Name prefix matches, answered by the (OrganizationID, Name) or Name index"""
+    query = target.query(db, target.pk, target.name, target.org_column).filter(
+        target.name.like(escape_like(q) + "%", escape="\\")
+    )
+    if org_id is not None:
+        query = query.filter(target.org_column == org_id)
+    rows = query.order_by(target.name, target.pk).limit(limit).all()
+    return [_result(entity, entity_id, name, owner, 1.0) for entity_id, name, owner in rows]
+
+def _fulltext_query(db: Session, target: SearchTarget, q: str, org_id: Optional[int], limit: int):
+    """Natural language MATCH ... AGAINST ranked by relevance"""
+    relevance = match(*target.text_columns, against=q).in_natural_language_mode()
+    query = target.query(db, target.pk, target.name, target.org_column, relevance.label("score")).filter(relevance > 0)
+    if org_id is not None:
+        query = query.filter(target.org_column == org_id)
+    return query.order_by(relevance.desc(), target.pk).limit(limit)
+
+def _search_fulltext(db: Session, target: SearchTarget, entity: str, q: str, org_id: Optional[int], limit: int):
+    rows = _fulltext_query(db, target, q, org_id, limit).all()
+    return [_result(entity, entity_id, name, owner, float(score)) for entity_id, name, owner, score in rows]
+
+def search(db: Session, q: str, types: List[str], org_id: Optional[int], limit: int, prefix: bool = False) -> List[dict]:
+    """
+    Search entity names (and text) across types.
+
+    Autocomplete is a LIKE 'q%' range scan on the Name indexes. Full-text
+    search uses MATCH ... AGAINST where the table has a FULLTEXT index.
+    Otherwise (or with SEARCH_BACKEND="ngram") the in-process n-gram index
+    answers. Full-text results are merged by score, autocomplete results by
+    name.
+
+    Parameters:
+    - q: Search text
+    - types: Entity types to search (keys of SEARCH_TARGETS)
+    - org_id: Optional organization scope
+    - limit: Maximum number of results overall
+    - prefix: Match names starting with q (autocomplete) instead of full text
+    """
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Search query must not be empty")
+    results = []
+    for entity in types:
+        target = SEARCH_TARGETS[entity]
+        if prefix and settings.SEARCH_BACKEND != "ngram":
+            results.extend(_autocomplete_sql(db, target, entity, q, org_id, limit))
+        elif not prefix and fulltext_available(db, target):
+            results.extend(_search_fulltext(db, target, entity, q, org_id, limit))
+        else:
+            results.extend(ngram_index.search(db, entity, q, org_id, limit, prefix=prefix))
+    if prefix:
+        results.sort(key=lambda result: (result["name"].lower(), result["type"], result["id"]))
+    else:
+        results.sort(key=lambda result: -result["score"])
+    return results[:limit]
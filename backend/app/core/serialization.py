@@ -0,0 +1,47 @@
+import json
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+from sqlalchemy.orm import Query
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library encoder
+    orjson = None
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    """Encode content as compact JSON bytes, using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+class RowSerializer:
+    """
+    Serializer precompiled for one model and field set.
+
+    Fetches plain column tuples instead of identity-mapped ORM instances and
+    encodes them straight to JSON, skipping Pydantic validation of data that
+    was validated when it was written.
+    """
+    def __init__(self, model, names: Tuple[str, ...]):
+        self.names = names
+        self.columns = [getattr(model, name) for name in names]
+
+    def query(self, query: Query) -> Query:
+        """Restrict a query on the model to the serializer's columns"""
+        return query.with_entities(*self.columns)
+
+    def dumps(self, rows: Sequence[tuple]) -> bytes:
+        """Encode column tuples as a JSON array of objects"""
+        names = self.names
+        return dumps([dict(zip(names, row)) for row in rows])
+
+@lru_cache(maxsize=256)
+def row_serializer(model, response_model, selected: Optional[Tuple[str, ...]] = None) -> RowSerializer:
+    """Serializer for model rows shaped like response_model (or its selected fields)"""
+    return RowSerializer(model, selected or tuple(response_model.model_fields))
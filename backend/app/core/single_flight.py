@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+from typing import Dict, List, Optional
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .admission import client_id
+from .config import get_settings
+from .logger import setup_logger
+from .metrics import get_metrics, increment_counter
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+# Request headers that change what a GET returns: the caller's credentials
+# (auth scope) and conditional request validators
+KEY_HEADERS = ("authorization", "cookie", "if-none-match")
+
+def flight_key(scope: Scope) -> str:
+    """
+    Identity of a GET request: path, query string and the headers in
+    KEY_HEADERS, plus the rate limit client while rate limiting is on
+    (admission control runs in the leader only, so a flight must not
+    answer clients other than the one it charged)
+    """
+    headers = Headers(scope=scope)
+    parts = [scope["path"], scope.get("query_string", b"").decode("latin-1")]
+    parts.extend(headers.get(name, "") for name in KEY_HEADERS)
+    if settings.RATE_LIMIT_ENABLED:
+        parts.append(client_id(Request(scope)))
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+class _Flight:
+    """One in-flight execution; messages stays None when the response can't be shared"""
+    def __init__(self):
+        self.done = asyncio.Event()
+        self.messages: Optional[List[Message]] = None
+        self.route = "unknown"
+
+class SingleFlightMiddleware:
+    """
+    Coalesce identical concurrent GET requests into one execution.
+
+    The first request for a key (see flight_key) runs the endpoint and its
+    response is streamed to its client as usual while being recorded.
+    Identical requests arriving meanwhile wait for it, up to
+    SINGLE_FLIGHT_WAIT seconds, and replay the recorded response instead of
+    running the endpoint (and its queries) again. Followers run the request
+    themselves after a timeout, or when the response can't be shared: its
+    status was not 2xx or 304 (errors, rate limiting and load shedding
+    concern the leader's request only), it set a cookie or it exceeded
+    SINGLE_FLIGHT_MAX_BODY bytes (exports).
+
+    Flights are per worker process; the response cache coalesces misses
+    across workers.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.flights: Dict[str, _Flight] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not settings.SINGLE_FLIGHT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        key = flight_key(scope)
+        flight = self.flights.get(key)
+        if flight is not None:
+            await self._follow(flight, scope, receive, send)
+            return
+
+        flight = self.flights[key] = _Flight()
+        try:
+            await self._lead(flight, scope, receive, send)
+        finally:
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+            flight.done.set()
+
+    async def _lead(self, flight: _Flight, scope: Scope, receive: Receive, send: Send):
+        messages: List[Message] = []
+        size = 0
+        shareable = True
+
+        async def send_recorded(message: Message):
+            nonlocal size, shareable
+            if shareable:
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    shareable = (200 <= status < 300 or status == 304) and "set-cookie" not in Headers(raw=message["headers"])
+                elif message["type"] == "http.response.body":
+                    size += len(message.get("body", b""))
+                    shareable = size <= settings.SINGLE_FLIGHT_MAX_BODY
+                if shareable:
+                    # Copied: outer middleware (compression) edits the headers in place
+                    messages.append({**message, "headers": list(message["headers"])} if "headers" in message else message)
+                else:
+                    messages.clear()
+            await send(message)
+
+        await self.app(scope, receive, send_recorded)
+        endpoint = scope.get("endpoint")
+        flight.route = getattr(endpoint, "__name__", scope["path"])
+        increment_counter("single_flight", flight.route, "executions")
+        if shareable:
+            flight.messages = messages
+
+    async def _follow(self, flight: _Flight, scope: Scope, receive: Receive, send: Send):
+        try:
+            await asyncio.wait_for(flight.done.wait(), settings.SINGLE_FLIGHT_WAIT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Single-flight wait timed out for {scope['path']}, executing separately")
+            increment_counter("single_flight", scope["path"], "timeouts")
+            await self.app(scope, receive, send)
+            return
+        if flight.messages is None:
+            increment_counter("single_flight", flight.route, "unshared")
+            await self.app(scope, receive, send)
+            return
+        increment_counter("single_flight", flight.route, "coalesced")
+        for message in flight.messages:
+            await send(message)
+
+def single_flight_stats() -> dict:
+    """Single-flight counters per route with their coalescing ratio (share of requests served by another's execution)"""
+    routes = get_metrics().get("single_flight", {})
+    for fields in routes.values():
+        served = fields.get("executions", 0) + fields.get("coalesced", 0)
+        fields["coalescing_ratio"] = round(fields.get("coalesced", 0) / served, 4) if served else 0.0
+    return routes
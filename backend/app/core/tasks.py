@@ -0,0 +1,57 @@
+from .bulk_import import FILES, run_import
+from .cascade import CascadeEntity, plan_cascade
+from .counters import reconcile_counters
+from .db import SessionLocal
+from .jobs import JobContext, job_type
+
+# Handlers of the background job types (see jobs.job_type). Workers import
+# this module to register them.
+
+@job_type("cascade_delete", concurrency=2)
+def cascade_delete(
+    context: JobContext,
+    entity: CascadeEntity,
+    entity_id: int,
+    subtree: bool = True
+) -> dict:
+    """Delete an organization or department subtree with everything depending on it (see cascade)"""
+    with SessionLocal() as db:
+        cascade = plan_cascade(db, entity, entity_id, subtree)
+        counts = cascade.count(db)
+        total = max(sum(counts.values()), 1)
+        deleted = {}
+
+        def progress(table: str, rows: int):
+            # Every chunk is committed, so stopping between chunks is safe
+            # and a later run deletes the rest
+            deleted[table] = rows
+            context.progress(sum(deleted.values()) / total, counts=counts, deleted=deleted)
+            context.check_cancelled()
+
+        context.progress(0.0, counts=counts, deleted=deleted)
+        cascade.run(db, progress)
+        return {"counts": counts, "deleted": deleted}
+
+@job_type("bulk_import", concurrency=1, max_retries=0, api=False)
+def bulk_import(context: JobContext, files: dict, load_data: bool = False) -> dict:
+    """
+    Import organization data files readable by the worker (see bulk_import.BulkImporter).
+
+    Queued by python -m app.cli.bulk_import --enqueue only: the files are
+    paths on the workers' file system.
+    """
+    names = [name for name in FILES if name in files]
+
+    def progress(table: str, stats: dict):
+        # Every batch is committed and existing rows are skipped, so a
+        # cancelled import can be run again to finish it
+        context.progress(names.index(table) / len(names), table=table, stats=stats)
+        context.check_cancelled()
+
+    return run_import(files, load_data=load_data, progress=progress)
+
+@job_type("reconcile_counters", concurrency=1)
+def reconcile(context: JobContext) -> dict:
+    """Recompute every headcount counter from the source tables"""
+    with SessionLocal() as db:
+        return {"corrected": reconcile_counters(db)}
@@ -0,0 +1,31 @@
+from typing import Optional
+from fastapi import HTTPException
+from .cache import entity_tags
+from .loader import Loader
+from .local_cache import local_cache
+
+def ensure_exists(loader: Loader, entity: str, entity_id: Optional[int], detail: str):
+    """
+    Raise a 400 error if a referenced row does not exist.
+
+    Positive results are remembered in the worker's local cache under the
+    entity's cache tags, so repeated references to hot rows skip the
+    database until the row is written or deleted.
+
+    Parameters:
+    - loader: Request loader of the referenced model (see get_loaders); the
+      check is answered from its batch, e.g. together with the row being
+      updated, and the row is then loaded for the rest of the request
+    - entity: Cache entity name of the model (e.g. "organization")
+    - entity_id: Referenced primary key; None is always accepted
+    - detail: Error message returned when the row is missing
+    """
+    if entity_id is None:
+        return
+    key = f"exists:{entity}:{entity_id}"
+    if local_cache.get(key):
+        return
+    since = local_cache.generation
+    if loader.load(entity_id) is None:
+        raise HTTPException(status_code=400, detail=detail)
+    local_cache.set(key, True, entity_tags(entity, entity_id), since=since)
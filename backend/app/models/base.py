@@ -1,8 +1,18 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime
+from sqlalchemy import BigInteger, Column, DateTime, Integer
+from sqlalchemy.dialects import mysql
 from ..core.db import Base
 
+# Microsecond precision on MySQL (DATETIME/TIMESTAMP default to whole
+# seconds): versions derived from UpdatedAt (ETags, sync cursors) must
+# change with every write, including several writes within one second
+Timestamp = DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
+
+# Auto-increment primary keys: SQLite (tests, development) only assigns
+# IDs to INTEGER PRIMARY KEY columns
+Identifier = BigInteger().with_variant(Integer, "sqlite")
+
 class TimestampMixin:
     """Mixin for adding timestamp fields to models"""
-    CreatedAt = Column(DateTime, default=datetime.utcnow, nullable=False)
-    UpdatedAt = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False) 
\ No newline at end of file
+    CreatedAt = Column(Timestamp, default=datetime.utcnow, nullable=False)
+    UpdatedAt = Column(Timestamp, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -1,12 +1,16 @@
-from sqlalchemy import Column, BigInteger, String, Text, ForeignKey, Date
+from sqlalchemy import Column, BigInteger, String, Text, ForeignKey, Date, DateTime, Index
 from sqlalchemy.orm import relationship
-from .base import TimestampMixin
+from .base import Identifier, Timestamp, TimestampMixin
 from ..core.db import Base
 
 class Organization(Base, TimestampMixin):
     __tablename__ = "Organization"
+    __table_args__ = (
+        Index("idx_top_dept", "TopDepartmentID"),
+        Index("idx_org_updated", "UpdatedAt"),
+    )
 
-    OrganizationID = Column(BigInteger, primary_key=True, autoincrement=True)
+    OrganizationID = Column(Identifier, primary_key=True, autoincrement=True)
     Name = Column(String(255), nullable=False, index=True)
     Address = Column(Text)
     Phone = Column(String(50))
@@ -22,8 +26,15 @@ class Organization(Base, TimestampMixin):
 
 class Department(Base, TimestampMixin):
     __tablename__ = "Department"
-
-    DepartmentID = Column(BigInteger, primary_key=True, autoincrement=True)
+    __table_args__ = (
+        Index("idx_parent_dept", "ParentDepartmentID"),
+        Index("idx_head_dept", "HeadOfDepartmentID"),
+        Index("idx_dept_updated", "UpdatedAt"),
+        Index("ft_dept_search", "Name", "Description", mysql_prefix="FULLTEXT"),
+        Index("idx_dept_org_name", "OrganizationID", "Name"),
+    )
+
+    DepartmentID = Column(Identifier, primary_key=True, autoincrement=True)
     Name = Column(String(255), nullable=False, index=True)
     Description = Column(Text)
     ParentDepartmentID = Column(BigInteger, ForeignKey("Department.DepartmentID"))
@@ -38,8 +49,13 @@ class Department(Base, TimestampMixin):
 
 class Employee(Base, TimestampMixin):
     __tablename__ = "Employee"
+    __table_args__ = (
+        Index("idx_emp_updated", "UpdatedAt"),
+        Index("ft_emp_search", "Name", "Email", mysql_prefix="FULLTEXT"),
+        Index("idx_emp_org_name", "OrganizationID", "Name"),
+    )
 
-    EmployeeID = Column(BigInteger, primary_key=True, autoincrement=True)
+    EmployeeID = Column(Identifier, primary_key=True, autoincrement=True)
     Name = Column(String(255), nullable=False, index=True)
     Email = Column(String(255), nullable=False, unique=True)
     Phone = Column(String(50))
@@ -52,8 +68,13 @@ class Employee(Base, TimestampMixin):
 
 class PositionJob(Base, TimestampMixin):
     __tablename__ = "PositionJob"
+    __table_args__ = (
+        Index("idx_pos_dept_name", "DepartmentID", "Name"),
+        Index("idx_pos_updated", "UpdatedAt"),
+        Index("ft_pos_search", "Name", "Description", mysql_prefix="FULLTEXT"),
+    )
 
-    PositionID = Column(BigInteger, primary_key=True, autoincrement=True)
+    PositionID = Column(Identifier, primary_key=True, autoincrement=True)
     Name = Column(String(255), nullable=False, index=True)
     Description = Column(Text)
     DepartmentID = Column(BigInteger, ForeignKey("Department.DepartmentID"), nullable=False)
@@ -64,8 +85,15 @@ class PositionJob(Base, TimestampMixin):
 
 class Team(Base, TimestampMixin):
     __tablename__ = "Team"
-
-    TeamID = Column(BigInteger, primary_key=True, autoincrement=True)
+    __table_args__ = (
+        Index("idx_team_leader", "TeamLeaderID"),
+        Index("idx_parent_team", "ParentTeamID"),
+        Index("idx_team_updated", "UpdatedAt"),
+        Index("ft_team_search", "Name", "Description", mysql_prefix="FULLTEXT"),
+        Index("idx_team_org_name", "OrganizationID", "Name"),
+    )
+
+    TeamID = Column(Identifier, primary_key=True, autoincrement=True)
     Name = Column(String(255), nullable=False, index=True)
     Description = Column(Text)
     TeamLeaderID = Column(BigInteger, ForeignKey("Employee.EmployeeID"))
@@ -80,6 +108,11 @@ class Team(Base, TimestampMixin):
 
 class EmployeePosition(Base, TimestampMixin):
     __tablename__ = "EmployeePosition"
+    __table_args__ = (
+        Index("idx_emp_pos_dates", "StartDate", "EndDate"),
+        Index("idx_emp_pos_position_dates", "PositionID", "StartDate", "EndDate"),
+        Index("idx_emp_pos_updated", "UpdatedAt"),
+    )
 
     EmployeeID = Column(BigInteger, ForeignKey("Employee.EmployeeID"), primary_key=True)
     PositionID = Column(BigInteger, ForeignKey("PositionJob.PositionID"), primary_key=True)
@@ -88,7 +121,47 @@ class EmployeePosition(Base, TimestampMixin):
 
 class TeamMember(Base, TimestampMixin):
     __tablename__ = "TeamMember"
+    __table_args__ = (
+        Index("idx_team_member_employee", "EmployeeID"),
+        Index("idx_team_member_date", "JoinDate"),
+        Index("idx_team_member_updated", "UpdatedAt"),
+    )
 
     TeamID = Column(BigInteger, ForeignKey("Team.TeamID"), primary_key=True)
     EmployeeID = Column(BigInteger, ForeignKey("Employee.EmployeeID"), primary_key=True)
-    JoinDate = Column(Date) 
\ No newline at end of file
+    JoinDate = Column(Date) 
+
+class AggregateCounter(Base):
+    """Materialized count of a scope (e.g. employees of an organization)"""
+    __tablename__ = "AggregateCounter"
+
+    Scope = Column(String(32), primary_key=True)
+    ScopeID = Column(BigInteger, primary_key=True)
+    Value = Column(BigInteger, nullable=False, default=0)
+    UpdatedAt = Column(DateTime, nullable=False)
+
+class ChangeOutbox(Base):
+    """Change event written with its transaction, awaiting publication to the change stream (see core.outbox)"""
+    __tablename__ = "ChangeOutbox"
+
+    OutboxID = Column(Identifier, primary_key=True, autoincrement=True)
+    EventID = Column(String(32), nullable=False)  # Stable across re-publication (IDs may be reused once rows are gone)
+    Entity = Column(String(32), nullable=False)
+    EntityKey = Column(String(64), nullable=False)  # Primary key values joined with ":"
+    Operation = Column(String(16), nullable=False)
+    Fields = Column(Text)  # Comma-separated changed columns
+    UpdatedAt = Column(Timestamp, nullable=False)
+    RequestID = Column(String(64))
+    CreatedAt = Column(Timestamp, nullable=False)
+
+class Tombstone(Base):
+    """Deleted row, kept TOMBSTONE_RETENTION_DAYS for incremental sync (see core.changes)"""
+    __tablename__ = "Tombstone"
+    __table_args__ = (
+        Index("idx_tombstone_entity_deleted", "Entity", "DeletedAt"),
+    )
+
+    TombstoneID = Column(Identifier, primary_key=True, autoincrement=True)
+    Entity = Column(String(32), nullable=False)
+    EntityKey = Column(String(64), nullable=False)  # Primary key values joined with ":"
+    DeletedAt = Column(Timestamp, nullable=False)
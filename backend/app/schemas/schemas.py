@@ -1,5 +1,5 @@
-from datetime import date
-from typing import Optional, List
+from datetime import date, datetime
+from typing import Any, Dict, Generic, Optional, List, TypeVar
 from pydantic import BaseModel, EmailStr
 from .base import TimestampSchema
 
@@ -98,7 +98,98 @@ class EmployeePositionBase(BaseModel):
     StartDate: Optional[date] = None
     EndDate: Optional[date] = None
 
+class EmployeePositionResponse(EmployeePositionBase, TimestampSchema):
+    pass
+
 class TeamMemberBase(BaseModel):
     TeamID: int
     EmployeeID: int
-    JoinDate: Optional[date] = None 
\ No newline at end of file
+    JoinDate: Optional[date] = None 
+
+class TeamMemberCreate(BaseModel):
+    EmployeeID: int
+    JoinDate: Optional[date] = None
+
+class TeamMemberResponse(TeamMemberBase, TimestampSchema):
+    pass
+
+# Organization chart schemas
+class PositionChartNode(PositionResponse):
+    employees: List[EmployeeResponse] = []
+
+class DepartmentChartNode(DepartmentResponse):
+    positions: List[PositionChartNode] = []
+    subdepartments: List["DepartmentChartNode"] = []
+
+class TeamChartNode(TeamResponse):
+    members: List[EmployeeResponse] = []
+    subteams: List["TeamChartNode"] = []
+
+class OrganizationChart(OrganizationResponse):
+    departments: List[DepartmentChartNode] = []
+    teams: List[TeamChartNode] = []
+
+# Search schemas
+class SearchResult(BaseModel):
+    type: str
+    id: int
+    name: str
+    organization_id: Optional[int] = None
+    score: float
+
+# Headcount schemas
+class DepartmentHeadcount(BaseModel):
+    DepartmentID: int
+    ParentDepartmentID: Optional[int] = None
+    direct: int
+    total: int
+
+class TeamHeadcount(BaseModel):
+    TeamID: int
+    members: int
+
+class OrganizationHeadcount(BaseModel):
+    OrganizationID: int
+    employees: int
+    departments: List[DepartmentHeadcount] = []
+    teams: List[TeamHeadcount] = []
+
+# Cascade delete schemas
+class CascadeCounts(BaseModel):
+    entity: str
+    entity_id: int
+    counts: Dict[str, int]
+    total: int
+
+# Incremental sync schemas
+Row = TypeVar("Row")
+
+class DeletedKey(BaseModel):
+    key: Dict[str, int]
+    deleted_at: datetime
+
+class ChangesPage(BaseModel, Generic[Row]):
+    items: List[Row]
+    deleted: List[DeletedKey]
+    cursor: str
+    has_more: bool
+
+# Background job schemas
+class JobCreate(BaseModel):
+    type: str
+    params: Dict[str, Any] = {}
+
+class JobResponse(BaseModel):
+    id: str
+    type: str
+    params: Dict[str, Any]
+    status: str
+    attempts: int
+    progress: float
+    details: Optional[Dict[str, Any]] = None
+    result: Any = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
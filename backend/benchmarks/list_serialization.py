@@ -0,0 +1,108 @@
+"""
+Benchmark of the list serialization paths for a limit=1000 page.
+
+Compares the default path (ORM instances validated through the Pydantic
+response model) with the fast path (plain column tuples encoded by a
+precompiled RowSerializer) on the configured database. --seed N first
+adds an organization with N employees (creating missing tables), so the
+benchmark also runs against a scratch database:
+
+Usage (from the backend directory):
+    python -m benchmarks.list_serialization --entity employee --limit 1000
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.list_serialization --seed 1000
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, List
+from pydantic import TypeAdapter
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from app.core.db import Base, SessionLocal
+from app.core.serialization import row_serializer
+from app.models.tables import Organization, Department, Employee, PositionJob, Team
+from app.schemas.schemas import (
+    OrganizationResponse, DepartmentResponse, EmployeeResponse, PositionResponse, TeamResponse
+)
+
+ENTITIES = {
+    "organization": (Organization, OrganizationResponse),
+    "department": (Department, DepartmentResponse),
+    "employee": (Employee, EmployeeResponse),
+    "position": (PositionJob, PositionResponse),
+    "team": (Team, TeamResponse),
+}
+
+def seed(db: Session, count: int):
+    """Add an organization with count employees (non-ASCII names included)"""
+    Base.metadata.create_all(db.get_bind())
+    org_id = (db.query(func.max(Organization.OrganizationID)).scalar() or 0) + 1
+    first = (db.query(func.max(Employee.EmployeeID)).scalar() or 0) + 1
+    now = datetime.utcnow()
+    db.execute(insert(Organization), [{
+        "OrganizationID": org_id, "Name": f"Benchmark {org_id}", "CreatedAt": now, "UpdatedAt": now
+    }])
+    db.execute(insert(Employee), [{
+        "EmployeeID": first + i,
+        "Name": f"Employé {first + i} Ångström" if i % 2 else f"Employee {first + i}",
+        "Email": f"employee{first + i}@example.com",
+        "Phone": f"+1 555 {i:07d}" if i % 3 else None,
+        "OrganizationID": org_id,
+        "CreatedAt": now,
+        "UpdatedAt": now,
+    } for i in range(count)])
+    db.commit()
+    print(f"Seeded organization {org_id} with {count} employees")
+
+def measure(name: str, run: Callable[[], bytes], rows: int, iterations: int):
+    """Print per-row CPU time and allocations of run()"""
+    run()  # Warm up caches and compiled statements
+
+    start = time.process_time()
+    for _ in range(iterations):
+        run()
+    cpu = (time.process_time() - start) / iterations
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<8} {cpu * 1e6 / rows:>10.2f} us/row {peak / rows:>10.0f} peak bytes/row")
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entity", choices=sorted(ENTITIES), default="employee")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--seed", type=int, metavar="N", help="first add an organization with N employees")
+    args = parser.parse_args(argv)
+
+    model, response_model = ENTITIES[args.entity]
+    pk = model.__mapper__.primary_key[0]
+    adapter = TypeAdapter(List[response_model])
+    serializer = row_serializer(model, response_model)
+
+    with SessionLocal() as db:
+        if args.seed:
+            seed(db, args.seed)
+        query = db.query(model).order_by(pk).limit(args.limit)
+        rows = query.count()
+        if not rows:
+            print(f"No {args.entity} rows to benchmark")
+            return
+
+        def orm_path() -> bytes:
+            db.expunge_all()
+            return adapter.dump_json(adapter.validate_python(query.all(), from_attributes=True))
+
+        def fast_path() -> bytes:
+            return serializer.dumps(serializer.query(query).all())
+
+        print(f"{args.entity}: {rows} rows, {args.iterations} iterations")
+        measure("orm", orm_path, rows, args.iterations)
+        measure("fast", fast_path, rows, args.iterations)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Test settings: the modules read their settings at import, so the
+environment is filled in here, before any app module is imported.
+Variables exported in the shell take precedence.
+
+Run from the backend directory:
+    pip install -r requirements.txt -r requirements-dev.txt
+    python -m pytest -q
+"""
+import os
+import tempfile
+
+_TEST_DIR = tempfile.mkdtemp(prefix="organization-tests-")
+
+for name, value in {
+    "DATABASE_URL": f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}",
+    "DB_POOL_SIZE": "5",
+    "DB_MAX_OVERFLOW": "5",
+    "DB_POOL_TIMEOUT": "5",
+    "DB_POOL_RECYCLE": "3600",
+    "DB_ECHO": "false",
+    "DB_ECHO_POOL": "false",
+    "DB_RETRY_LIMIT": "1",
+    "DB_RETRY_DELAY": "1",
+    "SECRET_KEY": "test",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "5",
+    "LOG_CONSOLE": "false",
+    "LOG_LEVEL": "WARNING",
+    "LOG_FORMAT": "json",
+    "LOG_FILE": "",
+    "LOG_ROTATE_BACKUPS": "1",
+    "LOG_ROTATE_WHEN": "d",
+    "LOG_ROTATE_INTERVAL": "1",
+}.items():
+    os.environ.setdefault(name, value)
+
+import fakeredis
+import pytest
+
+@pytest.fixture
+def redis(monkeypatch):
+    """An in-process Redis (fakeredis with Lua) behind the shared cache client"""
+    from app.core.cache import cache
+    server = fakeredis.FakeRedis()
+    monkeypatch.setattr(cache, "redis", server)
+    return server
+
+@pytest.fixture
+def tables():
+    """Fresh tables in the test database, and empty per-worker caches"""
+    from app.core.db import Base, engine
+    from app.core.local_cache import local_cache
+    import app.models.tables  # noqa: F401 (registers the models)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    local_cache.clear()
+    yield engine
+    local_cache.clear()
+
+@pytest.fixture
+def db(tables):
+    """A session on the test database"""
+    from app.core.db import SessionLocal
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def client(tables, redis, monkeypatch):
+    """The API on the test database and Redis (startup tasks don't run)"""
+    from fastapi.testclient import TestClient
+    from app.app import app
+    from app.core.redis_logger import redis_logger
+    monkeypatch.setattr(redis_logger, "redis", fakeredis.FakeAsyncRedis(decode_responses=True))
+    return TestClient(app)
@@ -0,0 +1,139 @@
+"""
+Admission control: the Redis token buckets shared by all workers, the
+adaptive per-worker concurrency limit, and the router dependency
+answering 429 and 503 before any endpoint runs.
+"""
+import pytest
+from app.api.v1 import api_router
+from app.core import admission
+from app.core.admission import AdaptiveConcurrencyLimit, admission_control, take_tokens
+from app.core.db import pool_pressure, pool_telemetry
+
+@pytest.fixture(autouse=True)
+def rates(monkeypatch):
+    """1 request per second per client with a burst of 2, 3 per second with a burst of 6 per route"""
+    monkeypatch.setattr(admission, "_token_bucket", None)
+    monkeypatch.setattr(admission.settings, "RATE_LIMIT_CLIENT_RATE", 1.0)
+    monkeypatch.setattr(admission.settings, "RATE_LIMIT_ROUTE_RATE", 3.0)
+    monkeypatch.setattr(admission.settings, "RATE_LIMIT_ROUTE_RATES", {})
+    monkeypatch.setattr(admission.settings, "RATE_LIMIT_BURST_SECONDS", 2.0)
+    return admission.settings
+
+def tokens(redis, key: str) -> float:
+    return float(redis.hget(key, "tokens"))
+
+def test_buckets_allow_a_burst_then_ask_to_wait(redis):
+    assert take_tokens("a", "search") == (True, 0.0)
+    assert take_tokens("a", "search") == (True, 0.0)
+    allowed, wait = take_tokens("a", "search")
+    assert not allowed
+    assert 0.9 < wait <= 1.0
+    assert 0 < redis.ttl("ratelimit:client:a") <= 3
+
+def test_a_denied_request_takes_no_token(redis):
+    take_tokens("a", "search")
+    take_tokens("a", "search")
+    route = tokens(redis, "ratelimit:route:search")
+    assert take_tokens("a", "search")[0] is False
+    # The route's bucket only refilled a little, it wasn't charged
+    assert tokens(redis, "ratelimit:route:search") >= route
+    assert take_tokens("b", "search")[0] is True
+
+def test_route_buckets_are_shared_by_clients(redis, rates):
+    rates.RATE_LIMIT_ROUTE_RATES = {"autocomplete": 0.5}  # Burst of 1
+    assert take_tokens("a", "autocomplete")[0] is True
+    assert take_tokens("b", "autocomplete")[0] is False
+    assert take_tokens("b", "search")[0] is True
+
+def test_buckets_refill_over_time(redis):
+    take_tokens("a", "search")
+    take_tokens("a", "search")
+    assert take_tokens("a", "search")[0] is False
+    # One second later (per Redis time) the client's bucket has a token again
+    key = "ratelimit:client:a"
+    redis.hset(key, "ts", str(float(redis.hget(key, "ts")) - 1.0))
+    assert take_tokens("a", "search")[0] is True
+
+def test_limiter_fails_open(monkeypatch):
+    def unavailable():
+        raise ConnectionError("Redis is down")
+    monkeypatch.setattr(admission.cache, "connect", unavailable)
+    assert take_tokens("a", "search") == (True, 0.0)
+
+@pytest.fixture
+def controller(monkeypatch):
+    """A concurrency limit of 10 (DB_POOL_SIZE + DB_MAX_OVERFLOW) adjusted after every request"""
+    monkeypatch.setattr(admission.settings, "POOL_CONTROLLER_INTERVAL", 1)
+    monkeypatch.setattr(admission.settings, "POOL_CONTROLLER_MIN_LIMIT", 2)
+    monkeypatch.setattr(pool_telemetry, "latency", lambda: 0.0)
+    monkeypatch.setattr(pool_pressure, "wait_time", lambda: 0.0)
+    return AdaptiveConcurrencyLimit()
+
+def test_concurrency_limit_sheds_beyond_the_limit(controller):
+    assert controller.limit == controller.max_limit == 10
+    assert all(controller.acquire() for _ in range(10))
+    assert not controller.acquire()
+    controller.release()
+    assert controller.acquire()
+
+def test_concurrency_limit_backs_off_under_pool_waits_and_recovers(controller, monkeypatch):
+    monkeypatch.setattr(pool_pressure, "wait_time", lambda: 0.5)
+    limits = []
+    for _ in range(12):
+        controller.acquire()
+        controller.release()
+        limits.append(controller.limit)
+    assert limits[:3] == [9, 8, 7]
+    assert limits[-1] == 2  # Never below POOL_CONTROLLER_MIN_LIMIT
+
+    # Additive increase only while requests queue at the limit
+    monkeypatch.setattr(pool_pressure, "wait_time", lambda: 0.0)
+    controller.acquire()
+    controller.release()
+    assert controller.limit == 2
+    controller.acquire()
+    controller.acquire()
+    controller.release()
+    assert controller.limit == 3
+
+def test_concurrency_limit_backs_off_when_queries_slow_down(controller, monkeypatch):
+    latency = [0.01]
+    monkeypatch.setattr(pool_telemetry, "latency", lambda: latency[0])
+    controller.acquire()
+    controller.release()
+    assert (controller.limit, controller.min_latency) == (10, 0.01)
+
+    latency[0] = 0.03  # Over POOL_CONTROLLER_LATENCY_TOLERANCE (2) times the minimum
+    controller.acquire()
+    controller.release()
+    assert controller.limit == 9
+    assert controller.min_latency == pytest.approx(0.0105)
+
+def test_every_api_route_is_admitted(client):
+    assert [dependency.dependency for dependency in api_router.dependencies] == [admission_control]
+    assert client.app.url_path_for("search_entities") == "/api/v1/search/"
+
+def test_admission_answers_429_and_503(client, monkeypatch):
+    assert client.get("/api/v1/search/", params={"q": "x"}).status_code == 200
+    assert client.get("/api/v1/search/", params={"q": "x"}).status_code == 200
+    limited = client.get("/api/v1/search/", params={"q": "x"})
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "1"
+    # Other clients have their own bucket
+    assert client.get("/api/v1/search/", params={"q": "x"}, headers={"Authorization": "Bearer b"}).status_code == 200
+
+    monkeypatch.setattr(admission, "overloaded", lambda: True)
+    shed = client.get("/api/v1/search/", params={"q": "x"}, headers={"Authorization": "Bearer c"})
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == str(admission.settings.LOAD_SHED_RETRY_AFTER)
+
+def test_admission_enforces_the_concurrency_limit(client, monkeypatch):
+    limit = AdaptiveConcurrencyLimit()
+    limit.limit = 0
+    monkeypatch.setattr(admission, "concurrency_limit", limit)
+    monkeypatch.setattr(admission.settings, "POOL_CONTROLLER_ENABLED", True)
+    assert client.get("/api/v1/search/", params={"q": "x"}).status_code == 503
+
+    limit.limit = 1
+    assert client.get("/api/v1/search/", params={"q": "x"}).status_code == 200
+    assert limit.in_flight == 0 and limit.completed == 1
@@ -0,0 +1,110 @@
+"""
+Assignments of employees to positions: reference, organization and
+duplicate checks, concurrent inserts, and holders of a position on a day.
+"""
+from datetime import datetime
+import pytest
+from sqlalchemy import event, insert
+from app.core.counters import get_counters
+from app.models.tables import Department, Employee, EmployeePosition, Organization, PositionJob
+
+URL = "/api/v1/assignments"
+
+@pytest.fixture
+def staff(db):
+    """Employees 1-2 and position 1 (department 1) of Acme, employee 3 and position 2 of Other"""
+    db.add_all([Organization(OrganizationID=1, Name="Acme"), Organization(OrganizationID=2, Name="Other")])
+    db.flush()
+    db.add_all([
+        Employee(EmployeeID=1, Name="Ada", Email="ada@example.com", OrganizationID=1),
+        Employee(EmployeeID=2, Name="Bob", Email="bob@example.com", OrganizationID=1),
+        Employee(EmployeeID=3, Name="Cy", Email="cy@example.com", OrganizationID=2),
+        Department(DepartmentID=1, Name="Engineering", OrganizationID=1),
+        Department(DepartmentID=2, Name="Support", OrganizationID=2),
+    ])
+    db.flush()
+    db.add_all([PositionJob(PositionID=1, Name="Engineer", DepartmentID=1), PositionJob(PositionID=2, Name="Agent", DepartmentID=2)])
+    db.commit()
+
+@pytest.fixture
+def race(tables):
+    """Commit an assignment from another connection right before the next INSERT into EmployeePosition (after the checks)"""
+    pending = []
+
+    def insert_first(conn, cursor, statement, parameters, context, executemany):
+        if pending and statement.startswith("INSERT INTO") and "EmployeePosition" in statement:
+            row = pending.pop()
+            now = datetime.utcnow()
+            with tables.begin() as other:
+                other.execute(insert(EmployeePosition), [{**row, "CreatedAt": now, "UpdatedAt": now}])
+
+    event.listen(tables, "before_cursor_execute", insert_first)
+    yield lambda employee_id, position_id: pending.append({"EmployeeID": employee_id, "PositionID": position_id})
+    event.remove(tables, "before_cursor_execute", insert_first)
+
+def test_assign_position(client, db, staff):
+    response = client.post(URL + "/", json={"EmployeeID": 1, "PositionID": 1, "StartDate": "2024-01-01"})
+    assert response.status_code == 200
+    assert response.json()["StartDate"] == "2024-01-01"
+    assert get_counters(db, "department", [1]) == {1: 1}
+
+    response = client.post(URL + "/", json={"EmployeeID": 1, "PositionID": 1})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Employee already assigned to this position"
+
+@pytest.mark.parametrize("body, detail", [
+    ({"EmployeeID": 9, "PositionID": 1}, "Employee not found"),
+    ({"EmployeeID": 1, "PositionID": 9}, "Position not found"),
+    ({"EmployeeID": 1, "PositionID": 1, "StartDate": "2024-02-01", "EndDate": "2024-01-01"}, "EndDate must not be before StartDate"),
+    ({"EmployeeID": 3, "PositionID": 1}, "Employee and position belong to different organizations: [(3, 1)]"),
+])
+def test_assign_position_rejects_invalid_assignments(client, db, staff, body, detail):
+    response = client.post(URL + "/", json=body)
+    assert (response.status_code, response.json()["detail"]) == (400, detail)
+    assert db.query(EmployeePosition).count() == 0
+
+def test_assign_positions_in_bulk(client, db, staff):
+    response = client.post(URL + "/bulk", json=[
+        {"EmployeeID": 3, "PositionID": 2},
+        {"EmployeeID": 1, "PositionID": 1},
+        {"EmployeeID": 2, "PositionID": 1},
+    ])
+    assert response.status_code == 200
+    assert [(row["EmployeeID"], row["PositionID"]) for row in response.json()] == [(1, 1), (2, 1), (3, 2)]
+    assert get_counters(db, "department", [1, 2]) == {1: 2, 2: 1}
+
+def test_assign_positions_rejects_cross_organization_assignments(client, db, staff):
+    response = client.post(URL + "/bulk", json=[{"EmployeeID": 1, "PositionID": 1}, {"EmployeeID": 1, "PositionID": 2}])
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Employee and position belong to different organizations: [(1, 2)]"
+    assert db.query(EmployeePosition).count() == 0
+
+def test_concurrent_duplicate_is_a_conflict(client, db, staff, race):
+    race(1, 1)
+    response = client.post(URL + "/", json={"EmployeeID": 1, "PositionID": 1})
+    assert response.status_code == 409
+    assert db.query(EmployeePosition).count() == 1
+
+def test_concurrent_duplicate_in_bulk_is_a_conflict(client, db, staff, race):
+    race(2, 1)
+    response = client.post(URL + "/bulk", json=[{"EmployeeID": 1, "PositionID": 1}, {"EmployeeID": 2, "PositionID": 1}])
+    assert response.status_code == 409
+    # Only the other request's row: the bulk insert rolled back as a whole
+    assert [(row.EmployeeID, row.PositionID) for row in db.query(EmployeePosition)] == [(2, 1)]
+
+def test_position_holders_on_a_day(client, db, staff):
+    client.post(URL + "/bulk", json=[
+        {"EmployeeID": 1, "PositionID": 1, "StartDate": "2024-01-01", "EndDate": "2024-06-30"},
+        {"EmployeeID": 2, "PositionID": 1, "StartDate": "2024-07-01"},
+    ])
+
+    def holders(day):
+        return [row["EmployeeID"] for row in client.get(f"{URL}/position/1", params={"on": day}).json()]
+    assert holders("2023-12-31") == []
+    assert holders("2024-06-30") == [1]
+    assert holders("2024-07-01") == [2]
+
+    ended = client.post(f"{URL}/2/1/end", params={"end_date": "2024-12-31"})
+    assert ended.json()["EndDate"] == "2024-12-31"
+    assert holders("2025-01-01") == []
+    assert client.post(f"{URL}/2/1/end", params={"end_date": "2024-01-01"}).status_code == 400
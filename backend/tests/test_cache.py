@@ -0,0 +1,143 @@
+"""
+Response caching (cached_route): read-through fills, tag invalidation,
+fills racing an invalidation, the per-worker local copy, and ETag/304
+revalidation.
+"""
+import pytest
+from pydantic import BaseModel
+from app.core import cache as cache_module
+from app.core.cache import cache, cached_route, entity_tags, invalidate_entity
+from app.core.local_cache import local_cache
+
+API = "/api/v1/organizations/organizations"
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch, redis):
+    monkeypatch.setattr(cache_module.settings, "CACHE_ENABLED", True)
+    monkeypatch.setattr(local_cache, "max_entries", 100)
+    local_cache.clear()
+    yield
+    local_cache.clear()
+
+@pytest.fixture
+def items():
+    """A source of items and a cached route reading it, counting its executions"""
+    source = {1: "one", 2: "two"}
+    calls = []
+    during_read = []  # Callbacks run while the route reads (simulated concurrent writes)
+
+    def get_item(item_id: int):
+        calls.append(item_id)
+        name = source[item_id]
+        while during_read:
+            during_read.pop()()
+        return {"id": item_id, "name": name}
+
+    def route(local: bool = False):
+        return cached_route(Item, 60, tags=lambda item, params: entity_tags("item", params["item_id"]), local=local)(get_item)
+    return source, calls, during_read, route
+
+def body(response) -> bytes:
+    return response.body
+
+def test_responses_are_filled_once_and_invalidated_by_tag(items):
+    source, calls, _, route = items
+    get_item = route()
+    assert body(get_item(item_id=1)) == b'{"id":1,"name":"one"}'
+    assert body(get_item(item_id=1)) == b'{"id":1,"name":"one"}'
+    get_item(item_id=2)
+    assert calls == [1, 2]
+
+    source[1] = "uno"
+    cache.invalidate("item:1")
+    assert body(get_item(item_id=1)) == b'{"id":1,"name":"uno"}'
+    get_item(item_id=2)
+    assert calls == [1, 2, 1]
+
+def test_fill_racing_an_invalidation_is_dropped(items):
+    source, calls, during_read, route = items
+    get_item = route()
+
+    def write():
+        source[1] = "uno"
+        cache.invalidate("item:1")
+    during_read.append(write)
+    # The read started before the write: it answers with what it read...
+    assert body(get_item(item_id=1)) == b'{"id":1,"name":"one"}'
+    # ...but doesn't cache it
+    assert body(get_item(item_id=1)) == b'{"id":1,"name":"uno"}'
+    assert body(get_item(item_id=1)) == b'{"id":1,"name":"uno"}'
+    assert calls == [1, 1]
+
+def test_invalidation_of_other_tags_doesnt_drop_a_fill(items):
+    _, calls, during_read, route = items
+    get_item = route()
+    during_read.append(lambda: cache.invalidate("item:2", "org:1"))
+    get_item(item_id=1)
+    get_item(item_id=1)
+    assert calls == [1]
+
+def test_local_copies(items, redis):
+    source, calls, during_read, route = items
+    get_item = route(local=True)
+    get_item(item_id=1)
+    redis.flushall()  # Served from the worker's copy without Redis
+    assert body(get_item(item_id=1)) == b'{"id":1,"name":"one"}'
+    assert calls == [1]
+
+    def write():
+        source[1] = "uno"
+        cache.invalidate("item:1")
+    local_cache.clear()
+    during_read.append(write)
+    get_item(item_id=1)
+    assert local_cache.stats()["size"] == 0
+    assert body(get_item(item_id=1)) == b'{"id":1,"name":"uno"}'
+
+def test_local_copy_racing_an_eviction():
+    since = local_cache.generation
+    local_cache.evict("item:1")
+    local_cache.set("resp:x", (None, b"stale"), ["item:1"], since=since)
+    assert local_cache.get("resp:x") is None
+
+def test_redis_failures_serve_uncached(items, monkeypatch):
+    _, calls, _, route = items
+    get_item = route()
+
+    def unavailable():
+        raise ConnectionError("Redis is down")
+    monkeypatch.setattr(cache, "connect", unavailable)
+    assert body(get_item(item_id=1)) == b'{"id":1,"name":"one"}'
+    get_item(item_id=1)
+    assert calls == [1, 1]
+
+def test_etags_and_not_modified(client, db):
+    client.post(f"{API}/", json={"Name": "Acme"})
+    first = client.get(f"{API}/1")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+
+    # From the cached entry, then from the version query when the entry is gone
+    assert client.get(f"{API}/1", headers={"If-None-Match": etag}).status_code == 304
+    invalidate_entity("organization", 1)
+    not_modified = client.get(f"{API}/1", headers={"If-None-Match": etag})
+    assert (not_modified.status_code, not_modified.headers["etag"]) == (304, etag)
+
+    client.put(f"{API}/1", json={"Name": "Acme Corp"})
+    changed = client.get(f"{API}/1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["Name"] == "Acme Corp"
+    assert changed.headers["etag"] != etag
+    assert client.get(f"{API}/1", headers={"If-None-Match": f'"other", {changed.headers["etag"]}'}).status_code == 304
+
+def test_list_etags_follow_row_changes(client):
+    client.post(f"{API}/", json={"Name": "Acme"})
+    etag = client.get(f"{API}/").headers["etag"]
+    assert client.get(f"{API}/", headers={"If-None-Match": etag}).status_code == 304
+    client.post(f"{API}/", json={"Name": "Other"})
+    listed = client.get(f"{API}/", headers={"If-None-Match": etag})
+    assert listed.status_code == 200 and len(listed.json()) == 2
@@ -0,0 +1,168 @@
+"""
+Set-based cascade deletes: chunked deletes in dependency order, dry-run
+counts, detaching of surviving rows, the inline size limit, and counter
+and cache cleanup, also after an interrupted run.
+"""
+from datetime import date
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, inspect, select
+from app.core import cascade as cascade_module
+from app.core.cache import cache
+from app.core.cascade import department_cascade, organization_cascade, plan_cascade
+from app.core.counters import get_counters, reconcile_counters
+from app.models.tables import (
+    AggregateCounter, Department, Employee, EmployeePosition, Organization, PositionJob, Team, TeamMember
+)
+
+MODELS = (Organization, Department, Employee, PositionJob, Team, EmployeePosition, TeamMember)
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch, redis):
+    monkeypatch.setattr(cascade_module.settings, "CASCADE_CHUNK_SIZE", 2)
+
+@pytest.fixture
+def tree(db):
+    """
+    Acme (1): employees 1-3, departments 1 > 2 > 3 and 4 with a position
+    each (assignments of every employee to 1-3), team 1 of employees 1-3.
+    Other (2): employee 4, department 5, team 2 with members 1 and 4.
+    """
+    db.add_all([Organization(OrganizationID=1, Name="Acme"), Organization(OrganizationID=2, Name="Other")])
+    db.flush()
+    db.add_all([
+        Employee(EmployeeID=number, Name=f"E{number}", Email=f"e{number}@example.com", OrganizationID=1 if number < 4 else 2)
+        for number in range(1, 5)
+    ])
+    db.flush()
+    db.add_all([
+        Department(DepartmentID=1, Name="Engineering", OrganizationID=1, HeadOfDepartmentID=1),
+        Department(DepartmentID=2, Name="Backend", OrganizationID=1, ParentDepartmentID=1),
+        Department(DepartmentID=3, Name="Storage", OrganizationID=1, ParentDepartmentID=2),
+        Department(DepartmentID=4, Name="Sales", OrganizationID=1),
+        Department(DepartmentID=5, Name="Support", OrganizationID=2),
+    ])
+    db.flush()
+    db.get(Organization, 1).TopDepartmentID = 1
+    db.add_all([PositionJob(PositionID=number, Name=f"P{number}", DepartmentID=number) for number in range(1, 6)])
+    db.add_all([Team(TeamID=1, Name="Platform", OrganizationID=1, TeamLeaderID=1), Team(TeamID=2, Name="Help", OrganizationID=2)])
+    db.flush()
+    db.add_all([
+        EmployeePosition(EmployeeID=employee, PositionID=position, StartDate=date(2024, 1, 1))
+        for employee in (1, 2, 3) for position in (1, 2, 3)
+    ])
+    db.add(EmployeePosition(EmployeeID=4, PositionID=5, StartDate=date(2024, 1, 1)))
+    db.add_all([TeamMember(TeamID=1, EmployeeID=number) for number in (1, 2, 3)])
+    db.add_all([TeamMember(TeamID=2, EmployeeID=number) for number in (1, 4)])
+    db.commit()
+    reconcile_counters(db)
+
+def ids(db, model) -> list:
+    db.rollback()
+    return sorted(db.execute(select(inspect(model).primary_key[0])).scalars())
+
+def row_counts(db) -> dict:
+    db.rollback()
+    return {model.__tablename__: db.query(func.count()).select_from(model).scalar() for model in MODELS}
+
+def test_organization_cascade_deletes_everything_it_counted(db, tree):
+    cache.set("resp:org_chart:1", b"cached", 60, tags=["org:1"])
+    cache.set("resp:org_chart:2", b"cached", 60, tags=["org:2"])
+    cache.set("resp:org_chart:3", b"cached", 60, tags=["org:3"])
+    before = row_counts(db)
+    progress = []
+
+    plan = plan_cascade(db, "organization", 1)
+    counts = plan.count(db)
+    assert counts == {
+        "TeamMember": 4, "EmployeePosition": 9, "PositionJob": 4, "Team": 1,
+        "Department": 4, "Employee": 3, "Organization": 1,
+    }
+    deleted = plan.run(db, progress=lambda table, rows: progress.append((table, rows)))
+
+    assert deleted == counts
+    after = row_counts(db)
+    assert {table: before[table] - after[table] for table in before} == counts
+    assert ids(db, Employee) == [4] and ids(db, Department) == [5] and ids(db, Team) == [2]
+    # Chunks of CASCADE_CHUNK_SIZE rows, tables in dependency order
+    assert progress[:3] == [("TeamMember", 2), ("TeamMember", 4), ("EmployeePosition", 2)]
+    assert [table for table, _ in progress][-1] == "Organization"
+
+    # Counters of deleted scopes are gone, those of surviving ones recomputed
+    assert db.query(AggregateCounter).filter(AggregateCounter.Scope == "organization", AggregateCounter.ScopeID == 1).count() == 0
+    assert db.query(AggregateCounter).filter(AggregateCounter.Scope == "department", AggregateCounter.ScopeID.in_([1, 2, 3, 4])).count() == 0
+    assert get_counters(db, "team", [2]) == {2: 1}
+    # Other's team 2 lost a member: its organization's views go too
+    assert cache.get("resp:org_chart:1") is None
+    assert cache.get("resp:org_chart:2") is None
+    assert cache.get("resp:org_chart:3") == b"cached"
+
+def test_department_subtree_cascade(db, tree):
+    plan = department_cascade(db, 2)
+    counts = plan.count(db)
+    assert counts == {"EmployeePosition": 6, "PositionJob": 2, "Department": 2}
+    assert plan.run(db) == counts
+
+    assert ids(db, Department) == [1, 4, 5]
+    assert ids(db, PositionJob) == [1, 4, 5]
+    assert db.query(EmployeePosition).count() == 4
+    assert ids(db, Employee) == [1, 2, 3, 4]
+    assert get_counters(db, "department", [1, 2, 3]) == {1: 3, 2: 0, 3: 0}
+    assert db.query(AggregateCounter).filter(AggregateCounter.Scope == "department", AggregateCounter.ScopeID.in_([2, 3])).count() == 0
+
+def test_department_without_subtree_detaches_children(db, tree):
+    before = db.get(Department, 2).UpdatedAt
+    plan = department_cascade(db, 1, subtree=False)
+    assert plan.count(db) == {"EmployeePosition": 3, "PositionJob": 1, "Department": 1}
+    plan.run(db)
+
+    assert ids(db, Department) == [2, 3, 4, 5]
+    child = db.get(Department, 2)
+    assert child.ParentDepartmentID is None
+    assert child.UpdatedAt > before
+    assert db.get(Organization, 1).TopDepartmentID is None
+    assert db.get(Department, 3).ParentDepartmentID == 2
+
+def test_interrupted_run_leaves_consistent_counters_and_can_resume(db, tree):
+    def interrupt(table, rows):
+        if table == "EmployeePosition":
+            raise RuntimeError("cancelled")
+
+    plan = organization_cascade(db, 1)
+    with pytest.raises(RuntimeError):
+        plan.run(db, progress=interrupt)
+
+    # Memberships and the first chunk of assignments are gone; the
+    # counters of the scopes still there match the source tables
+    assert db.query(TeamMember).filter(TeamMember.TeamID == 1).count() == 0
+    assert db.query(EmployeePosition).count() == 8
+    assert get_counters(db, "team", [1, 2]) == {1: 0, 2: 1}
+    assert reconcile_counters(db) == 0
+
+    assert organization_cascade(db, 1).run(db)["Organization"] == 1
+    assert ids(db, Organization) == [2]
+
+def test_plan_rejects_unknown_rows_and_entities(db, tree):
+    with pytest.raises(HTTPException) as error:
+        plan_cascade(db, "organization", 99)
+    assert error.value.status_code == 404
+    with pytest.raises(HTTPException) as error:
+        plan_cascade(db, "department", 99)
+    assert error.value.status_code == 404
+    with pytest.raises(HTTPException) as error:
+        plan_cascade(db, "employee", 1)
+    assert error.value.status_code == 400
+
+def test_delete_endpoints_refuse_large_cascades(client, db, tree, monkeypatch):
+    monkeypatch.setattr(cascade_module.settings, "CASCADE_INLINE_MAX_ROWS", 10)
+    before = row_counts(db)
+    response = client.delete("/api/v1/organizations/organizations/1")
+    assert response.status_code == 409
+    assert "/api/v1/cascades/organization/1" in response.json()["detail"]
+    assert row_counts(db) == before
+
+    counted = client.get("/api/v1/cascades/department/2").json()
+    assert counted["total"] == 10
+    response = client.delete("/api/v1/departments/departments/3")
+    assert response.status_code == 200
+    assert ids(db, Department) == [1, 2, 4, 5]
@@ -0,0 +1,143 @@
+"""
+Incremental sync (changes_page): keyset cursors over changed rows and
+tombstones, the cut-off keeping both lists in one window of time, the
+DELTA_SYNC_LAG window and cursor expiry.
+"""
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from app.core import changes
+from app.core.changes import changes_page, decode_cursor, encode_cursor
+from app.models.tables import Employee, Organization, Tombstone
+
+T0 = (datetime.utcnow() - timedelta(hours=1)).replace(microsecond=0)
+
+@pytest.fixture(autouse=True)
+def no_lag(monkeypatch):
+    monkeypatch.setattr(changes.settings, "DELTA_SYNC_LAG", 0)
+
+@pytest.fixture
+def org(db):
+    org = Organization(Name="Acme")
+    db.add(org)
+    db.commit()
+    return org
+
+def add_employee(db, org, number: int, updated_at: datetime = None) -> Employee:
+    employee = Employee(
+        EmployeeID=number, Name=f"E{number}", Email=f"e{number}@example.com", OrganizationID=org.OrganizationID,
+        UpdatedAt=updated_at or datetime.utcnow()
+    )
+    db.add(employee)
+    db.commit()
+    return employee
+
+def sync(db, since=None, limit=100):
+    page = changes_page(db, Employee, since, limit)
+    return [row.EmployeeID for row in page["items"]], [entry["key"]["EmployeeID"] for entry in page["deleted"]], page
+
+def test_cursor_round_trip(db, org):
+    for number in range(1, 6):
+        add_employee(db, org, number, T0 + timedelta(seconds=number))
+
+    ids, deleted, page = sync(db, limit=2)
+    assert (ids, deleted, page["has_more"]) == ([1, 2], [], True)
+    ids, deleted, page = sync(db, page["cursor"], limit=2)
+    assert (ids, deleted, page["has_more"]) == ([3, 4], [], True)
+    ids, deleted, page = sync(db, page["cursor"], limit=2)
+    assert (ids, deleted, page["has_more"]) == ([5], [], False)
+
+    # Caught up: an empty page keeps the position
+    cursor = page["cursor"]
+    ids, deleted, page = sync(db, cursor, limit=2)
+    assert (ids, deleted, page["has_more"]) == ([], [], False)
+    assert decode_cursor(page["cursor"]) == decode_cursor(cursor)
+
+    # An update moves the row past the cursor
+    db.get(Employee, 2).Phone = "123"
+    db.commit()
+    ids, _, _ = sync(db, page["cursor"])
+    assert ids == [2]
+
+def test_rows_with_equal_updated_at_are_paged_by_key(db, org):
+    for number in range(1, 4):
+        add_employee(db, org, number, T0)
+    ids, _, page = sync(db, limit=2)
+    assert ids == [1, 2]
+    ids, _, page = sync(db, page["cursor"], limit=2)
+    assert ids == [3]
+
+def test_tombstones_after_delete(db, org):
+    for number in (1, 2):
+        add_employee(db, org, number, T0)
+    ids, deleted, page = sync(db)
+    assert (ids, deleted) == ([1, 2], [])
+
+    db.delete(db.get(Employee, 1))
+    db.commit()
+    ids, deleted, page = sync(db, page["cursor"])
+    assert (ids, deleted) == ([], [1])
+    assert page["deleted"][0]["deleted_at"] == db.query(Tombstone.DeletedAt).scalar()
+    # Delivered once
+    assert sync(db, page["cursor"])[:2] == ([], [])
+
+def test_full_pages_are_cut_at_the_earlier_end(db, org):
+    # Changes and deletions interleaved in time: E1, D11, E2, D12, E3, D13
+    for number in range(1, 4):
+        add_employee(db, org, number, T0 + timedelta(seconds=2 * number))
+        db.add(Tombstone(Entity="employee", EntityKey=str(10 + number), DeletedAt=T0 + timedelta(seconds=2 * number + 1)))
+    db.commit()
+    since = encode_cursor(None, [T0.isoformat(), 0])
+
+    # Rows up to E2 and tombstones up to D12 fill the page: cut at E2
+    ids, deleted, page = sync(db, since, limit=2)
+    assert (ids, deleted, page["has_more"]) == ([1, 2], [11], True)
+    ids, deleted, page = sync(db, page["cursor"], limit=2)
+    assert (ids, deleted, page["has_more"]) == ([3], [12, 13], True)
+    ids, deleted, page = sync(db, page["cursor"], limit=2)
+    assert (ids, deleted, page["has_more"]) == ([], [], False)
+
+def test_changes_within_the_lag_wait(db, org, monkeypatch):
+    monkeypatch.setattr(changes.settings, "DELTA_SYNC_LAG", 60)
+    now = datetime.utcnow()
+    add_employee(db, org, 1, now - timedelta(seconds=120))
+    add_employee(db, org, 2, now)
+
+    ids, _, page = sync(db)
+    assert ids == [1]
+    # Once older than the lag the row is returned
+    monkeypatch.setattr(changes.settings, "DELTA_SYNC_LAG", 0)
+    assert sync(db, page["cursor"])[0] == [2]
+
+def test_tracking_of_deletions_starts_at_the_first_sync(db, org):
+    db.add(Tombstone(Entity="employee", EntityKey="7", DeletedAt=datetime.utcnow() - timedelta(days=1)))
+    db.commit()
+    assert sync(db)[1] == []
+
+def test_expired_cursor_is_gone(db, org, monkeypatch):
+    monkeypatch.setattr(changes.settings, "TOMBSTONE_RETENTION_DAYS", 30)
+    expired = encode_cursor(None, [(datetime.utcnow() - timedelta(days=31)).isoformat(), 0])
+    with pytest.raises(HTTPException) as error:
+        sync(db, expired)
+    assert error.value.status_code == 410
+
+    recent = encode_cursor(None, [(datetime.utcnow() - timedelta(days=29)).isoformat(), 0])
+    assert sync(db, recent)[2]["has_more"] is False
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(None, []), encode_cursor(["yesterday", 1], ["2024-01-01T00:00:00", 0])])
+def test_malformed_cursor_is_rejected(db, cursor):
+    with pytest.raises(HTTPException) as error:
+        sync(db, cursor)
+    assert error.value.status_code == 400
+
+def test_changes_endpoint(client):
+    client.post("/api/v1/organizations/organizations/", json={"Name": "Acme"})
+    client.post("/api/v1/employees/", json={"Name": "Ada", "Email": "ada@example.com", "OrganizationID": 1})
+    page = client.get("/api/v1/employees/changes").json()
+    assert [item["EmployeeID"] for item in page["items"]] == [1]
+    assert page["deleted"] == [] and page["has_more"] is False
+
+    client.delete("/api/v1/employees/1")
+    page = client.get("/api/v1/employees/changes", params={"since": page["cursor"]}).json()
+    assert [entry["key"] for entry in page["deleted"]] == [{"EmployeeID": 1}]
+    assert client.get("/api/v1/employees/changes", params={"since": "x"}).status_code == 400
@@ -0,0 +1,135 @@
+"""
+CompressionMiddleware: coding negotiation, whole and streamed bodies,
+pass-through cases, and the Vary and ETag headers of every response.
+"""
+import asyncio
+import zlib
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from app.core import compression
+from app.core.compression import CompressionMiddleware, decode_prefix, negotiate_encoding, no_compression
+from app.core.etag import etag_matches
+
+ETAG = '"v1"'
+BODY = b'{"items": [' + b", ".join(b'{"id": %d}' % number for number in range(200)) + b"]}"
+
+api = FastAPI()
+
+@api.get("/items")
+def items(request: Request):
+    if etag_matches(request.headers.get("if-none-match"), ETAG):
+        return Response(status_code=304, headers={"ETag": ETAG})
+    return Response(BODY, media_type="application/json", headers={"ETag": ETAG})
+
+@api.get("/small")
+def small():
+    return Response(b'{"id": 1}', media_type="application/json", headers={"ETag": ETAG})
+
+@api.get("/raw")
+@no_compression
+def raw():
+    return Response(BODY, media_type="application/json")
+
+@api.get("/image")
+def image():
+    return Response(BODY, media_type="image/png")
+
+@pytest.fixture(autouse=True)
+def gzip_only(monkeypatch):
+    """Only gzip, whether or not brotli and zstandard are installed"""
+    monkeypatch.setattr(compression, "brotli", None)
+    monkeypatch.setattr(compression, "zstandard", None)
+    monkeypatch.setattr(compression.settings, "COMPRESSION_ENABLED", True)
+    monkeypatch.setattr(compression.settings, "COMPRESSION_MINIMUM_SIZE", 1024)
+
+@pytest.fixture
+def client():
+    return TestClient(CompressionMiddleware(api))
+
+def get(client, path, encoding="gzip", **headers):
+    return client.get(path, headers={"Accept-Encoding": encoding, **headers})
+
+def test_negotiation(monkeypatch):
+    assert negotiate_encoding("gzip, br, zstd") == "gzip"
+    assert negotiate_encoding("br;q=1.0, identity") is None
+    assert negotiate_encoding("*") == "gzip"
+    assert negotiate_encoding("gzip;q=0, *;q=0.5") is None
+    assert negotiate_encoding("") is None
+
+    monkeypatch.setattr(compression, "brotli", object())
+    monkeypatch.setattr(compression, "zstandard", object())
+    # Server preference breaks ties; a higher client q-value wins
+    assert negotiate_encoding("gzip, br, zstd") == "zstd"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.8, zstd;q=0.5") == "gzip"
+    assert negotiate_encoding("gzip, br;q=0.9") == "gzip"
+
+def test_large_bodies_are_compressed_with_a_weak_etag(client):
+    response = get(client, "/items")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert int(response.headers["content-length"]) < len(BODY)
+    assert response.content == BODY
+
+def test_revalidation_of_a_compressed_response(client):
+    etag = get(client, "/items").headers["etag"]
+    response = get(client, "/items", **{"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.headers["vary"] == "Accept-Encoding"
+
+def test_uncompressed_responses_vary_too(client):
+    small = get(client, "/small")
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+    # Same validator as a compressed body of the route would have
+    assert small.headers["etag"] == 'W/"v1"'
+
+    identity = get(client, "/items", encoding="identity")
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["vary"] == "Accept-Encoding"
+    assert identity.headers["etag"] == ETAG
+    assert identity.content == BODY
+
+def test_streamed_bodies_are_compressed_chunk_by_chunk():
+    async def streaming(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"application/x-ndjson"), (b"content-length", str(len(BODY)).encode())
+        ]})
+        await send({"type": "http.response.body", "body": BODY[:500], "more_body": True})
+        await send({"type": "http.response.body", "body": BODY[500:], "more_body": False})
+
+    sent = []
+    async def send(message):
+        sent.append(message)
+    scope = {"type": "http", "method": "GET", "path": "/stream", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(CompressionMiddleware(streaming)(scope, None, send))
+
+    headers = dict(sent[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip" and b"content-length" not in headers
+    chunks = [message["body"] for message in sent[1:]]
+    assert [message["more_body"] for message in sent[1:]] == [True, False]
+    # Every chunk is flushed: the first one decodes to the first part of the body on its own
+    assert zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(chunks[0]) == BODY[:500]
+    assert decode_prefix(b"".join(chunks), "gzip") == BODY
+
+def test_excluded_responses_pass_through(client):
+    for path in ("/raw", "/image"):
+        response = get(client, path)
+        assert "content-encoding" not in response.headers
+        assert "vary" not in response.headers
+        assert response.content == BODY
+
+def test_disabled(client, monkeypatch):
+    monkeypatch.setattr(compression.settings, "COMPRESSION_ENABLED", False)
+    response = get(client, "/items")
+    assert "content-encoding" not in response.headers and "vary" not in response.headers
+    assert response.headers["etag"] == ETAG
+
+def test_weak_comparison():
+    assert etag_matches('W/"v1"', '"v1"')
+    assert etag_matches('"v0", "v1"', 'W/"v1"')
+    assert etag_matches("*", '"v1"')
+    assert not etag_matches('"v2"', '"v1"')
+    assert not etag_matches(None, '"v1"')
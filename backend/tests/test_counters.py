@@ -0,0 +1,170 @@
+"""
+Headcount counters: deltas and recomputation, the department rollup,
+their upkeep by the employee, position and membership endpoints, and
+reconciliation of drifted values.
+"""
+from datetime import date, timedelta
+import pytest
+from app.core.counters import (
+    adjust_counter, delete_counters, department_headcounts, get_counters, reconcile_counters, refresh_counters
+)
+from app.models.tables import AggregateCounter, Department, Employee, EmployeePosition, Organization, PositionJob, Team, TeamMember
+
+API = "/api/v1"
+
+@pytest.fixture
+def org(db):
+    """
+    Acme (1) with departments 1 > 2 > 3 and 4, a position in each, and
+    Other (2) with department 5 and position 5; no employees
+    """
+    db.add_all([Organization(OrganizationID=1, Name="Acme"), Organization(OrganizationID=2, Name="Other")])
+    db.flush()
+    db.add_all([
+        Department(DepartmentID=1, Name="Engineering", OrganizationID=1),
+        Department(DepartmentID=2, Name="Backend", OrganizationID=1, ParentDepartmentID=1),
+        Department(DepartmentID=3, Name="Storage", OrganizationID=1, ParentDepartmentID=2),
+        Department(DepartmentID=4, Name="Sales", OrganizationID=1),
+        Department(DepartmentID=5, Name="Support", OrganizationID=2),
+    ])
+    db.flush()
+    db.add_all([PositionJob(PositionID=number, Name=f"P{number}", DepartmentID=number) for number in range(1, 6)])
+    db.add_all([Team(TeamID=1, Name="Platform", OrganizationID=1), Team(TeamID=2, Name="Help", OrganizationID=2)])
+    db.commit()
+
+@pytest.fixture
+def staff(db, org):
+    """Employees 1-3 of Acme, 4 of Other, with assignments and memberships, and reconciled counters"""
+    db.add_all([
+        Employee(EmployeeID=number, Name=f"E{number}", Email=f"e{number}@example.com", OrganizationID=1 if number < 4 else 2)
+        for number in range(1, 5)
+    ])
+    db.flush()
+    db.add_all([
+        EmployeePosition(EmployeeID=1, PositionID=1, StartDate=date(2024, 1, 1)),
+        EmployeePosition(EmployeeID=1, PositionID=3, StartDate=date(2024, 1, 1)),
+        EmployeePosition(EmployeeID=2, PositionID=2, StartDate=date(2024, 1, 1)),
+        EmployeePosition(EmployeeID=3, PositionID=3, StartDate=date(2024, 1, 1)),
+        EmployeePosition(EmployeeID=4, PositionID=5, StartDate=date(2024, 1, 1)),
+    ])
+    db.add_all([TeamMember(TeamID=1, EmployeeID=number) for number in (1, 2, 3)])
+    db.add(TeamMember(TeamID=2, EmployeeID=4))
+    db.commit()
+    assert reconcile_counters(db) > 0
+
+def counters(db, scope) -> dict:
+    """Every stored counter of a scope"""
+    db.rollback()
+    return dict(db.query(AggregateCounter.ScopeID, AggregateCounter.Value).filter(AggregateCounter.Scope == scope).all())
+
+def test_adjust_refresh_and_delete(db, staff):
+    adjust_counter(db, "team", 7, 2)
+    adjust_counter(db, "team", 7, -1)
+    adjust_counter(db, "team", None, 1)
+    adjust_counter(db, "team", 8, 0)
+    db.commit()
+    assert get_counters(db, "team", [7, 8]) == {7: 1, 8: 0}
+    assert db.query(AggregateCounter).filter(AggregateCounter.ScopeID == 8).count() == 0
+
+    # Recomputed from the source tables, whatever the stored value
+    adjust_counter(db, "team", 1, 10)
+    refresh_counters(db, "team", [1, 7, None])
+    db.commit()
+    assert get_counters(db, "team", [1, 7]) == {1: 3, 7: 0}
+
+    delete_counters(db, "team", [7])
+    db.commit()
+    assert 7 not in counters(db, "team")
+
+def test_department_counts_distinct_current_employees(db, staff):
+    assert get_counters(db, "department", [1, 2, 3, 4, 5]) == {1: 1, 2: 1, 3: 2, 4: 0, 5: 1}
+
+    # A second position in the same department doesn't count twice; an ended one doesn't count
+    db.add(PositionJob(PositionID=6, Name="P6", DepartmentID=3))
+    db.flush()
+    db.add(EmployeePosition(EmployeeID=3, PositionID=6, StartDate=date(2024, 1, 1)))
+    db.add(EmployeePosition(EmployeeID=2, PositionID=4, StartDate=date(2024, 1, 1), EndDate=date.today() - timedelta(days=1)))
+    db.flush()
+    refresh_counters(db, "department", [3, 4])
+    db.commit()
+    assert get_counters(db, "department", [3, 4]) == {3: 2, 4: 0}
+
+def test_department_headcounts_roll_up_subdepartments(db, staff):
+    assert department_headcounts(db, 1) == [
+        {"DepartmentID": 1, "ParentDepartmentID": None, "direct": 1, "total": 4},
+        {"DepartmentID": 2, "ParentDepartmentID": 1, "direct": 1, "total": 3},
+        {"DepartmentID": 3, "ParentDepartmentID": 2, "direct": 2, "total": 2},
+        {"DepartmentID": 4, "ParentDepartmentID": None, "direct": 0, "total": 0},
+    ]
+
+def test_department_headcounts_survive_cycles(db, staff):
+    db.get(Department, 1).ParentDepartmentID = 3
+    db.commit()
+    totals = {dept["DepartmentID"]: dept["total"] for dept in department_headcounts(db, 1)}
+    assert totals[1] == 4 and totals[4] == 0
+
+def test_reconciliation_repairs_drift(db, staff):
+    expected = {scope: counters(db, scope) for scope in ("organization", "department", "team")}
+    assert reconcile_counters(db) == 0
+
+    # A wrong value, a lost counter, a counter of a deleted scope and an assignment ended since the last write
+    adjust_counter(db, "organization", 1, 5)
+    db.query(AggregateCounter).filter(AggregateCounter.Scope == "team", AggregateCounter.ScopeID == 2).delete()
+    adjust_counter(db, "department", 99, 3)
+    db.query(EmployeePosition).filter(EmployeePosition.EmployeeID == 2).update({"EndDate": date.today() - timedelta(days=1)})
+    db.commit()
+
+    assert reconcile_counters(db) == 4
+    assert counters(db, "organization") == expected["organization"]
+    assert counters(db, "team") == expected["team"]
+    # Counters of scopes without rows are dropped (read as 0)
+    assert counters(db, "department") == {dept_id: value for dept_id, value in expected["department"].items() if dept_id != 2}
+    assert get_counters(db, "department", [2]) == {2: 0}
+    assert reconcile_counters(db) == 0
+
+def test_employee_writes_keep_counters(client, db, staff):
+    response = client.post(f"{API}/employees/", json={"Name": "Eve", "Email": "eve@example.com", "OrganizationID": 1})
+    assert response.status_code == 200
+    employee_id = response.json()["EmployeeID"]
+    assert get_counters(db, "organization", [1, 2]) == {1: 4, 2: 1}
+
+    # Moving to another organization
+    assert client.put(f"{API}/employees/{employee_id}", json={"OrganizationID": 2}).status_code == 200
+    assert get_counters(db, "organization", [1, 2]) == {1: 3, 2: 2}
+
+    # Deleting an employee with memberships and positions in two departments
+    assert client.delete(f"{API}/employees/1").status_code == 200
+    assert get_counters(db, "organization", [1, 2]) == {1: 2, 2: 2}
+    assert get_counters(db, "team", [1, 2]) == {1: 2, 2: 1}
+    assert get_counters(db, "department", [1, 2, 3]) == {1: 0, 2: 1, 3: 1}
+    assert reconcile_counters(db) == 0
+
+def test_team_member_writes_keep_counters(client, db, staff):
+    assert client.post(f"{API}/teams/1/members", json={"EmployeeID": 4}).status_code == 200
+    assert get_counters(db, "team", [1]) == {1: 4}
+    assert client.delete(f"{API}/teams/1/members/2").status_code == 200
+    assert get_counters(db, "team", [1]) == {1: 3}
+    assert reconcile_counters(db) == 0
+
+def test_position_writes_refresh_departments(client, db, staff):
+    # Position 3 (employees 1 and 3) moves from department 3 to 4
+    assert client.put(f"{API}/positions/3", json={"DepartmentID": 4}).status_code == 200
+    assert get_counters(db, "department", [3, 4]) == {3: 0, 4: 2}
+
+    assert client.delete(f"{API}/positions/3").status_code == 200
+    assert get_counters(db, "department", [3, 4]) == {3: 0, 4: 0}
+    assert reconcile_counters(db) == 0
+
+def test_headcount_endpoints(client, db, staff):
+    headcount = client.get(f"{API}/organizations/organizations/1/headcount").json()
+    assert headcount["employees"] == 3
+    assert [(dept["DepartmentID"], dept["direct"], dept["total"]) for dept in headcount["departments"]] == [
+        (1, 1, 4), (2, 1, 3), (3, 2, 2), (4, 0, 0)
+    ]
+    assert headcount["teams"] == [{"TeamID": 1, "members": 3}]
+
+    assert client.get(f"{API}/departments/departments/2/headcount").json() == {
+        "DepartmentID": 2, "ParentDepartmentID": 1, "direct": 1, "total": 3
+    }
+    assert client.get(f"{API}/teams/2/headcount").json() == {"TeamID": 2, "members": 1}
+    assert client.get(f"{API}/organizations/organizations/9/headcount").status_code == 404
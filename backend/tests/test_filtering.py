@@ -0,0 +1,118 @@
+"""
+?filter= and ?sort= on list endpoints: expression parsing, rejection of
+unknown columns and operators, the index check behind
+FILTER_REJECT_FULL_SCANS, and the resulting queries.
+"""
+from datetime import date, datetime
+import pytest
+from fastapi import HTTPException
+from app.core import filtering
+from app.core.filtering import filter_query, full_scan_reason, parse_filters, parse_sort
+from app.models.tables import Employee, EmployeePosition, Organization
+
+def rejected(call, *args) -> str:
+    with pytest.raises(HTTPException) as error:
+        call(*args)
+    assert error.value.status_code == 400
+    return error.value.detail
+
+def test_operators_are_parsed_with_column_types():
+    assert parse_filters(Employee, [
+        "OrganizationID:eq:2", "EmployeeID:in:1|2|3", "Phone:null:true", "Name:prefix:A_b",
+        "EmployeeID:ge:10", "Email:ne:a:b@example.com",
+    ]) == [
+        ("OrganizationID", "eq", 2), ("EmployeeID", "in", [1, 2, 3]), ("Phone", "null", True),
+        ("Name", "prefix", "A_b"), ("EmployeeID", "ge", 10), ("Email", "ne", "a:b@example.com"),
+    ]
+    assert parse_filters(EmployeePosition, ["StartDate:lt:2024-01-01", "UpdatedAt:gt:2024-01-01T12:00:00"]) == [
+        ("StartDate", "lt", date(2024, 1, 1)), ("UpdatedAt", "gt", datetime(2024, 1, 1, 12)),
+    ]
+    assert parse_filters(Employee, None) == []
+    assert parse_sort(Employee, "Name, -EmployeeID,") == [("Name", False), ("EmployeeID", True)]
+
+@pytest.mark.parametrize("expression, detail", [
+    ("Salary:eq:1", "Unknown column: Salary"),
+    ("Name:like:A%", "Unknown filter operator: like (expected one of eq, in, null, lt, le, gt, ge, prefix, ne)"),
+    ("Name:eq", "Invalid filter: Name:eq (expected Column:operator:value)"),
+    ("EmployeeID:eq:one", "Invalid value for EmployeeID: one"),
+    ("EmployeeID:in:1|x", "Invalid value for EmployeeID: x"),
+    ("Phone:null:yes", "Invalid value for null filter on Phone: yes"),
+    ("UpdatedAt:gt:yesterday", "Invalid value for UpdatedAt: yesterday"),
+])
+def test_invalid_filters_are_rejected(expression, detail):
+    assert rejected(parse_filters, Employee, [expression]) == detail
+
+def test_unknown_sort_columns_are_rejected():
+    assert rejected(parse_sort, Employee, "-Salary") == "Unknown column: Salary"
+
+@pytest.mark.parametrize("model, filters, sort, scoped_by", [
+    (Employee, [], None, ()),
+    (Employee, [], "-EmployeeID", ()),
+    (Employee, [], "Name", ()),
+    (Employee, [], "OrganizationID", ()),  # Leading column of (OrganizationID, Name)
+    (Employee, ["Email:eq:a@example.com"], None, ()),
+    (Employee, ["OrganizationID:eq:1"], "Phone", ()),  # Sorting the filtered rows is fine
+    (Employee, ["OrganizationID:eq:1", "Name:prefix:A"], None, ()),
+    (Employee, ["Name:ge:M"], None, ()),
+    (Employee, ["Phone:eq:1", "Name:prefix:A"], None, ()),
+    (Employee, ["Name:prefix:A"], None, ("OrganizationID",)),
+    (EmployeePosition, ["PositionID:eq:1", "StartDate:le:2024-01-01"], None, ()),
+    (EmployeePosition, ["StartDate:ge:2024-01-01"], "EndDate", ()),
+])
+def test_indexed_queries_are_accepted(model, filters, sort, scoped_by):
+    assert full_scan_reason(model, parse_filters(model, filters), parse_sort(model, sort), scoped_by) is None
+
+@pytest.mark.parametrize("model, filters, sort, reason", [
+    (Employee, ["Phone:eq:1"], None, "no index on the filtered columns of Employee"),
+    (Employee, ["Email:ne:a@example.com"], None, "no index on the filtered columns of Employee"),
+    (Employee, [], "Phone", "no index to sort Employee by Phone"),
+    (EmployeePosition, ["EndDate:null:true"], None, "no index on the filtered columns of EmployeePosition"),
+    (EmployeePosition, [], "EndDate", "no index to sort EmployeePosition by EndDate"),
+])
+def test_unindexed_queries_are_detected(model, filters, sort, reason):
+    assert full_scan_reason(model, parse_filters(model, filters), parse_sort(model, sort)) == reason
+
+def test_full_scans_are_rejected_or_only_logged(db, monkeypatch):
+    query = db.query(Employee)
+    monkeypatch.setattr(filtering.settings, "FILTER_REJECT_FULL_SCANS", True)
+    assert rejected(filter_query, query, Employee, ["Phone:eq:1"]) == (
+        "Query would scan the full table: no index on the filtered columns of Employee"
+    )
+    monkeypatch.setattr(filtering.settings, "FILTER_REJECT_FULL_SCANS", False)
+    assert filter_query(query, Employee, ["Phone:eq:1"]).all() == []
+
+@pytest.fixture
+def employees(db):
+    db.add(Organization(OrganizationID=1, Name="Acme"))
+    db.flush()
+    db.add_all([
+        Employee(EmployeeID=1, Name="Ada", Email="ada@example.com", Phone="1", OrganizationID=1),
+        Employee(EmployeeID=2, Name="A_b", Email="ab@example.com", OrganizationID=1),
+        Employee(EmployeeID=3, Name="Alan", Email="alan@example.com", OrganizationID=1),
+        Employee(EmployeeID=4, Name="Bob", Email="bob@example.com", OrganizationID=1),
+    ])
+    db.commit()
+
+def listed(db, filters=None, sort=None) -> list:
+    return [row.EmployeeID for row in filter_query(db.query(Employee), Employee, filters, sort).all()]
+
+def test_filters_and_order(db, employees, monkeypatch):
+    monkeypatch.setattr(filtering.settings, "FILTER_REJECT_FULL_SCANS", False)
+    assert listed(db) == [1, 2, 3, 4]
+    assert listed(db, ["Name:prefix:A"], "-Name") == [3, 1, 2]
+    # Wildcards in a prefix match literally
+    assert listed(db, ["Name:prefix:A_"]) == [2]
+    assert listed(db, ["EmployeeID:in:4|2"]) == [2, 4]
+    assert listed(db, ["Phone:null:false"]) == [1]
+    assert listed(db, ["Name:ne:Bob", "EmployeeID:lt:3"]) == [1, 2]
+    assert listed(db, ["EmployeeID:le:3", "EmployeeID:gt:1"], "Name") == [2, 3]
+
+def test_list_endpoint(client, employees, monkeypatch):
+    monkeypatch.setattr(filtering.settings, "FILTER_REJECT_FULL_SCANS", True)
+    response = client.get("/api/v1/employees/", params={"filter": ["Name:prefix:A"], "sort": "-Name"})
+    assert [row["EmployeeID"] for row in response.json()] == [3, 1, 2]
+    response = client.get("/api/v1/employees/", params={"org_id": 1, "filter": "Name:prefix:B"})
+    assert [row["EmployeeID"] for row in response.json()] == [4]
+
+    assert client.get("/api/v1/employees/", params={"sort": "Phone"}).status_code == 400
+    assert client.get("/api/v1/employees/", params={"filter": "Name:like:A"}).status_code == 400
@@ -0,0 +1,191 @@
+"""
+JobQueue and Worker against an in-process Redis (fakeredis with Lua):
+enqueue, claim, retries with backoff, cancellation and concurrency limits.
+"""
+import time
+from typing import Literal
+import fakeredis
+import pytest
+from fastapi import HTTPException
+from app.core import jobs
+from app.core.cache import cache
+from app.core.jobs import JOB_TYPES, PREFIX, JobType, Worker, job_queue
+
+@pytest.fixture(autouse=True)
+def redis(monkeypatch):
+    server = fakeredis.FakeRedis()
+    monkeypatch.setattr(cache, "redis", server)
+    monkeypatch.setattr(job_queue, "_scripts", None)
+    monkeypatch.setattr(jobs.settings, "JOBS_CONCURRENCY", {})
+    monkeypatch.setattr(jobs.settings, "JOBS_LEASE_SECONDS", 30)
+    return server
+
+@pytest.fixture
+def register(monkeypatch):
+    """Register a test job type for the duration of a test"""
+    def register(name, handler, concurrency=1, max_retries=0, api=True):
+        monkeypatch.setitem(JOB_TYPES, name, JobType(name, handler, concurrency, max_retries, "test job", api))
+        return name
+    return register
+
+def test_enqueue_stores_a_queued_job(register):
+    register("echo", lambda context, text, mode="plain": text)
+    job = job_queue.enqueue("echo", {"text": "hello"})
+    assert job["status"] == "queued"
+    assert job["params"] == {"text": "hello"}
+    assert job["attempts"] == 0
+    assert job_queue.stats()["echo"] == {"queued": 1, "running": 0, "concurrency": 1}
+
+def test_enqueue_rejects_unknown_types_and_invalid_params(register):
+    def handler(context, entity: Literal["organization", "department"], entity_id: int):
+        pass
+    register("typed", handler)
+    for name, params in [
+        ("missing", {}),
+        ("typed", {"entity": "employee", "entity_id": 5}),
+        ("typed", {"entity": "department", "entity_id": "five"}),
+        ("typed", {"entity": "department"}),
+        ("typed", {"entity": "department", "entity_id": 5, "extra": 1}),
+    ]:
+        with pytest.raises(HTTPException) as error:
+            job_queue.enqueue(name, params)
+        assert error.value.status_code == 400
+    assert job_queue.stats()["typed"]["queued"] == 0
+
+def test_run_once_claims_and_completes_a_job(register):
+    seen = []
+
+    def handler(context, value: int):
+        context.progress(0.5, step="half")
+        seen.append((context.job_id, context.attempt, value))
+        return {"doubled": value * 2}
+    register("double", handler)
+    job = job_queue.enqueue("double", {"value": 21})
+
+    assert Worker(["double"]).run_once() is True
+    done = job_queue.get(job["id"])
+    assert seen == [(job["id"], 1, 21)]
+    assert done["status"] == "completed"
+    assert done["result"] == {"doubled": 42}
+    assert done["progress"] == 1.0
+    assert done["details"] == {"step": "half"}
+    assert job_queue.stats()["double"] == {"queued": 0, "running": 0, "concurrency": 1}
+    assert Worker(["double"]).run_once() is False
+
+def test_failed_attempt_is_retried_after_exponential_backoff(register, redis, monkeypatch):
+    monkeypatch.setattr(jobs.settings, "JOBS_RETRY_BACKOFF", 10.0)
+    monkeypatch.setattr(jobs.settings, "JOBS_RETRY_BACKOFF_MAX", 15.0)
+
+    def handler(context):
+        raise RuntimeError("database unavailable")
+    register("flaky", handler, max_retries=3)
+    job = job_queue.enqueue("flaky")
+
+    assert Worker(["flaky"]).run_once() is True
+    retrying = job_queue.get(job["id"])
+    assert retrying["status"] == "retrying"
+    assert retrying["error"] == "RuntimeError: database unavailable"
+    delay = redis.zscore(f"{PREFIX}delayed", f"flaky:{job['id']}") - time.time()
+    assert 10.0 * 0.8 - 1 < delay <= 10.0 * 1.2  # JOBS_RETRY_BACKOFF with +-20% jitter
+    # Not due yet: nothing to claim, and the lease was released
+    assert Worker(["flaky"]).run_once() is False
+    assert job_queue.stats()["flaky"]["running"] == 0
+
+    # The second failure waits twice as long, capped at JOBS_RETRY_BACKOFF_MAX
+    job_queue.retry({**retrying, "attempts": 2}, "again")
+    delay = redis.zscore(f"{PREFIX}delayed", f"flaky:{job['id']}") - time.time()
+    assert 15.0 * 0.8 - 1 < delay <= 15.0 * 1.2
+
+def test_retries_stop_at_max_retries(register, monkeypatch):
+    monkeypatch.setattr(jobs.settings, "JOBS_RETRY_BACKOFF", 0.01)
+    attempts = []
+
+    def handler(context):
+        attempts.append(context.attempt)
+        raise RuntimeError(f"attempt {context.attempt}")
+    register("failing", handler, max_retries=2)
+    job = job_queue.enqueue("failing")
+
+    worker = Worker(["failing"])
+    deadline = time.monotonic() + 5
+    while job_queue.get(job["id"])["status"] != "failed" and time.monotonic() < deadline:
+        if not worker.run_once():
+            time.sleep(0.01)
+    failed = job_queue.get(job["id"])
+    assert attempts == [1, 2, 3]
+    assert failed["status"] == "failed"
+    assert failed["error"] == "RuntimeError: attempt 3"
+
+def test_bad_request_fails_without_retry(register):
+    def handler(context):
+        raise HTTPException(status_code=404, detail="Organization not found")
+    register("missing_row", handler, max_retries=3)
+    job = job_queue.enqueue("missing_row")
+
+    Worker(["missing_row"]).run_once()
+    assert job_queue.get(job["id"])["status"] == "failed"
+    assert job_queue.get(job["id"])["attempts"] == 1
+
+def test_cancel_queued_job_is_skipped(register):
+    calls = []
+    register("skipped", lambda context: calls.append(context.job_id))
+    job = job_queue.enqueue("skipped")
+
+    assert job_queue.cancel(job["id"])["status"] == "cancelled"
+    assert Worker(["skipped"]).run_once() is False
+    assert calls == []
+    assert job_queue.stats()["skipped"] == {"queued": 0, "running": 0, "concurrency": 1}
+
+def test_cancel_running_job_stops_at_next_check(register):
+    steps = []
+
+    def handler(context):
+        for step in range(3):
+            context.check_cancelled()
+            steps.append(step)
+            if step == 1:
+                # Another request cancels the job while it runs
+                assert job_queue.cancel(context.job_id)["status"] == "running"
+    register("long", handler)
+    job = job_queue.enqueue("long")
+
+    Worker(["long"]).run_once()
+    cancelled = job_queue.get(job["id"])
+    assert steps == [0, 1]
+    assert cancelled["status"] == "cancelled"
+    assert cancelled["cancel_requested"] is True
+
+def test_cancel_unknown_job_is_404():
+    with pytest.raises(HTTPException) as error:
+        job_queue.cancel("0" * 32)
+    assert error.value.status_code == 404
+
+def test_claim_respects_concurrency_limit(register, monkeypatch):
+    register("limited", lambda context: None, concurrency=2)
+    ids = [job_queue.enqueue("limited")["id"] for _ in range(3)]
+
+    first, second = job_queue.claim(["limited"]), job_queue.claim(["limited"])
+    assert [first["id"], second["id"]] == ids[:2]  # Oldest first
+    assert job_queue.claim(["limited"]) is None
+    assert job_queue.stats()["limited"] == {"queued": 1, "running": 2, "concurrency": 2}
+
+    job_queue._finish(first, "completed")
+    assert job_queue.claim(["limited"])["id"] == ids[2]
+
+    # JOBS_CONCURRENCY overrides the registered limit
+    monkeypatch.setattr(jobs.settings, "JOBS_CONCURRENCY", {"limited": 1})
+    job_queue.enqueue("limited")
+    assert job_queue.claim(["limited"]) is None
+
+def test_expired_lease_is_requeued(register, monkeypatch):
+    monkeypatch.setattr(jobs.settings, "JOBS_LEASE_SECONDS", 0.05)
+    register("orphaned", lambda context: None)
+    job = job_queue.enqueue("orphaned")
+
+    claimed = job_queue.claim(["orphaned"])
+    assert claimed["id"] == job["id"]
+    assert job_queue.claim(["orphaned"]) is None
+    # The worker died without renewing: once the lease expires the job is claimed again
+    time.sleep(0.1)
+    assert job_queue.claim(["orphaned"])["id"] == job["id"]
+    assert job_queue.renew(claimed) is True
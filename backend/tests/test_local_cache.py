@@ -0,0 +1,77 @@
+"""
+Cross-process invalidation of the per-worker local caches: an
+invalidation in one worker process must evict the entries the other
+worker processes hold under the same tags, through Redis pub/sub.
+"""
+import multiprocessing
+import threading
+import time
+import pytest
+import redis
+from fakeredis import TcpFakeServer
+from app.core.config import get_settings
+
+WORKERS = 3
+TIMEOUT = 10.0
+
+@pytest.fixture
+def redis_url(monkeypatch):
+    """A Redis server on a free local port, shared by the worker processes"""
+    server = TcpFakeServer(("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"redis://127.0.0.1:{server.server_address[1]}/0"
+    monkeypatch.setenv("REDIS_URL", url)
+    monkeypatch.setenv("LOCAL_CACHE_ENABLED", "true")
+    yield url
+    server.shutdown()
+    server.server_close()
+
+def _worker(index: int, ready, go, results):
+    """One worker process: fill the local cache, then invalidate (worker 0) or wait for eviction"""
+    from app.core.cache import cache
+    from app.core.local_cache import local_cache
+
+    cache.start_listener()
+    local_cache.set("org:1:department:7", b"stale", tags=["org:1"])
+    local_cache.set("org:2:department:8", b"fresh", tags=["org:2"])
+    ready.put(index)
+    go.wait(TIMEOUT)
+
+    if index == 0:
+        cache.invalidate("org:1")
+    deadline = time.monotonic() + TIMEOUT
+    while local_cache.get("org:1:department:7") is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    results.put((index, local_cache.get("org:1:department:7"), local_cache.get("org:2:department:8")))
+    cache.stop_listener()
+
+def test_invalidation_evicts_local_entries_in_other_processes(redis_url):
+    context = multiprocessing.get_context("spawn")
+    ready, results, go = context.Queue(), context.Queue(), context.Event()
+    processes = [context.Process(target=_worker, args=(index, ready, go, results)) for index in range(WORKERS)]
+    for process in processes:
+        process.start()
+    try:
+        for _ in processes:
+            ready.get(timeout=TIMEOUT * 3)
+        # Publish only once every worker's listener is subscribed
+        client = redis.Redis.from_url(redis_url)
+        deadline = time.monotonic() + TIMEOUT
+        channel = get_settings().CACHE_INVALIDATION_CHANNEL
+        while client.pubsub_numsub(channel)[0][1] < WORKERS:
+            assert time.monotonic() < deadline, "workers did not subscribe"
+            time.sleep(0.01)
+        go.set()
+
+        outcome = {}
+        for _ in processes:
+            index, stale, fresh = results.get(timeout=TIMEOUT * 2)
+            outcome[index] = (stale, fresh)
+    finally:
+        for process in processes:
+            process.join(timeout=TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+
+    assert outcome == {index: (None, b"fresh") for index in range(WORKERS)}
@@ -0,0 +1,166 @@
+"""
+Change events written with their transaction (flush listeners, Core
+statements, ON DELETE SET NULL references) and their publication by the
+outbox relay.
+"""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select, update
+from app.core import outbox
+from app.core.bulk_import import BulkImporter
+from app.core.cascade import organization_cascade
+from app.core.outbox import outbox_relay
+from app.models.tables import ChangeOutbox, Department, Employee, Organization, Team, TeamMember, Tombstone
+
+def events(db):
+    """(entity, key, operation, fields) of the outbox rows in OutboxID order"""
+    db.rollback()
+    return [
+        (row.Entity, row.EntityKey, row.Operation, row.Fields)
+        for row in db.execute(select(ChangeOutbox).order_by(ChangeOutbox.OutboxID)).scalars()
+    ]
+
+def clear(db):
+    db.query(ChangeOutbox).delete()
+    db.commit()
+
+@pytest.fixture
+def org(db):
+    """An organization with two employees, a department headed by the first and a team led by it"""
+    org = Organization(Name="Acme")
+    db.add(org)
+    db.flush()
+    db.add_all([
+        Employee(EmployeeID=1, Name="Ada", Email="ada@example.com", OrganizationID=org.OrganizationID),
+        Employee(EmployeeID=2, Name="Bob", Email="bob@example.com", OrganizationID=org.OrganizationID),
+    ])
+    db.flush()
+    db.add(Department(DepartmentID=1, Name="Engineering", OrganizationID=org.OrganizationID, HeadOfDepartmentID=1))
+    db.add(Team(TeamID=1, Name="Platform", OrganizationID=org.OrganizationID, TeamLeaderID=1))
+    db.flush()
+    db.add_all([TeamMember(TeamID=1, EmployeeID=1), TeamMember(TeamID=1, EmployeeID=2)])
+    db.commit()
+    clear(db)
+    return org
+
+def test_create_update_delete_events(db):
+    org = Organization(Name="Acme", Email="info@acme.example")
+    db.add(org)
+    db.commit()
+    org.Phone = "123"
+    db.commit()
+    db.delete(org)
+    db.commit()
+
+    assert events(db) == [
+        ("organization", "1", "create", "OrganizationID,Name,Email"),
+        ("organization", "1", "update", "Phone"),
+        ("organization", "1", "delete", None),
+    ]
+    assert [(row.Entity, row.EntityKey) for row in db.query(Tombstone)] == [("organization", "1")]
+
+def test_update_without_changes_writes_no_event(db, org):
+    org.Name = org.Name
+    db.commit()
+    assert events(db) == []
+
+def test_delete_includes_cascaded_memberships(db, org):
+    db.delete(db.get(Employee, 2))
+    db.commit()
+    assert events(db) == [
+        ("employee", "2", "delete", None),
+        ("team_member", "1:2", "delete", None),
+    ]
+
+def test_delete_publishes_nulled_references_as_updates(db, org):
+    before = db.get(Department, 1).UpdatedAt
+    db.delete(db.get(Employee, 1))
+    db.commit()
+
+    assert events(db) == [
+        ("employee", "1", "delete", None),
+        ("team_member", "1:1", "delete", None),
+        ("department", "1", "update", "HeadOfDepartmentID"),
+        ("team", "1", "update", "TeamLeaderID"),
+    ]
+    dept = db.get(Department, 1)
+    assert dept.HeadOfDepartmentID is None and db.get(Team, 1).TeamLeaderID is None
+    # The rows are bumped (incremental sync finds them) with the events' timestamp
+    assert dept.UpdatedAt > before
+    event_time = db.execute(select(ChangeOutbox.UpdatedAt).where(ChangeOutbox.Entity == "department")).scalar()
+    assert event_time == dept.UpdatedAt
+
+def test_loaded_children_nulled_by_the_orm_get_one_event(db, org):
+    db.add(Team(TeamID=2, Name="Storage", OrganizationID=org.OrganizationID, ParentTeamID=1))
+    db.commit()
+    clear(db)
+    team = db.get(Team, 1)
+    assert [child.TeamID for child in team.subteams] == [2]
+    db.delete(team)
+    db.commit()
+    updates = [event for event in events(db) if event[2] == "update"]
+    assert updates == [("team", "2", "update", "ParentTeamID")]
+
+def test_cascade_publishes_deletes_without_updates_of_deleted_rows(db, org):
+    organization_cascade(db, org.OrganizationID).run(db)
+    operations = {(entity, operation) for entity, _, operation, _ in events(db)}
+    assert operations == {
+        ("team_member", "delete"), ("team", "delete"), ("department", "delete"),
+        ("employee", "delete"), ("organization", "delete"),
+    }
+
+def test_rolled_back_changes_leave_no_events(db, org):
+    db.add(Employee(Name="Eve", Email="eve@example.com", OrganizationID=org.OrganizationID))
+    db.delete(db.get(Employee, 1))
+    db.flush()
+    assert events(db) == []  # events() rolls back
+    assert db.get(Employee, 1) is not None
+    assert not db.info
+
+    db.delete(db.get(Team, 1))
+    db.commit()
+    assert [event[:3] for event in events(db)] == [("team", "1", "delete"), ("team_member", "1:1", "delete"), ("team_member", "1:2", "delete")]
+
+def test_relay_publishes_in_order_and_deletes_published_rows(db, org, redis, monkeypatch):
+    monkeypatch.setattr(outbox.settings, "CHANGES_RELAY_LAG", 0)
+    monkeypatch.setattr(outbox.settings, "CHANGES_RELAY_BATCH", 2)
+    for number in range(5):
+        db.add(Employee(Name=f"E{number}", Email=f"e{number}@example.com", OrganizationID=org.OrganizationID))
+        db.commit()
+    written = [row.EventID for row in db.execute(select(ChangeOutbox).order_by(ChangeOutbox.OutboxID)).scalars()]
+
+    assert outbox_relay.run_once() == 5
+    stream = redis.xrange(outbox.settings.CHANGES_STREAM)
+    assert [fields[b"event_id"].decode() for _, fields in stream] == written
+    assert [fields[b"id"] for _, fields in stream] == [b"3", b"4", b"5", b"6", b"7"]
+    assert events(db) == []
+    assert outbox_relay.run_once() == 0
+
+def test_relay_holds_back_rows_within_the_lag(db, org, redis, monkeypatch):
+    monkeypatch.setattr(outbox.settings, "CHANGES_RELAY_LAG", 60)
+    db.add(Employee(Name="Old", Email="old@example.com", OrganizationID=org.OrganizationID))
+    db.commit()
+    db.execute(update(ChangeOutbox).values(CreatedAt=datetime.utcnow() - timedelta(minutes=5)))
+    db.commit()
+    db.add(Employee(Name="New", Email="new@example.com", OrganizationID=org.OrganizationID))
+    db.commit()
+
+    assert outbox_relay.run_once() == 1
+    assert [fields[b"id"] for _, fields in redis.xrange(outbox.settings.CHANGES_STREAM)] == [b"3"]
+    assert [event[:3] for event in events(db)] == [("employee", "4", "create")]
+
+def test_bulk_import_writes_create_events(db, tables, redis, tmp_path):
+    (tmp_path / "organizations.csv").write_text("Name,TopDepartment\nAcme,Engineering\n")
+    (tmp_path / "employees.csv").write_text("Organization,Name,Email\nAcme,Ada,ada@example.com\nAcme,Bob,bob@example.com\n")
+    (tmp_path / "departments.csv").write_text("Organization,Path,Head\nAcme,Engineering,ada@example.com\n")
+    with tables.connect() as conn:
+        report = BulkImporter(conn).run({name: tmp_path / f"{name}.csv" for name in ("organizations", "employees", "departments")})
+    assert report["errors"] == []
+
+    assert events(db) == [
+        ("organization", "1", "create", "OrganizationID,Name,Address,Phone,Email,Website"),
+        ("employee", "1", "create", "EmployeeID,Name,Email,Phone,OrganizationID"),
+        ("employee", "2", "create", "EmployeeID,Name,Email,Phone,OrganizationID"),
+        ("department", "1", "create", "DepartmentID,Name,Description,ParentDepartmentID,HeadOfDepartmentID,OrganizationID"),
+        ("organization", "1", "update", "TopDepartmentID"),
+    ]
@@ -0,0 +1,17 @@
+"""
+The index advisor on the repository's own schema.sql: every query
+pattern has an index, none is redundant, and the models match the DDL.
+"""
+from app.cli.schema import main
+from app.core.introspection import schema_report
+
+def test_schema_sql_has_no_index_advice():
+    report = schema_report()
+    assert report["advice"]["missing"] == []
+    assert report["advice"]["redundant"] == []
+
+def test_schema_sql_matches_models():
+    assert not any(schema_report()["drift"].values())
+
+def test_offline_check_passes(capsys):
+    assert main(["--offline"]) == 0
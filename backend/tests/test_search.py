@@ -0,0 +1,124 @@
+"""
+Search: the MATCH ... AGAINST queries used with FULLTEXT indexes, and the
+in-process n-gram index used without them (ranking, single characters,
+organization scopes, warmup and upkeep through invalidations).
+"""
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import mysql
+from app.core import search as search_module
+from app.core.search import SEARCH_TARGETS, _fulltext_query, fulltext_available, ngram_index, search
+from app.models.tables import Department, Employee, Organization, PositionJob, Team
+
+API = "/api/v1"
+
+@pytest.fixture(autouse=True)
+def empty_index(monkeypatch):
+    monkeypatch.setattr(search_module.settings, "SEARCH_BACKEND", "auto")
+    ngram_index.clear()
+    yield
+    ngram_index.clear()
+
+@pytest.fixture
+def orgs(db):
+    """Acme (1) and Other (2) with employees, departments, positions and teams"""
+    db.add_all([Organization(OrganizationID=1, Name="Acme"), Organization(OrganizationID=2, Name="Other")])
+    db.flush()
+    db.add_all([
+        Employee(EmployeeID=1, Name="Ada Lovelace", Email="ada@acme.example", OrganizationID=1),
+        Employee(EmployeeID=2, Name="Alan Turing", Email="alan@acme.example", OrganizationID=1),
+        Employee(EmployeeID=3, Name="Grace Hopper", Email="grace@other.example", OrganizationID=2),
+        Department(DepartmentID=1, Name="Engineering", Description="Builds the platform", OrganizationID=1),
+        Department(DepartmentID=2, Name="Support", Description="Helps customers with the platform", OrganizationID=2),
+        Team(TeamID=1, Name="Platform", OrganizationID=1),
+    ])
+    db.flush()
+    db.add_all([
+        PositionJob(PositionID=1, Name="Platform Engineer", DepartmentID=1),
+        PositionJob(PositionID=2, Name="Support Agent", DepartmentID=2),
+    ])
+    db.commit()
+
+def found(results) -> list:
+    return [(result["type"], result["id"]) for result in results]
+
+def test_fulltext_query(db):
+    sql = str(_fulltext_query(db, SEARCH_TARGETS["position"], "platform", 1, 5).statement.compile(dialect=mysql.dialect()))
+    assert "MATCH (`PositionJob`.`Name`, `PositionJob`.`Description`) AGAINST (%s IN NATURAL LANGUAGE MODE)" in sql
+    assert "JOIN `Department` ON `Department`.`DepartmentID` = `PositionJob`.`DepartmentID`" in sql
+    assert "`Department`.`OrganizationID` = %s" in sql
+    assert sql.endswith("IN NATURAL LANGUAGE MODE) DESC, `PositionJob`.`PositionID` \n LIMIT %s")
+
+def test_backend_selection(db, orgs, monkeypatch):
+    target = SEARCH_TARGETS["employee"]
+    assert not fulltext_available(db, target)  # SQLite
+    monkeypatch.setattr(search_module.settings, "SEARCH_BACKEND", "fulltext")
+    assert fulltext_available(db, target)
+
+    calls = []
+    monkeypatch.setattr(search_module, "_search_fulltext", lambda db, target, entity, q, org_id, limit: calls.append(entity) or [])
+    search(db, "ada", ["employee", "team"], None, 10)
+    assert calls == ["employee", "team"]
+    assert not ngram_index.docs
+
+    # Autocomplete always uses the Name indexes
+    assert found(search(db, "Ada", ["employee"], None, 10, prefix=True)) == [("employee", 1)]
+
+def test_ngram_ranking(db, orgs):
+    results = search(db, "platform", list(SEARCH_TARGETS), None, 10)
+    # Names starting with the query first, then word matches in the description
+    assert found(results)[:2] == [("team", 1), ("position", 1)]
+    assert set(found(results)[2:]) == {("department", 1), ("department", 2)}
+
+    assert found(search(db, "ada acme", ["employee"], None, 10)) == [("employee", 1)]
+    assert found(search(db, "turi", ["employee"], None, 10)) == [("employee", 2)]
+    assert search(db, "ada hopper", ["employee"], None, 10) == []
+
+def test_ngram_single_characters(db, orgs):
+    assert found(search(db, "a", ["employee"], None, 10)) == [("employee", 1), ("employee", 2)]
+    assert found(search(db, "g", ["employee"], None, 10)) == [("employee", 3)]
+    assert found(search(db, "a t", ["employee"], None, 10)) == [("employee", 2)]
+
+def test_ngram_autocomplete_and_org_scope(db, orgs, monkeypatch):
+    monkeypatch.setattr(search_module.settings, "SEARCH_BACKEND", "ngram")
+    assert found(search(db, "a", ["employee"], None, 10, prefix=True)) == [("employee", 1), ("employee", 2)]
+    assert found(search(db, "al", ["employee"], None, 10, prefix=True)) == [("employee", 2)]
+    assert found(search(db, "platform", ["department"], 2, 10)) == [("department", 2)]
+    assert found(search(db, "platform", ["position"], 1, 10)) == [("position", 1)]
+
+def test_warmup_loads_types_without_fulltext(db, orgs):
+    ngram_index.warm()
+    assert {entity: sorted(docs) for entity, docs in ngram_index.docs.items()} == {
+        "employee": [1, 2, 3], "department": [1, 2], "team": [1], "position": [1, 2]
+    }
+
+def test_index_follows_writes(client, db, orgs):
+    assert found(search(db, "lovelace", ["employee"], None, 10)) == [("employee", 1)]
+    client.put(f"{API}/employees/1", json={"Name": "Ada Byron"})
+    client.post(f"{API}/employees/", json={"Name": "Lovelace Fan", "Email": "fan@acme.example", "OrganizationID": 1})
+    assert found(search(db, "lovelace", ["employee"], None, 10)) == [("employee", 4)]
+    assert found(search(db, "byron", ["employee"], None, 10)) == [("employee", 1)]
+
+    client.delete(f"{API}/employees/4")
+    assert search(db, "lovelace", ["employee"], None, 10) == []
+
+def test_positions_follow_their_department_to_another_organization(client, db, orgs):
+    assert found(search(db, "engineer", ["position"], 1, 10)) == [("position", 1)]
+    assert client.put(f"{API}/departments/departments/1", json={"OrganizationID": 2}).status_code == 200
+    assert search(db, "engineer", ["position"], 1, 10) == []
+    assert found(search(db, "engineer", ["position"], 2, 10)) == [("position", 1)]
+
+def test_search_endpoints(client, orgs):
+    response = client.get(f"{API}/search/", params={"q": "grace"})
+    assert [(result["type"], result["id"], result["organization_id"]) for result in response.json()] == [("employee", 3, 2)]
+    autocomplete = client.get(f"{API}/search/autocomplete", params={"q": "sup", "types": "department,position"}).json()
+    assert [(result["type"], result["name"]) for result in autocomplete] == [("department", "Support"), ("position", "Support Agent")]
+
+    assert client.get(f"{API}/search/", params={"q": " "}).status_code == 400
+    assert client.get(f"{API}/search/", params={"q": "x", "types": "robot"}).status_code == 400
+    assert client.get(f"{API}/search/", params={"q": "x", "limit": 0}).status_code == 400
+
+def test_empty_query_is_rejected(db):
+    with pytest.raises(HTTPException) as error:
+        search(db, "  ", ["employee"], None, 10)
+    assert error.value.status_code == 400
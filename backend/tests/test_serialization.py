@@ -0,0 +1,39 @@
+"""
+The fast list path (RowSerializer) must produce the same bytes as the
+default path (response model validation rendered by JSONResponse), with
+orjson and with the standard library fallback.
+"""
+from datetime import datetime
+from typing import List
+import pytest
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from app.core import serialization
+from app.models.tables import Employee
+from app.schemas.schemas import EmployeeResponse
+
+ROWS = [
+    {"EmployeeID": 1, "Name": "Zoë Ångström", "Email": "zoe@example.com", "Phone": "+46 8 123 45",
+     "OrganizationID": 7, "CreatedAt": datetime(2024, 3, 1, 9, 30), "UpdatedAt": datetime(2024, 3, 2, 10, 0, 0, 123456)},
+    {"EmployeeID": 2, "Name": "李小龍 — \"Bruce\" \\ 🐉", "Email": "bruce@example.com", "Phone": None,
+     "OrganizationID": 7, "CreatedAt": datetime(2024, 3, 1, 9, 30, 5), "UpdatedAt": datetime(2024, 3, 1, 9, 30, 5)},
+]
+
+def default_path() -> bytes:
+    adapter = TypeAdapter(List[EmployeeResponse])
+    return JSONResponse(adapter.dump_python(adapter.validate_python(ROWS), mode="json")).body
+
+def fast_path() -> bytes:
+    serializer = serialization.row_serializer(Employee, EmployeeResponse)
+    return serializer.dumps([tuple(row[name] for name in serializer.names) for row in ROWS])
+
+def test_orjson_matches_default_path():
+    pytest.importorskip("orjson")
+    assert serialization.orjson is not None
+    assert fast_path() == default_path()
+
+def test_stdlib_fallback_matches_default_path(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    body = fast_path()
+    assert body == default_path()
+    assert "Zoë Ångström".encode() in body
@@ -0,0 +1,55 @@
+"""
+SingleFlightMiddleware: identical concurrent GETs share one execution,
+but only successful responses are shared, and only within one client
+while rate limiting is on.
+"""
+import asyncio
+import httpx
+import pytest
+from app.core import single_flight
+from app.core.single_flight import SingleFlightMiddleware
+
+def endpoint(status: int):
+    """ASGI app answering status after a delay, counting its executions"""
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        execution = len(calls)
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": f"{status} #{execution}".encode()})
+    return app, calls
+
+def fetch(app, headers_list):
+    async def run():
+        transport = httpx.ASGITransport(app=SingleFlightMiddleware(app), client=("10.0.0.1", 1234))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get("/items", headers=headers) for headers in headers_list))
+    return asyncio.run(run())
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    monkeypatch.setattr(single_flight.settings, "SINGLE_FLIGHT_ENABLED", True)
+    monkeypatch.setattr(single_flight.settings, "RATE_LIMIT_ENABLED", False)
+    return single_flight.settings
+
+@pytest.mark.parametrize("status", [200, 304])
+def test_successful_responses_are_shared(status):
+    app, calls = endpoint(status)
+    responses = fetch(app, [{}] * 5)
+    assert len(calls) == 1
+    assert {(response.status_code, response.content) for response in responses} == {(status, f"{status} #1".encode())}
+
+@pytest.mark.parametrize("status", [404, 429, 500, 503])
+def test_failed_responses_are_not_shared(status):
+    app, calls = endpoint(status)
+    responses = fetch(app, [{}] * 5)
+    assert len(calls) == 5
+    assert len({response.content for response in responses}) == 5
+
+def test_flights_are_per_client_while_rate_limiting(settings):
+    settings.RATE_LIMIT_ENABLED = True
+    app, calls = endpoint(200)
+    fetch(app, [{"authorization": "Bearer a"}, {"authorization": "Bearer b"}, {"authorization": "Bearer a"}])
+    assert len(calls) == 2
@@ -0,0 +1,112 @@
+"""
+Team membership endpoints: single adds and removals (answering with the
+team), the multi-row bulk INSERT and DELETE paths, and keyset pages of
+members.
+"""
+from datetime import date
+import pytest
+from sqlalchemy import select
+from app.core.counters import get_counters, refresh_counters
+from app.api.v1.endpoints import team as team_module
+from app.models.tables import ChangeOutbox, Employee, Organization, Team, TeamMember
+
+URL = "/api/v1/teams"
+
+@pytest.fixture
+def team(db):
+    """Team 1 of Acme with employee 1 as a member, employees 2-6 not members, and its counter"""
+    db.add(Organization(OrganizationID=1, Name="Acme"))
+    db.flush()
+    db.add_all([
+        Employee(EmployeeID=number, Name=f"E{number}", Email=f"e{number}@example.com", OrganizationID=1)
+        for number in range(1, 7)
+    ])
+    db.add(Team(TeamID=1, Name="Platform", OrganizationID=1))
+    db.flush()
+    db.add(TeamMember(TeamID=1, EmployeeID=1, JoinDate=date(2024, 1, 1)))
+    db.flush()
+    refresh_counters(db, "team", [1])
+    db.commit()
+
+def members(db) -> list:
+    db.rollback()
+    return [employee_id for (employee_id,) in db.query(TeamMember.EmployeeID).filter(TeamMember.TeamID == 1).order_by(TeamMember.EmployeeID)]
+
+def member_events(db) -> list:
+    db.rollback()
+    return [
+        (row.EntityKey, row.Operation)
+        for row in db.execute(select(ChangeOutbox).where(ChangeOutbox.Entity == "team_member").order_by(ChangeOutbox.OutboxID)).scalars()
+    ]
+
+def test_single_add_and_remove_answer_with_the_team(client, db, team):
+    added = client.post(f"{URL}/1/members", json={"EmployeeID": 2, "JoinDate": "2024-02-01"})
+    assert added.status_code == 200
+    assert (added.json()["TeamID"], added.json()["Name"]) == (1, "Platform")
+    assert members(db) == [1, 2]
+
+    assert client.post(f"{URL}/1/members", json={"EmployeeID": 2}).json()["detail"] == "Employee is already a team member"
+    assert client.post(f"{URL}/1/members", json={"EmployeeID": 99}).status_code == 400
+    assert client.post(f"{URL}/9/members", json={"EmployeeID": 2}).status_code == 404
+
+    removed = client.delete(f"{URL}/1/members/2")
+    assert (removed.status_code, removed.json()["TeamID"]) == (200, 1)
+    assert members(db) == [1]
+    assert client.delete(f"{URL}/1/members/2").status_code == 404
+
+def test_bulk_add_skips_existing_members(client, db, team):
+    response = client.post(f"{URL}/1/members/bulk", json=[
+        {"EmployeeID": 4, "JoinDate": "2024-03-01"}, {"EmployeeID": 1}, {"EmployeeID": 2},
+    ])
+    assert response.status_code == 200
+    assert [(row["EmployeeID"], row["JoinDate"]) for row in response.json()] == [(2, None), (4, "2024-03-01")]
+    assert members(db) == [1, 2, 4]
+    assert get_counters(db, "team", [1]) == {1: 3}
+    # The Core INSERT writes its change events
+    assert member_events(db)[1:] == [("1:4", "create"), ("1:2", "create")]
+
+    # Resending the same list adds nothing
+    assert client.post(f"{URL}/1/members/bulk", json=[{"EmployeeID": 2}, {"EmployeeID": 4}]).json() == []
+    assert get_counters(db, "team", [1]) == {1: 3}
+
+def test_bulk_add_rejects_invalid_requests(client, db, team, monkeypatch):
+    response = client.post(f"{URL}/1/members/bulk", json=[{"EmployeeID": 2}, {"EmployeeID": 98}, {"EmployeeID": 99}])
+    assert (response.status_code, response.json()["detail"]) == (400, "Employees not found: [98, 99]")
+    assert client.post(f"{URL}/9/members/bulk", json=[{"EmployeeID": 2}]).status_code == 404
+
+    monkeypatch.setattr(team_module.settings, "BULK_MAX_ITEMS", 2)
+    response = client.post(f"{URL}/1/members/bulk", json=[{"EmployeeID": number} for number in (2, 3, 4)])
+    assert (response.status_code, response.json()["detail"]) == (400, "At most 2 members per request")
+    assert members(db) == [1]
+    assert client.post(f"{URL}/1/members/bulk", json=[]).json() == []
+
+def test_bulk_remove_ignores_non_members(client, db, team):
+    client.post(f"{URL}/1/members/bulk", json=[{"EmployeeID": 2}, {"EmployeeID": 3}])
+    response = client.request("DELETE", f"{URL}/1/members/bulk", json=[3, 1, 5])
+    assert response.status_code == 200
+    assert [(row["EmployeeID"], row["JoinDate"]) for row in response.json()] == [(1, "2024-01-01"), (3, None)]
+    assert members(db) == [2]
+    assert get_counters(db, "team", [1]) == {1: 1}
+    assert member_events(db)[-2:] == [("1:1", "delete"), ("1:3", "delete")]
+
+    assert client.request("DELETE", f"{URL}/1/members/bulk", json=[5]).json() == []
+    assert client.request("DELETE", f"{URL}/9/members/bulk", json=[1]).status_code == 404
+
+def test_members_are_paged_by_employee_id(client, db, team):
+    client.post(f"{URL}/1/members/bulk", json=[
+        {"EmployeeID": number, "JoinDate": f"2024-0{number}-01"} for number in (6, 3, 2, 5)
+    ])
+
+    def page(**params):
+        response = client.get(f"{URL}/1/members", params=params)
+        assert response.status_code == 200
+        return [row["EmployeeID"] for row in response.json()]
+    assert page(limit=2) == [1, 2]
+    assert page(after=2, limit=2) == [3, 5]
+    assert page(after=5, limit=2) == [6]
+    assert page(after=6, limit=2) == []
+    assert page(joined_from="2024-03-01", joined_to="2024-05-31") == [3, 5]
+    assert page(after=3, joined_from="2024-03-01") == [5, 6]
+
+    assert client.get(f"{URL}/1/members", params={"limit": 0}).status_code == 422
+    assert client.get(f"{URL}/9/members").status_code == 404
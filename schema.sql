@@ -7,10 +7,11 @@ CREATE TABLE Organization (
     Email VARCHAR(255),
     Website VARCHAR(255),
     TopDepartmentID BIGINT UNSIGNED,
-    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CreatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+    UpdatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
     INDEX idx_org_name (Name),
-    INDEX idx_top_dept (TopDepartmentID)
+    INDEX idx_top_dept (TopDepartmentID),
+    INDEX idx_org_updated (UpdatedAt)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Department table
@@ -21,12 +22,14 @@ CREATE TABLE Department (
     ParentDepartmentID BIGINT UNSIGNED,
     HeadOfDepartmentID BIGINT UNSIGNED,
     OrganizationID BIGINT UNSIGNED NOT NULL,
-    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CreatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+    UpdatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
     INDEX idx_dept_name (Name),
     INDEX idx_parent_dept (ParentDepartmentID),
     INDEX idx_head_dept (HeadOfDepartmentID),
-    INDEX idx_org_dept (OrganizationID)
+    INDEX idx_dept_org_name (OrganizationID, Name),
+    FULLTEXT INDEX ft_dept_search (Name, Description),
+    INDEX idx_dept_updated (UpdatedAt)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Employee table
@@ -36,11 +39,13 @@ CREATE TABLE Employee (
     Email VARCHAR(255) NOT NULL,
     Phone VARCHAR(50),
     OrganizationID BIGINT UNSIGNED NOT NULL,
-    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CreatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+    UpdatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
     UNIQUE INDEX idx_emp_email (Email),
     INDEX idx_emp_name (Name),
-    INDEX idx_emp_org (OrganizationID)
+    INDEX idx_emp_org_name (OrganizationID, Name),
+    FULLTEXT INDEX ft_emp_search (Name, Email),
+    INDEX idx_emp_updated (UpdatedAt)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Position table
@@ -49,10 +54,12 @@ CREATE TABLE PositionJob (
     Name VARCHAR(255) NOT NULL,
     Description TEXT,
     DepartmentID BIGINT UNSIGNED NOT NULL,
-    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CreatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+    UpdatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
     INDEX idx_pos_name (Name),
-    INDEX idx_pos_dept (DepartmentID)
+    INDEX idx_pos_dept_name (DepartmentID, Name),
+    FULLTEXT INDEX ft_pos_search (Name, Description),
+    INDEX idx_pos_updated (UpdatedAt)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Team table
@@ -63,12 +70,14 @@ CREATE TABLE Team (
     TeamLeaderID BIGINT UNSIGNED,
     ParentTeamID BIGINT UNSIGNED,
     OrganizationID BIGINT UNSIGNED NOT NULL,
-    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CreatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+    UpdatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
     INDEX idx_team_name (Name),
     INDEX idx_team_leader (TeamLeaderID),
     INDEX idx_parent_team (ParentTeamID),
-    INDEX idx_team_org (OrganizationID)
+    INDEX idx_team_org_name (OrganizationID, Name),
+    FULLTEXT INDEX ft_team_search (Name, Description),
+    INDEX idx_team_updated (UpdatedAt)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- EmployeePosition junction table
@@ -77,10 +86,12 @@ CREATE TABLE EmployeePosition (
     PositionID BIGINT UNSIGNED NOT NULL,
     StartDate DATE,
     EndDate DATE,
-    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CreatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+    UpdatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
     PRIMARY KEY (EmployeeID, PositionID),
-    INDEX idx_emp_pos_dates (StartDate, EndDate)
+    INDEX idx_emp_pos_dates (StartDate, EndDate),
+    INDEX idx_emp_pos_position_dates (PositionID, StartDate, EndDate),
+    INDEX idx_emp_pos_updated (UpdatedAt)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- TeamMember junction table
@@ -88,10 +99,43 @@ CREATE TABLE TeamMember (
     TeamID BIGINT UNSIGNED NOT NULL,
     EmployeeID BIGINT UNSIGNED NOT NULL,
     JoinDate DATE,
-    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CreatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+    UpdatedAt TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
     PRIMARY KEY (TeamID, EmployeeID),
-    INDEX idx_team_member_date (JoinDate)
+    INDEX idx_team_member_employee (EmployeeID),
+    INDEX idx_team_member_date (JoinDate),
+    INDEX idx_team_member_updated (UpdatedAt)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- AggregateCounter table (materialized headcounts, see app/core/counters.py)
+CREATE TABLE AggregateCounter (
+    Scope VARCHAR(32) NOT NULL,
+    ScopeID BIGINT UNSIGNED NOT NULL,
+    Value BIGINT NOT NULL DEFAULT 0,
+    UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (Scope, ScopeID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ChangeOutbox table (change events awaiting publication, see app/core/outbox.py)
+CREATE TABLE ChangeOutbox (
+    OutboxID BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    EventID CHAR(32) NOT NULL,
+    Entity VARCHAR(32) NOT NULL,
+    EntityKey VARCHAR(64) NOT NULL,
+    Operation VARCHAR(16) NOT NULL,
+    Fields TEXT,
+    UpdatedAt DATETIME(6) NOT NULL,
+    RequestID VARCHAR(64),
+    CreatedAt DATETIME(6) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Tombstone table (deleted rows for incremental sync, see app/core/changes.py)
+CREATE TABLE Tombstone (
+    TombstoneID BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    Entity VARCHAR(32) NOT NULL,
+    EntityKey VARCHAR(64) NOT NULL,
+    DeletedAt DATETIME(6) NOT NULL,
+    INDEX idx_tombstone_entity_deleted (Entity, DeletedAt)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Add foreign key constraints